@@ -7,6 +7,9 @@ from alembic import context
 from core.database import Base, SQLALCHEMY_DATABASE_URL
 from models.finance import * 
 from models.user import User
+from models.version import DataVersion
+from models.audit import AuditLog
+from models.job import ReportJob
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -26,6 +29,13 @@ config.set_main_option("sqlalchemy.url", SQLALCHEMY_DATABASE_URL)
 # target_metadata = mymodel.Base.metadata
 target_metadata = Base.metadata
 
+
+def include_name(name, type_, parent_names):
+    """Abaikan tabel index FTS5 SQLite (dibuat manual di migration, bukan dari model)"""
+    if type_ == "table" and name and name.startswith("transactions_fts"):
+        return False
+    return True
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -50,6 +60,9 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        # SQLite tidak mendukung sebagian besar ALTER TABLE: pakai mode batch
+        render_as_batch=url.startswith("sqlite"),
+        include_name=include_name,
     )
 
     with context.begin_transaction():
@@ -71,7 +84,10 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata,
+            # SQLite tidak mendukung sebagian besar ALTER TABLE: pakai mode batch
+            render_as_batch=connection.dialect.name == "sqlite",
+            include_name=include_name,
         )
 
         with context.begin_transaction():
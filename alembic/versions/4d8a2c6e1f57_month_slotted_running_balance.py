@@ -0,0 +1,91 @@
+"""Month slotted running balance
+
+Revision ID: 4d8a2c6e1f57
+Revises: 7c1e5a9f3b20
+Create Date: 2026-10-19 22:14:03.552817
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4d8a2c6e1f57'
+down_revision: Union[str, Sequence[str], None] = '7c1e5a9f3b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Sama dengan api.services.MONTH_SEQ_SPAN
+MONTH_SEQ_SPAN = 1000000
+
+
+def _month(column: str) -> str:
+    if op.get_bind().dialect.name == 'sqlite':
+        return f"(CAST(strftime('%Y', {column}) AS INTEGER) * 12 + CAST(strftime('%m', {column}) AS INTEGER) - 1)"
+    return f"(CAST(EXTRACT(YEAR FROM {column}) AS INTEGER) * 12 + CAST(EXTRACT(MONTH FROM {column}) AS INTEGER) - 1)"
+
+
+def _renumber(month_seq: bool) -> None:
+    """
+    Isi ulang account_seq & running_balance jurnal aktif + arsip (id entry unik di kedua tabel):
+    per bulan (month_seq=True) atau kontinu & kumulatif penuh per akun (skema lama)
+    """
+    month = _month('transaction_date')
+    partition = f"account_id, {month}" if month_seq else "account_id"
+    seq = f"CAST({month} AS BIGINT) * {MONTH_SEQ_SPAN} + ROW_NUMBER() OVER w" if month_seq else "ROW_NUMBER() OVER w"
+    for entries in ('transaction_entries', 'archived_transaction_entries'):
+        op.execute(f"""
+            UPDATE {entries} SET account_seq = s.seq, running_balance = s.balance
+            FROM (
+                SELECT id, {seq} AS seq,
+                       SUM(CASE WHEN entry_type = 'DEBIT' THEN amount ELSE -amount END) OVER w AS balance
+                FROM (
+                    SELECT e.id, e.account_id, e.entry_type, e.amount, t.id AS transaction_id, t.transaction_date
+                    FROM transaction_entries e JOIN transactions t ON t.id = e.transaction_id
+                    UNION ALL
+                    SELECT e.id, e.account_id, e.entry_type, e.amount, t.id, t.transaction_date
+                    FROM archived_transaction_entries e JOIN archived_transactions t ON t.id = e.transaction_id
+                ) AS j
+                WINDOW w AS (PARTITION BY {partition} ORDER BY transaction_date, transaction_id, id
+                             ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW)
+            ) AS s
+            WHERE {entries}.id = s.id
+        """)
+    # Saldo pindahan: saldo penuh & posisi entry terakhir s/d akhir tahun buku
+    op.execute(f"""
+        UPDATE account_carry_forwards SET
+            running_balance = debit_total - credit_total,
+            account_seq = COALESCE((
+                SELECT MAX(e.account_seq) FROM (
+                    SELECT e.account_id, e.account_seq, t.transaction_date
+                    FROM transaction_entries e JOIN transactions t ON t.id = e.transaction_id
+                    UNION ALL
+                    SELECT e.account_id, e.account_seq, t.transaction_date
+                    FROM archived_transaction_entries e JOIN archived_transactions t ON t.id = e.transaction_id
+                ) AS e
+                WHERE e.account_id = account_carry_forwards.account_id
+                  AND {_month('e.transaction_date')} < (account_carry_forwards.fiscal_year + 1) * 12
+            ), 0)
+    """)
+
+
+def _alter_seq(existing_type, type_) -> None:
+    for table in ('transaction_entries', 'archived_transaction_entries', 'account_carry_forwards'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('account_seq', existing_type=existing_type, type_=type_, existing_nullable=table != 'account_carry_forwards')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _alter_seq(sa.Integer(), sa.BigInteger())
+    # account_seq = bulan * MONTH_SEQ_SPAN + urutan, running_balance relatif awal bulan
+    _renumber(month_seq=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Kembali ke nomor urut kontinu & saldo kumulatif per akun
+    _renumber(month_seq=False)
+    _alter_seq(sa.BigInteger(), sa.Integer())
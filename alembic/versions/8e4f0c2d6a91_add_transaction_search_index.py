@@ -0,0 +1,71 @@
+"""Add transaction search index
+
+Revision ID: 8e4f0c2d6a91
+Revises: 3b9d5e1a7c24
+Create Date: 2026-10-19 10:41:27.530611
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e4f0c2d6a91'
+down_revision: Union[str, Sequence[str], None] = '3b9d5e1a7c24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TSVECTOR = "to_tsvector('simple', coalesce(description, '') || ' ' || coalesce(reference_no, ''))"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute(f"CREATE INDEX ix_transactions_search ON transactions USING gin ({TSVECTOR})")
+        op.execute("CREATE INDEX ix_transactions_description_trgm ON transactions USING gin (description gin_trgm_ops)")
+        op.execute("CREATE INDEX ix_transactions_reference_no_trgm ON transactions USING gin (reference_no gin_trgm_ops)")
+
+    elif dialect == "sqlite":
+        op.execute(
+            "CREATE VIRTUAL TABLE transactions_fts USING fts5("
+            "description, reference_no, content='transactions', content_rowid='id', "
+            "tokenize='unicode61 remove_diacritics 2')"
+        )
+        op.execute(
+            "CREATE TRIGGER transactions_fts_ai AFTER INSERT ON transactions BEGIN "
+            "INSERT INTO transactions_fts(rowid, description, reference_no) VALUES (new.id, new.description, new.reference_no); END"
+        )
+        op.execute(
+            "CREATE TRIGGER transactions_fts_ad AFTER DELETE ON transactions BEGIN "
+            "INSERT INTO transactions_fts(transactions_fts, rowid, description, reference_no) "
+            "VALUES ('delete', old.id, old.description, old.reference_no); END"
+        )
+        op.execute(
+            "CREATE TRIGGER transactions_fts_au AFTER UPDATE ON transactions BEGIN "
+            "INSERT INTO transactions_fts(transactions_fts, rowid, description, reference_no) "
+            "VALUES ('delete', old.id, old.description, old.reference_no); "
+            "INSERT INTO transactions_fts(rowid, description, reference_no) VALUES (new.id, new.description, new.reference_no); END"
+        )
+        # Isi index dari data yang sudah ada
+        op.execute("INSERT INTO transactions_fts(transactions_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_transactions_reference_no_trgm")
+        op.execute("DROP INDEX IF EXISTS ix_transactions_description_trgm")
+        op.execute("DROP INDEX IF EXISTS ix_transactions_search")
+
+    elif dialect == "sqlite":
+        op.execute("DROP TRIGGER IF EXISTS transactions_fts_au")
+        op.execute("DROP TRIGGER IF EXISTS transactions_fts_ad")
+        op.execute("DROP TRIGGER IF EXISTS transactions_fts_ai")
+        op.execute("DROP TABLE IF EXISTS transactions_fts")
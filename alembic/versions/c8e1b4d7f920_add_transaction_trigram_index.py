@@ -0,0 +1,56 @@
+"""Add transaction trigram index
+
+Revision ID: c8e1b4d7f920
+Revises: a3f7c9e2d5b1
+Create Date: 2026-10-19 23:05:51.318840
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8e1b4d7f920'
+down_revision: Union[str, Sequence[str], None] = 'a3f7c9e2d5b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # PostgreSQL sudah memakai pg_trgm (8e4f0c2d6a91); SQLite: FTS5 tokenizer trigram (SQLite >= 3.34)
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    op.execute(
+        "CREATE VIRTUAL TABLE transactions_fts_trigram USING fts5("
+        "description, reference_no, content='transactions', content_rowid='id', tokenize='trigram')"
+    )
+    op.execute(
+        "CREATE TRIGGER transactions_fts_trigram_ai AFTER INSERT ON transactions BEGIN "
+        "INSERT INTO transactions_fts_trigram(rowid, description, reference_no) VALUES (new.id, new.description, new.reference_no); END"
+    )
+    op.execute(
+        "CREATE TRIGGER transactions_fts_trigram_ad AFTER DELETE ON transactions BEGIN "
+        "INSERT INTO transactions_fts_trigram(transactions_fts_trigram, rowid, description, reference_no) "
+        "VALUES ('delete', old.id, old.description, old.reference_no); END"
+    )
+    op.execute(
+        "CREATE TRIGGER transactions_fts_trigram_au AFTER UPDATE ON transactions BEGIN "
+        "INSERT INTO transactions_fts_trigram(transactions_fts_trigram, rowid, description, reference_no) "
+        "VALUES ('delete', old.id, old.description, old.reference_no); "
+        "INSERT INTO transactions_fts_trigram(rowid, description, reference_no) VALUES (new.id, new.description, new.reference_no); END"
+    )
+    # Isi index dari data yang sudah ada
+    op.execute("INSERT INTO transactions_fts_trigram(transactions_fts_trigram) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    op.execute("DROP TRIGGER IF EXISTS transactions_fts_trigram_au")
+    op.execute("DROP TRIGGER IF EXISTS transactions_fts_trigram_ad")
+    op.execute("DROP TRIGGER IF EXISTS transactions_fts_trigram_ai")
+    op.execute("DROP TABLE IF EXISTS transactions_fts_trigram")
@@ -0,0 +1,217 @@
+"""
+Mesin analitik kolumnar untuk laporan pivot multi-periode.
+
+Ringkasan bulanan per akun (account_period_totals) ditarik sekali (bulk)
+menjadi array NumPy per kolom: indeks akun, bucket bulan, dan nominal bertanda
+(sesuai saldo normal akun). Ukurannya sebanding akun x bulan, bukan jumlah entry.
+Pivot, selisih year-over-year dan rata-rata bergerak dihitung vektoriel
+dari array tersebut, tanpa loop per baris.
+
+Hasil ekstrak di-cache per versi data (lihat services.bump_version), jadi
+selama tidak ada jurnal/akun baru, request berikutnya tidak menyentuh database.
+"""
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+import numpy as np
+from sqlalchemy import case, extract, select
+from sqlalchemy.orm import Session
+from models.finance import (
+    Account, AccountType, EntryType, Transaction, TransactionEntry,
+    FiscalYear, ArchivedTransaction, ArchivedTransactionEntry, AccountPeriodTotal
+)
+from api import services
+from core.metrics import metrics
+
+# Tipe akun bersaldo normal kredit (nominal dibalik tandanya)
+CREDIT_NORMAL = {AccountType.LIABILITY, AccountType.EQUITY, AccountType.REVENUE}
+
+# granularity -> jumlah periode per tahun
+GRANULARITIES = {"month": 12, "quarter": 4, "year": 1}
+
+MAX_WINDOW = 24
+
+@dataclass
+class ColumnarExtract:
+    """Mutasi jurnal dalam bentuk kolom (satu baris = mutasi satu akun dalam satu bulan)"""
+    account_ids: np.ndarray    # id akun, urut sesuai accounts
+    account_meta: list         # [(code, name, AccountType)] sejajar account_ids
+    account_idx: np.ndarray    # int32, indeks ke account_ids
+    month: np.ndarray          # int32, tahun * 12 + (bulan - 1)
+    amount: np.ndarray         # float64, bertanda sesuai saldo normal akun
+
+_cache_lock = threading.Lock()
+_cache = {}  # "key" -> kunci versi, "extract" -> ColumnarExtract
+
+def _cache_key(db: Session):
+    # Versi + waktu update: database yang dibuat ulang (versi sama) tetap dianggap berbeda
+    versions = services.get_versions(db, "accounts", "ledger")
+    return (str(db.get_bind().url), tuple(sorted(versions.items())))
+
+def load_extract(db: Session) -> ColumnarExtract:
+    """Ambil ekstrak kolumnar dari cache, atau tarik ulang jika versi data berubah"""
+    key = _cache_key(db)
+    with _cache_lock:
+        if _cache.get("key") == key:
+            metrics.incr("analytics.extract.cache_hit")
+            return _cache["extract"]
+
+    metrics.incr("analytics.extract.cache_miss")
+    with metrics.timer("analytics.extract.seconds"):
+        data = _extract(db)
+    with _cache_lock:
+        _cache["key"] = key
+        _cache["extract"] = data
+    return data
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
+
+def _extract(db: Session) -> ColumnarExtract:
+    accounts = db.execute(select(Account.id, Account.code, Account.name, Account.account_type).order_by(Account.id)).all()
+    account_ids = np.array([a.id for a in accounts], dtype=np.int64)
+    normal_sign = np.array([-1.0 if a.account_type in CREDIT_NORMAL else 1.0 for a in accounts])
+
+    # Jurnal penutup tahun buku bukan pendapatan/beban riil: tidak ikut dianalisis.
+    # Ringkasan bulanan memuatnya, jadi entry-nya (sedikit, satu jurnal per tahun) dikurangkan
+    closing_ids = select(FiscalYear.closing_transaction_id).where(FiscalYear.closing_transaction_id.isnot(None))
+
+    def closing_rows(entry_model, tx_model):
+        reversed_amount = case((entry_model.entry_type == EntryType.DEBIT, -entry_model.amount), else_=entry_model.amount)
+        return db.execute(
+            select(
+                entry_model.account_id,
+                extract("year", tx_model.transaction_date) * 12 + extract("month", tx_model.transaction_date) - 1,
+                reversed_amount,
+            ).join(tx_model, entry_model.transaction_id == tx_model.id)
+            .where(tx_model.id.in_(closing_ids))
+        ).all()
+
+    # Tahun yang sudah diarsipkan tetap ikut (perbandingan YoY multi-tahun)
+    rows = db.execute(select(
+        AccountPeriodTotal.account_id, AccountPeriodTotal.month,
+        AccountPeriodTotal.debit_total - AccountPeriodTotal.credit_total
+    )).all()
+    rows += closing_rows(TransactionEntry, Transaction) + closing_rows(ArchivedTransactionEntry, ArchivedTransaction)
+
+    if rows:
+        columns = np.array(rows, dtype=np.float64)
+        account_idx = np.searchsorted(account_ids, columns[:, 0].astype(np.int64)).astype(np.int32)
+        month = columns[:, 1].astype(np.int32)
+        amount = columns[:, 2] * normal_sign[account_idx]
+    else:
+        account_idx = np.empty(0, dtype=np.int32)
+        month = np.empty(0, dtype=np.int32)
+        amount = np.empty(0, dtype=np.float64)
+
+    return ColumnarExtract(
+        account_ids=account_ids,
+        account_meta=[(a.code, a.name, a.account_type) for a in accounts],
+        account_idx=account_idx,
+        month=month,
+        amount=amount,
+    )
+
+def _parse_month(value: str) -> int:
+    """'YYYY-MM' -> tahun * 12 + (bulan - 1)"""
+    dt = datetime.strptime(value, "%Y-%m")
+    return dt.year * 12 + dt.month - 1
+
+def _period_label(period: int, granularity: str) -> str:
+    if granularity == "month":
+        return f"{period // 12}-{period % 12 + 1:02d}"
+    if granularity == "quarter":
+        return f"{period // 4}-Q{period % 4 + 1}"
+    return str(period)
+
+def _to_period(month, granularity: str):
+    # bulan absolut -> periode absolut (quarter: tahun * 4 + kuartal, year: tahun)
+    return month // (12 // GRANULARITIES[granularity])
+
+def _rounded(values) -> list:
+    return np.round(values, 2).tolist()
+
+def build_pivot(data: ColumnarExtract, start: str = None, end: str = None, granularity: str = "month",
+                account_types=None, window: int = 3) -> dict:
+    """
+    Pivot akun x periode dari ekstrak kolumnar.
+    - start / end: 'YYYY-MM' (default: Januari tahun lalu s/d bulan berjalan)
+    - yoy_delta: nilai periode dikurangi periode yang sama setahun sebelumnya
+    - moving_average: rata-rata `window` periode terakhir (termasuk periode sebelum start)
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity harus salah satu dari: {', '.join(GRANULARITIES)}")
+    if not 1 <= window <= MAX_WINDOW:
+        raise ValueError(f"window harus 1-{MAX_WINDOW}")
+    account_types = list(account_types or [AccountType.REVENUE, AccountType.EXPENSE])
+
+    now = datetime.now()
+    end_month = _parse_month(end) if end else now.year * 12 + now.month - 1
+    start_month = _parse_month(start) if start else (end_month // 12 - 1) * 12
+    if start_month > end_month:
+        raise ValueError("start harus sebelum end")
+
+    per_year = GRANULARITIES[granularity]
+    p_start, p_end = _to_period(start_month, granularity), _to_period(end_month, granularity)
+    # Rentang diperluas ke belakang untuk pembanding YoY & rata-rata bergerak
+    lookback = max(per_year, window - 1)
+    ext_start = p_start - lookback
+    n_ext = p_end - ext_start + 1
+    n_periods = p_end - p_start + 1
+
+    # --- Pivot (vektoriel): bincount pada indeks datar akun * n_ext + periode ---
+    account_type_of = np.array([meta[2].value for meta in data.account_meta], dtype=object)
+    type_mask = np.isin(account_type_of, [t.value for t in account_types])
+    period = _to_period(data.month, granularity)
+    if data.amount.size:
+        mask = type_mask[data.account_idx] & (period >= ext_start) & (period <= p_end)
+    else:
+        mask = np.zeros(0, dtype=bool)
+    flat = data.account_idx[mask].astype(np.int64) * n_ext + (period[mask] - ext_start)
+    n_accounts = len(data.account_ids)
+    grid = np.bincount(flat, weights=data.amount[mask], minlength=n_accounts * n_ext).reshape(n_accounts, n_ext)
+
+    values = grid[:, lookback:]
+    yoy = values - grid[:, lookback - per_year:lookback - per_year + n_periods]
+    cumsum = np.concatenate([np.zeros((n_accounts, 1)), np.cumsum(grid, axis=1)], axis=1)
+    moving = (cumsum[:, window:] - cumsum[:, :-window]) / window
+    moving = moving[:, lookback - window + 1:]
+
+    # Hanya akun terpilih yang punya mutasi di rentang (termasuk pembanding)
+    active = type_mask & grid.any(axis=1)
+    rows = []
+    for i in np.flatnonzero(active):
+        code, name, account_type = data.account_meta[i]
+        rows.append({
+            "account_id": int(data.account_ids[i]),
+            "account_code": code,
+            "account_name": name,
+            "account_type": account_type.value,
+            "values": _rounded(values[i]),
+            "total": round(float(values[i].sum()), 2),
+            "yoy_delta": _rounded(yoy[i]),
+            "moving_average": _rounded(moving[i]),
+        })
+    rows.sort(key=lambda r: r["account_code"])
+
+    totals = {t.value: _rounded(values[account_type_of == t.value].sum(axis=0)) for t in account_types}
+    if AccountType.REVENUE in account_types and AccountType.EXPENSE in account_types:
+        totals["SURPLUS"] = _rounded(np.array(totals["REVENUE"]) - np.array(totals["EXPENSE"]))
+
+    return {
+        "granularity": granularity,
+        "start": _period_label(p_start, granularity),
+        "end": _period_label(p_end, granularity),
+        "window": window,
+        "periods": [_period_label(p, granularity) for p in range(p_start, p_end + 1)],
+        "rows": rows,
+        "totals": totals,
+    }
+
+def generate_pivot(db: Session, start: str = None, end: str = None, granularity: str = "month",
+                   account_types=None, window: int = 3) -> dict:
+    """Laporan pivot multi-periode (lihat build_pivot)"""
+    data = load_extract(db)
+    with metrics.timer("analytics.pivot.seconds"):
+        return build_pivot(data, start, end, granularity, account_types, window)
@@ -0,0 +1,214 @@
+"""
+Tutup buku tahunan & arsip periode yang sudah ditutup.
+
+1. close_fiscal_year: posting jurnal penutup (saldo Pendapatan & Beban
+   dipindah ke akun Ekuitas / Surplus Ditahan) bertanggal akhir tahun,
+   lalu simpan saldo pindahan per akun (account_carry_forwards).
+   Setelah itu jurnal ke periode tersebut ditolak.
+2. archive_fiscal_year: pindahkan jurnal tahun yang sudah ditutup ke tabel
+   arsip, sehingga tabel aktif & biaya laporan hanya sebanding dengan
+   periode yang masih terbuka (laporan mulai dari saldo pindahan).
+3. restore_fiscal_year: kembalikan arsip ke tabel aktif (id tetap sama).
+
+Feed /sync: arsip & pemulihan sama-sama memberi nomor urut perubahan baru.
+Baris arsip menjadi tanda hapus (deleted_transactions) dan jurnal yang
+dipulihkan muncul lagi sebagai perubahan, juga bagi client yang `since`-nya
+sudah melewati nomor lama jurnal tersebut.
+"""
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import delete, func, insert, literal, select, update
+from sqlalchemy.orm import Session
+from models.finance import (
+    Account, AccountType, EntryType, Transaction, TransactionEntry,
+    FiscalYear, AccountCarryForward, ArchivedTransaction, ArchivedTransactionEntry
+)
+from api import services
+from api.schemas import TransactionCreate, TransactionEntryCreate
+
+def _fiscal_year_dict(fy: FiscalYear) -> dict:
+    return {
+        "year": fy.year,
+        "closed_at": fy.closed_at,
+        "closing_transaction_id": fy.closing_transaction_id,
+        "retained_earnings_account_id": fy.retained_earnings_account_id,
+        "archived_at": fy.archived_at,
+    }
+
+def list_fiscal_years(db: Session) -> list:
+    return [_fiscal_year_dict(fy) for fy in db.query(FiscalYear).order_by(FiscalYear.year).all()]
+
+def _closing_entries(db: Session, totals: dict, retained_earnings_account_id: int) -> list:
+    """Entry jurnal penutup: nolkan saldo Pendapatan & Beban, selisihnya ke akun ekuitas"""
+    entries = []
+    net = Decimal(0)  # Debit - Kredit yang dipindahkan
+    accounts = db.query(Account).filter(
+        Account.account_type.in_([AccountType.REVENUE, AccountType.EXPENSE])
+    ).order_by(Account.code).all()
+    for acc in accounts:
+        debit, credit = totals.get(acc.id, (0, 0))
+        balance = Decimal(str(debit or 0)) - Decimal(str(credit or 0))
+        if balance == 0:
+            continue
+        entries.append(TransactionEntryCreate(
+            account_id=acc.id,
+            entry_type=EntryType.CREDIT.value if balance > 0 else EntryType.DEBIT.value,
+            amount=abs(balance)
+        ))
+        net += balance
+
+    if net != 0:
+        # net > 0: beban lebih besar (defisit) -> Debit ekuitas; sebaliknya Kredit (surplus)
+        entries.append(TransactionEntryCreate(
+            account_id=retained_earnings_account_id,
+            entry_type=EntryType.DEBIT.value if net > 0 else EntryType.CREDIT.value,
+            amount=abs(net)
+        ))
+    return entries
+
+def close_fiscal_year(db: Session, year: int, retained_earnings_account_id: int) -> dict:
+    cutoff = services.fiscal_year_end(year)
+    if cutoff > datetime.now():
+        raise ValueError(f"Tahun buku {year} belum berakhir")
+    if db.get(FiscalYear, year):
+        raise ValueError(f"Tahun buku {year} sudah ditutup")
+
+    equity = db.get(Account, retained_earnings_account_id)
+    if not equity or equity.account_type != AccountType.EQUITY:
+        raise ValueError("Akun surplus ditahan harus akun bertipe EQUITY")
+
+    # Kunci semua akun: posting yang berjalan bersamaan menunggu tutup buku selesai
+    db.query(Account.id).order_by(Account.id).with_for_update().all()
+
+    last_closed = db.query(func.max(FiscalYear.year)).scalar()
+    if last_closed is not None and year < last_closed:
+        raise ValueError(f"Tahun buku {year} sudah ditutup")
+    # Tahun sebelumnya yang punya jurnal harus ditutup lebih dulu (berurutan)
+    earlier = db.query(func.min(Transaction.transaction_date)).filter(
+        Transaction.transaction_date < datetime(year, 1, 1),
+        *([Transaction.transaction_date > services.fiscal_year_end(last_closed)] if last_closed is not None else [])
+    ).scalar()
+    if earlier is not None:
+        raise ValueError(f"Tutup dulu tahun buku {earlier.year}")
+
+    # 1. Jurnal penutup
+    totals = services._account_totals(db, cutoff)
+    entries = _closing_entries(db, totals, retained_earnings_account_id)
+    closing_tx = None
+    if entries:
+        closing_tx = services.post_transaction(db, TransactionCreate(
+            description=f"Jurnal Penutup Tahun Buku {year}",
+            reference_no=f"CLOSE-{year}",
+            transaction_date=cutoff,
+            entries=entries
+        ))
+    db.flush()
+
+    # 2. Saldo pindahan: total kumulatif + posisi terakhir buku besar per akun s/d akhir tahun.
+    # running_balance pindahan = saldo penuh (Debit - Kredit kumulatif), bukan relatif bulan
+    totals = services._account_totals(db, cutoff)
+    positions = {}
+    if last_closed is not None:
+        positions = {row.account_id: row.account_seq for row in
+                     db.query(AccountCarryForward).filter(AccountCarryForward.fiscal_year == last_closed)}
+    positions.update(db.query(TransactionEntry.account_id, func.max(TransactionEntry.account_seq))
+                     .join(Transaction, TransactionEntry.transaction_id == Transaction.id)
+                     .filter(Transaction.transaction_date <= cutoff)
+                     .group_by(TransactionEntry.account_id).all())
+
+    fiscal_year = FiscalYear(
+        year=year,
+        closed_at=datetime.now(),
+        closing_transaction_id=closing_tx.id if closing_tx else None,
+        retained_earnings_account_id=retained_earnings_account_id
+    )
+    db.add(fiscal_year)
+    db.flush()
+    db.add_all([
+        AccountCarryForward(
+            fiscal_year=year,
+            account_id=account_id,
+            debit_total=totals.get(account_id, (0, 0))[0] or 0,
+            credit_total=totals.get(account_id, (0, 0))[1] or 0,
+            account_seq=positions.get(account_id, 0),
+            running_balance=(totals.get(account_id, (0, 0))[0] or 0) - (totals.get(account_id, (0, 0))[1] or 0)
+        )
+        for account_id in sorted(set(totals) | set(positions))
+    ])
+    services.bump_version(db, "ledger")
+    services.commit_loaded(db)
+    return _fiscal_year_dict(fiscal_year)
+
+def _copy_columns(source, target) -> list:
+    """Nama kolom yang ada di kedua tabel (tabel aktif <-> arsip)"""
+    return [c.name for c in source.__table__.columns if c.name in target.__table__.columns]
+
+def _renumber_changes(db: Session, model, ids):
+    """Beri nomor urut perubahan baru (unik per baris, satu blok) untuk baris `model` dengan id di `ids`"""
+    low, high = db.execute(select(func.min(model.id), func.max(model.id)).where(model.id.in_(ids))).one()
+    if low is None:
+        return
+    first = services.next_change_seq(db, high - low + 1)
+    db.execute(update(model).where(model.id.in_(ids))
+               .values(change_seq=model.id - low + first).execution_options(synchronize_session=False))
+
+def archive_fiscal_year(db: Session, year: int) -> dict:
+    """Pindahkan jurnal s/d akhir tahun buku (yang sudah ditutup) ke tabel arsip"""
+    fiscal_year = db.get(FiscalYear, year, with_for_update=True)
+    if not fiscal_year:
+        raise ValueError(f"Tahun buku {year} belum ditutup")
+    if fiscal_year.archived_at:
+        raise ValueError(f"Tahun buku {year} sudah diarsipkan")
+    pending = db.query(func.min(FiscalYear.year)).filter(FiscalYear.year < year, FiscalYear.archived_at.is_(None)).scalar()
+    if pending is not None:
+        raise ValueError(f"Arsipkan dulu tahun buku {pending}")
+
+    # Set-based: INSERT ... SELECT lalu DELETE, tanpa memuat baris ke Python
+    tx_ids = select(Transaction.id).where(Transaction.transaction_date <= services.fiscal_year_end(year))
+    tx_cols = _copy_columns(Transaction, ArchivedTransaction)
+    entry_cols = _copy_columns(TransactionEntry, ArchivedTransactionEntry)
+
+    moved_tx = db.execute(insert(ArchivedTransaction).from_select(
+        ["fiscal_year", *tx_cols],
+        select(literal(year), *[Transaction.__table__.c[c] for c in tx_cols]).where(Transaction.id.in_(tx_ids))
+    )).rowcount
+    moved_entries = db.execute(insert(ArchivedTransactionEntry).from_select(
+        ["fiscal_year", *entry_cols],
+        select(literal(year), *[TransactionEntry.__table__.c[c] for c in entry_cols]).where(TransactionEntry.transaction_id.in_(tx_ids))
+    )).rowcount
+    db.execute(delete(TransactionEntry).where(TransactionEntry.transaction_id.in_(tx_ids)).execution_options(synchronize_session=False))
+    db.execute(delete(Transaction).where(Transaction.id.in_(tx_ids)).execution_options(synchronize_session=False))
+    # Tanda hapus untuk /sync
+    _renumber_changes(db, ArchivedTransaction, select(ArchivedTransaction.id).where(ArchivedTransaction.fiscal_year == year))
+
+    fiscal_year.archived_at = datetime.now()
+    services.bump_version(db, "ledger")
+    db.commit()
+    return {"year": year, "transactions": moved_tx, "entries": moved_entries}
+
+def restore_fiscal_year(db: Session, year: int) -> dict:
+    """Kembalikan jurnal tahun buku dari arsip ke tabel aktif (tahun terakhir yang diarsipkan dulu)"""
+    fiscal_year = db.get(FiscalYear, year, with_for_update=True)
+    if not fiscal_year or not fiscal_year.archived_at:
+        raise ValueError(f"Tahun buku {year} tidak diarsipkan")
+    later = db.query(func.max(FiscalYear.year)).filter(FiscalYear.year > year, FiscalYear.archived_at.isnot(None)).scalar()
+    if later is not None:
+        raise ValueError(f"Pulihkan dulu tahun buku {later}")
+
+    tx_cols = _copy_columns(Transaction, ArchivedTransaction)
+    entry_cols = _copy_columns(TransactionEntry, ArchivedTransactionEntry)
+    restored_tx = db.execute(insert(Transaction).from_select(
+        tx_cols, select(*[ArchivedTransaction.__table__.c[c] for c in tx_cols]).where(ArchivedTransaction.fiscal_year == year)
+    )).rowcount
+    restored_entries = db.execute(insert(TransactionEntry).from_select(
+        entry_cols, select(*[ArchivedTransactionEntry.__table__.c[c] for c in entry_cols]).where(ArchivedTransactionEntry.fiscal_year == year)
+    )).rowcount
+    # Nomor lama bisa sudah dilewati client /sync: beri nomor baru
+    _renumber_changes(db, Transaction, select(ArchivedTransaction.id).where(ArchivedTransaction.fiscal_year == year))
+    db.execute(delete(ArchivedTransactionEntry).where(ArchivedTransactionEntry.fiscal_year == year))
+    db.execute(delete(ArchivedTransaction).where(ArchivedTransaction.fiscal_year == year))
+
+    fiscal_year.archived_at = None
+    services.bump_version(db, "ledger")
+    db.commit()
+    return {"year": year, "transactions": restored_tx, "entries": restored_entries}
@@ -0,0 +1,184 @@
+"""
+Import Chart of Accounts (COA) massal dari CSV / JSON.
+
+1. Semua baris divalidasi sekaligus (kode kosong / duplikat, tipe akun,
+   panjang kolom); jika ada yang salah tidak ada yang disimpan dan
+   seluruh kesalahan dilaporkan per baris.
+2. Upsert berbasis himpunan pada accounts.code: satu SELECT untuk akun yang
+   sudah ada, lalu satu INSERT dan satu UPDATE (executemany) untuk seluruh
+   baris. Import ulang file yang sama tidak mengubah apa pun (idempoten).
+"""
+import csv
+import io
+import json
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.orm import Session
+from models.finance import Account, AccountType, TransactionEntry
+from api import services
+
+# Nama kolom CSV yang dikenali (huruf kecil)
+CSV_COLUMNS = {
+    "code": ("code", "kode", "no_akun"),
+    "name": ("name", "nama", "nama_akun"),
+    "account_type": ("account_type", "type", "tipe", "jenis"),
+    "description": ("description", "keterangan", "deskripsi"),
+}
+
+# Sinonim tipe akun (Bahasa Indonesia) -> AccountType
+TYPE_ALIASES = {
+    "ASET": AccountType.ASSET, "HARTA": AccountType.ASSET,
+    "KEWAJIBAN": AccountType.LIABILITY, "UTANG": AccountType.LIABILITY,
+    "MODAL": AccountType.EQUITY, "EKUITAS": AccountType.EQUITY, "ASET_NETO": AccountType.EQUITY,
+    "PENDAPATAN": AccountType.REVENUE, "PEMASUKAN": AccountType.REVENUE,
+    "BEBAN": AccountType.EXPENSE, "BIAYA": AccountType.EXPENSE, "PENGELUARAN": AccountType.EXPENSE,
+}
+
+MAX_ROWS = 5000
+
+def parse_csv(content: str) -> list:
+    """CSV dengan header (kode, nama, tipe, keterangan) -> list dict"""
+    reader = csv.DictReader(io.StringIO(content))
+    fields = {(name or "").strip().lower(): name for name in reader.fieldnames or []}
+    column = {key: next((fields[a] for a in aliases if a in fields), None) for key, aliases in CSV_COLUMNS.items()}
+    if not column["code"] or not column["name"] or not column["account_type"]:
+        raise ValueError("Header CSV harus berisi kolom kode, nama dan tipe akun")
+    return [
+        {key: (row.get(name) or "").strip() if name else None for key, name in column.items()}
+        for row in reader
+        if any((value or "").strip() for value in row.values() if isinstance(value, str))
+    ]
+
+def parse_json(content) -> list:
+    """List akun, atau {"accounts": [...]}"""
+    data = json.loads(content) if isinstance(content, (str, bytes)) else content
+    if isinstance(data, dict):
+        data = data.get("accounts")
+    if not isinstance(data, list) or not all(isinstance(row, dict) for row in data):
+        raise ValueError('JSON harus berupa list akun atau {"accounts": [...]}')
+    return data
+
+def detect_format(filename: str, content: str) -> str:
+    if filename and filename.lower().endswith(".json") or content.lstrip()[:1] in ("[", "{"):
+        return "json"
+    return "csv"
+
+def _parse_type(value):
+    key = str(value or "").strip().upper().replace(" ", "_")
+    if key in AccountType.__members__:
+        return AccountType[key]
+    return TYPE_ALIASES.get(key)
+
+def validate_rows(rows: list) -> list:
+    """
+    Validasi seluruh baris dalam satu kali jalan.
+    Return list dict {code, name, account_type, description}; ValueError berisi
+    semua kesalahan (nomor baris dimulai dari 1) jika ada yang tidak valid.
+    """
+    if not rows:
+        raise ValueError("Tidak ada akun untuk diimport")
+    if len(rows) > MAX_ROWS:
+        raise ValueError(f"Maksimal {MAX_ROWS} akun per import")
+
+    errors = []
+    accounts = []
+    seen = {}
+    max_code = Account.__table__.c.code.type.length
+    max_name = Account.__table__.c.name.type.length
+    for i, row in enumerate(rows, start=1):
+        code = str(row.get("code") or "").strip()
+        name = str(row.get("name") or "").strip()
+        account_type = _parse_type(row.get("account_type"))
+        description = str(row.get("description") or "").strip() or None
+
+        if not code:
+            errors.append(f"Baris {i}: kode akun kosong")
+        elif len(code) > max_code:
+            errors.append(f"Baris {i}: kode akun maksimal {max_code} karakter")
+        elif code in seen:
+            errors.append(f"Baris {i}: kode {code} duplikat dengan baris {seen[code]}")
+        if not name:
+            errors.append(f"Baris {i}: nama akun kosong")
+        elif len(name) > max_name:
+            errors.append(f"Baris {i}: nama akun maksimal {max_name} karakter")
+        if account_type is None:
+            errors.append(f"Baris {i}: tipe akun tidak dikenali: {row.get('account_type')}")
+
+        seen.setdefault(code, i)
+        accounts.append({"code": code, "name": name, "account_type": account_type, "description": description})
+
+    if errors:
+        raise ValueError("; ".join(errors))
+    return accounts
+
+def import_accounts(db: Session, rows: list, dry_run: bool = False) -> dict:
+    """
+    Upsert akun berdasarkan kode. Return {created, updated, unchanged, dry_run}.
+    Tipe akun yang sudah memiliki jurnal tidak boleh diubah (laporan lama ikut berubah).
+    """
+    accounts = validate_rows(rows)
+
+    # Akun yang sudah ada dikunci (urut id, seperti posting jurnal) sebelum nomor urut perubahan diambil
+    existing = {
+        row.code: row for row in db.execute(
+            select(Account.id, Account.code, Account.name, Account.account_type, Account.description)
+            .where(Account.code.in_([a["code"] for a in accounts]))
+            .order_by(Account.id).with_for_update()
+        )
+    }
+    to_insert, to_update = [], []
+    for acc in accounts:
+        current = existing.get(acc["code"])
+        if current is None:
+            to_insert.append(acc)
+        elif (current.name, current.account_type, current.description) != (acc["name"], acc["account_type"], acc["description"]):
+            to_update.append({"_id": current.id, "_type": current.account_type, **acc})
+
+    retyped = {a["_id"]: a["code"] for a in to_update if a["_type"] != a["account_type"]}
+    if retyped:
+        used = db.execute(
+            select(TransactionEntry.account_id).where(TransactionEntry.account_id.in_(retyped)).distinct()
+        ).scalars().all()
+        if used:
+            codes = ", ".join(sorted(retyped[i] for i in used))
+            raise ValueError(f"Tipe akun {codes} tidak bisa diubah karena sudah memiliki jurnal")
+
+    result = {
+        "created": len(to_insert),
+        "updated": len(to_update),
+        "unchanged": len(accounts) - len(to_insert) - len(to_update),
+        "dry_run": dry_run,
+    }
+    if dry_run or not (to_insert or to_update):
+        return result
+
+    # Satu blok nomor urut perubahan (feed /sync) untuk seluruh import
+    seq = services.next_change_seq(db, len(to_insert) + len(to_update))
+    if to_insert:
+        db.execute(insert(Account), [{**acc, "change_seq": seq + i} for i, acc in enumerate(to_insert)])
+        seq += len(to_insert)
+    if to_update:
+        table = Account.__table__
+        db.connection().execute(
+            update(table).where(table.c.id == bindparam("_id")).values(
+                name=bindparam("_name"), account_type=bindparam("_account_type"), description=bindparam("_description"),
+                change_seq=bindparam("_change_seq")
+            ),
+            [{"_id": a["_id"], "_name": a["name"], "_account_type": a["account_type"], "_description": a["description"],
+              "_change_seq": seq + i}
+             for i, a in enumerate(to_update)]
+        )
+    services.bump_version(db, "accounts")
+    db.commit()
+    return result
+
+def import_file(db: Session, content: str, fmt: str = "csv", dry_run: bool = False) -> dict:
+    if fmt == "csv":
+        rows = parse_csv(content)
+    elif fmt == "json":
+        try:
+            rows = parse_json(content)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"JSON tidak valid: {e}")
+    else:
+        raise ValueError("Format harus csv atau json")
+    return import_accounts(db, rows, dry_run)
@@ -0,0 +1,174 @@
+"""
+Verifikasi integritas data buku besar yang tersimpan (bukan hanya validasi input).
+
+Memeriksa tabel jurnal aktif dan arsip per potongan rentang id transaksi
+(VERIFY_CHUNK_SIZE id per potongan). Potongan dikerjakan paralel di process pool;
+setiap potongan cukup beberapa query GROUP BY yang memakai index transaction_id,
+jadi tidak ada baris entry yang dimuat ke Python kecuali yang bermasalah.
+
+Temuan (`issues`, semuanya dilaporkan):
+- imbalanced          jurnal yang total Debit != total Kredit
+- too_few_entries     jurnal dengan kurang dari 2 entry
+- empty_transaction   header transaksi tanpa entry sama sekali
+- orphan_transaction  entry yang transaction_id-nya tidak ada
+- orphan_account      entry yang account_id-nya tidak ada di tabel akun
+- invalid_amount      entry dengan nominal <= 0
+
+Dijalankan lewat `python app.py verify-ledger` atau POST /admin/integrity (job background).
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from sqlalchemy import and_, case, exists, func, select
+from sqlalchemy.orm import Session
+from models.finance import Account, EntryType, Transaction, TransactionEntry, ArchivedTransaction, ArchivedTransactionEntry
+from core.metrics import metrics
+
+VERIFY_CHUNK_SIZE = int(os.getenv("VERIFY_CHUNK_SIZE", "50000"))     # id transaksi per potongan
+VERIFY_WORKERS = int(os.getenv("VERIFY_WORKERS", str(os.cpu_count() or 1)))
+BALANCE_TOLERANCE = 0.005
+
+# Tabel aktif & arsip: (entry, header)
+TABLES = {
+    "active": (TransactionEntry, Transaction),
+    "archive": (ArchivedTransactionEntry, ArchivedTransaction),
+}
+
+def _id_range(db: Session, table: str):
+    """(id terkecil, id terbesar + 1) dari header & entry; None jika tabel kosong"""
+    entry_model, tx_model = TABLES[table]
+    tx_min, tx_max = db.execute(select(func.min(tx_model.id), func.max(tx_model.id))).one()
+    entry_min, entry_max = db.execute(
+        select(func.min(entry_model.transaction_id), func.max(entry_model.transaction_id))
+    ).one()
+    lows = [v for v in (tx_min, entry_min) if v is not None]
+    if not lows:
+        return None
+    return min(lows), max(v for v in (tx_max, entry_max) if v is not None) + 1
+
+def plan_chunks(db: Session, chunk_size: int = VERIFY_CHUNK_SIZE, include_archive: bool = True) -> list:
+    """Daftar potongan [(table, lo, hi), ...] yang menutup seluruh rentang id"""
+    chunks = []
+    for table in TABLES if include_archive else ["active"]:
+        id_range = _id_range(db, table)
+        if id_range is None:
+            continue
+        lo, hi = id_range
+        chunks += [(table, start, min(start + chunk_size, hi)) for start in range(lo, hi, chunk_size)]
+    return chunks
+
+def check_chunk(db: Session, table: str, lo: int, hi: int) -> dict:
+    """Periksa satu potongan id transaksi [lo, hi); return {entries, transactions, issues}"""
+    entry_model, tx_model = TABLES[table]
+    in_range = and_(entry_model.transaction_id >= lo, entry_model.transaction_id < hi)
+    signed = case((entry_model.entry_type == EntryType.DEBIT, entry_model.amount), else_=-entry_model.amount)
+
+    # 1. Per jurnal: selisih D-K, jumlah entry, entry yatim & nominal tidak valid (satu GROUP BY)
+    debit = func.sum(case((entry_model.entry_type == EntryType.DEBIT, entry_model.amount), else_=0))
+    credit = func.sum(case((entry_model.entry_type == EntryType.CREDIT, entry_model.amount), else_=0))
+    count = func.count(entry_model.id)
+    missing_accounts = func.sum(case((Account.id.is_(None), 1), else_=0))
+    missing_tx = func.max(case((tx_model.id.is_(None), 1), else_=0))
+    bad_amounts = func.sum(case((entry_model.amount <= 0, 1), else_=0))
+    rows = db.execute(
+        select(entry_model.transaction_id, debit, credit, count, missing_accounts, missing_tx, bad_amounts)
+        .select_from(entry_model)
+        .outerjoin(Account, Account.id == entry_model.account_id)
+        .outerjoin(tx_model, tx_model.id == entry_model.transaction_id)
+        .where(in_range)
+        .group_by(entry_model.transaction_id)
+        .having((func.abs(func.sum(signed)) > BALANCE_TOLERANCE) | (count < 2)
+                | (missing_accounts > 0) | (missing_tx > 0) | (bad_amounts > 0))
+    ).all()
+
+    issues = []
+    orphan_account_txs = []
+    for tx_id, debit_total, credit_total, n, n_missing_accounts, no_tx, n_bad in rows:
+        base = {"table": table, "transaction_id": tx_id}
+        debit_total, credit_total = float(debit_total or 0), float(credit_total or 0)
+        if abs(debit_total - credit_total) > BALANCE_TOLERANCE:
+            issues.append({**base, "type": "imbalanced", "debit": round(debit_total, 2), "credit": round(credit_total, 2),
+                           "difference": round(debit_total - credit_total, 2)})
+        if n < 2:
+            issues.append({**base, "type": "too_few_entries", "entries": n})
+        if no_tx:
+            issues.append({**base, "type": "orphan_transaction", "entries": n})
+        if n_bad:
+            issues.append({**base, "type": "invalid_amount", "entries": n_bad})
+        if n_missing_accounts:
+            orphan_account_txs.append(tx_id)
+
+    # 2. Detail entry yang akunnya hilang (hanya jika ada, biasanya tidak pernah)
+    if orphan_account_txs:
+        orphans = db.execute(
+            select(entry_model.id, entry_model.transaction_id, entry_model.account_id)
+            .outerjoin(Account, Account.id == entry_model.account_id)
+            .where(entry_model.transaction_id.in_(orphan_account_txs), Account.id.is_(None))
+            .order_by(entry_model.id)
+        ).all()
+        issues += [{"table": table, "transaction_id": tx_id, "type": "orphan_account", "entry_id": entry_id,
+                    "account_id": account_id} for entry_id, tx_id, account_id in orphans]
+
+    # 3. Header tanpa entry
+    empty = db.execute(
+        select(tx_model.id).where(
+            tx_model.id >= lo, tx_model.id < hi,
+            ~exists().where(entry_model.transaction_id == tx_model.id)
+        ).order_by(tx_model.id)
+    ).scalars().all()
+    issues += [{"table": table, "transaction_id": tx_id, "type": "empty_transaction"} for tx_id in empty]
+
+    entries = db.execute(select(func.count()).select_from(entry_model).where(in_range)).scalar()
+    transactions = db.execute(select(func.count()).select_from(tx_model).where(tx_model.id >= lo, tx_model.id < hi)).scalar()
+    return {"entries": entries, "transactions": transactions, "issues": issues}
+
+def run_chunk(table: str, lo: int, hi: int) -> dict:
+    """Dijalankan di worker process: buka session sendiri (replica jika ada)"""
+    from api.jobs import _read_session
+    db = _read_session()
+    try:
+        return check_chunk(db, table, lo, hi)
+    finally:
+        db.close()
+
+def verify_ledger(db: Session, workers: int = VERIFY_WORKERS, chunk_size: int = VERIFY_CHUNK_SIZE,
+                  include_archive: bool = True, progress=None) -> dict:
+    """
+    Verifikasi seluruh jurnal. workers <= 1: semua potongan dikerjakan di proses ini
+    memakai `db`; selebihnya di process pool (setiap worker membuka koneksi sendiri).
+    progress(selesai, total, hasil_sementara) dipanggil setiap satu potongan selesai.
+    """
+    start = time.perf_counter()
+    chunks = plan_chunks(db, chunk_size, include_archive)
+    result = {"ok": True, "chunks": len(chunks), "entries_checked": 0, "transactions_checked": 0,
+              "summary": {}, "issues": [], "seconds": 0.0}
+
+    def collect(chunk_result):
+        result["entries_checked"] += chunk_result["entries"]
+        result["transactions_checked"] += chunk_result["transactions"]
+        result["issues"] += chunk_result["issues"]
+        for issue in chunk_result["issues"]:
+            result["summary"][issue["type"]] = result["summary"].get(issue["type"], 0) + 1
+        if progress:
+            progress(done, len(chunks), result)
+
+    done = 0
+    if workers <= 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            chunk_result = check_chunk(db, *chunk)
+            done += 1
+            collect(chunk_result)
+    else:
+        from core.jobs import _init_worker
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            futures = [pool.submit(run_chunk, *chunk) for chunk in chunks]
+            for future in as_completed(futures):
+                done += 1
+                collect(future.result())
+
+    result["issues"].sort(key=lambda i: (i["table"], i["transaction_id"], i["type"]))
+    result["ok"] = not result["issues"]
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    metrics.observe("integrity.verify.seconds", result["seconds"])
+    metrics.incr("integrity.issues", len(result["issues"]))
+    return result
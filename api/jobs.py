@@ -0,0 +1,41 @@
+from core.database import SessionLocal, replica_router
+from api import schemas, services, integrity
+
+# Fungsi-fungsi di bawah dijalankan di worker process (core.jobs),
+# jadi harus top-level dan membuka session database sendiri.
+# Hasilnya disimpan sebagai JSON (tabel report_jobs).
+
+def _read_session():
+    # Laporan hanya membaca: pakai replica jika tersedia
+    return replica_router.session() or SessionLocal()
+
+def run_balance_sheet(as_of: str = None):
+    db = _read_session()
+    try:
+        data = services.generate_balance_sheet(db, as_of)
+        return schemas.BalanceSheetResponse(**data).model_dump(mode="json")
+    finally:
+        db.close()
+
+def run_ledger(account_id: int, start_date: str = None, end_date: str = None):
+    db = _read_session()
+    try:
+        data = services.get_general_ledger(db, int(account_id), start_date, end_date)
+        return schemas.LedgerResponse(**data).model_dump(mode="json")
+    finally:
+        db.close()
+
+def run_integrity(workers: int = None, chunk_size: int = None, include_archive: bool = True):
+    # Bukan laporan publik (tidak ada di REPORTS): disubmit lewat POST /admin/integrity
+    db = _read_session()
+    try:
+        return integrity.verify_ledger(db, workers or integrity.VERIFY_WORKERS,
+                                       chunk_size or integrity.VERIFY_CHUNK_SIZE, include_archive)
+    finally:
+        db.close()
+
+# Nama laporan -> (fungsi, parameter yang diizinkan)
+REPORTS = {
+    "balance_sheet": (run_balance_sheet, {"as_of"}),
+    "ledger": (run_ledger, {"account_id", "start_date", "end_date"}),
+}
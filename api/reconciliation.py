@@ -0,0 +1,367 @@
+"""
+Rekonsiliasi rekening koran (bank statement) dengan jurnal akun Kas/Bank.
+
+Alur: import file mutasi (CSV / OFX) -> baris disimpan di bank_statement_lines
+-> dicocokkan dengan TransactionEntry akun tersebut yang belum direkonsiliasi.
+
+Pencocokan memakai index (bukan nested loop), total O(n log n):
+1. Nominal + nomor referensi sama (hash index), tanggal dalam jendela ±N hari
+2. Nominal sama (hash index per nominal berisi daftar tanggal terurut),
+   dicari tanggal terdekat dengan binary search
+"""
+import csv
+import hashlib
+import io
+import re
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from models.finance import Account, AccountType, BankStatementLine, EntryType, Transaction, TransactionEntry
+
+DEFAULT_DATE_WINDOW = 3  # hari
+
+# Nama kolom CSV yang dikenali (huruf kecil)
+CSV_COLUMNS = {
+    "date": ("date", "tanggal", "tgl"),
+    "description": ("description", "keterangan", "uraian"),
+    "reference": ("reference", "ref", "no_ref", "reference_no"),
+    "amount": ("amount", "jumlah", "nominal"),
+    "credit": ("credit", "kredit", "masuk"),   # uang masuk (sisi bank)
+    "debit": ("debit", "keluar"),              # uang keluar (sisi bank)
+}
+CSV_DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y")
+
+# --- PARSER ---
+
+def _parse_decimal(value: str) -> Decimal:
+    value = (value or "").strip().replace(" ", "")
+    if not value:
+        return Decimal(0)
+    # Format Indonesia "1.500.000,00" -> "1500000.00"
+    if "," in value and value.rfind(",") > value.rfind("."):
+        value = value.replace(".", "").replace(",", ".")
+    else:
+        value = value.replace(",", "")
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        raise ValueError(f"Nominal tidak valid: {value}")
+
+def _parse_csv_date(value: str):
+    for fmt in CSV_DATE_FORMATS:
+        try:
+            return datetime.strptime(value.strip(), fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Format tanggal tidak dikenali: {value}")
+
+def parse_csv(content: str) -> list:
+    """
+    CSV dengan header. Kolom wajib: tanggal + (amount bertanda, atau credit/debit).
+    Return list dict {line_date, amount, description, reference_no, external_id}
+    """
+    reader = csv.DictReader(io.StringIO(content))
+    fields = {(name or "").strip().lower(): name for name in reader.fieldnames or []}
+    column = {key: next((fields[a] for a in aliases if a in fields), None) for key, aliases in CSV_COLUMNS.items()}
+    if not column["date"] or not (column["amount"] or column["credit"] or column["debit"]):
+        raise ValueError("Header CSV harus berisi kolom tanggal dan amount (atau credit/debit)")
+
+    def cell(row, key, max_length=None):
+        value = (row.get(column[key]) or "").strip() if column[key] else ""
+        return value[:max_length] if max_length else value
+
+    lines = []
+    seen = {}
+    for row in reader:
+        if not cell(row, "date"):
+            continue
+        if column["amount"]:
+            amount = _parse_decimal(cell(row, "amount"))
+        else:
+            amount = _parse_decimal(cell(row, "credit")) - _parse_decimal(cell(row, "debit"))
+        line = {
+            "line_date": _parse_csv_date(cell(row, "date")),
+            "amount": amount,
+            "description": cell(row, "description", 255) or None,
+            "reference_no": cell(row, "reference", 50) or None,
+        }
+        # Baris identik dalam satu file dibedakan dengan nomor kemunculan
+        raw = f"{line['line_date']}|{line['amount']}|{line['reference_no']}|{line['description']}"
+        seen[raw] = seen.get(raw, 0) + 1
+        line["external_id"] = hashlib.sha1(f"{raw}|{seen[raw]}".encode("utf-8")).hexdigest()
+        lines.append(line)
+    return lines
+
+_OFX_TRANSACTION = re.compile(r"<STMTTRN>(.*?)(?:</STMTTRN>|(?=<STMTTRN>)|(?=</BANKTRANLIST>))", re.S | re.I)
+
+def _ofx_field(block: str, tag: str):
+    # SGML (OFX 1.x) tidak wajib menutup tag: nilai berakhir di '<' atau baris baru
+    match = re.search(rf"<{tag}>([^<\r\n]*)", block, re.I)
+    return match.group(1).strip() if match else None
+
+def parse_ofx(content: str) -> list:
+    """OFX 1.x (SGML) maupun 2.x (XML): ambil setiap <STMTTRN>"""
+    lines = []
+    for block in _OFX_TRANSACTION.findall(content):
+        posted = _ofx_field(block, "DTPOSTED")
+        amount = _ofx_field(block, "TRNAMT")
+        if not posted or amount is None:
+            continue
+        fit_id = _ofx_field(block, "FITID")
+        lines.append({
+            "line_date": datetime.strptime(posted[:8], "%Y%m%d").date(),
+            "amount": _parse_decimal(amount),
+            "description": (_ofx_field(block, "MEMO") or _ofx_field(block, "NAME") or "")[:255] or None,
+            "reference_no": (_ofx_field(block, "CHECKNUM") or _ofx_field(block, "REFNUM") or "")[:50] or None,
+            "external_id": (fit_id or hashlib.sha1(block.encode("utf-8")).hexdigest())[:64],
+        })
+    if not lines and "<OFX>" not in content.upper():
+        raise ValueError("File bukan OFX yang valid")
+    return lines
+
+def detect_format(filename: str, content: str) -> str:
+    name = (filename or "").lower()
+    if name.endswith((".ofx", ".qfx")) or content.lstrip().upper().startswith(("OFXHEADER", "<?XML", "<OFX")):
+        return "ofx"
+    return "csv"
+
+# --- IMPORT & PENCOCOKAN ---
+
+class AccountNotFound(ValueError):
+    pass
+
+def _get_account(db: Session, account_id: int) -> Account:
+    account = db.get(Account, account_id)
+    if not account:
+        raise AccountNotFound("Akun tidak ditemukan")
+    # Rekening koran hanya ada untuk akun Kas/Bank
+    if account.account_type != AccountType.ASSET:
+        raise ValueError("Rekonsiliasi hanya untuk akun ASSET (Kas/Bank)")
+    return account
+
+def import_statement(db: Session, account_id: int, content: str, fmt: str = "csv",
+                     date_window: int = DEFAULT_DATE_WINDOW) -> dict:
+    """Simpan baris mutasi (baris yang sudah pernah diimport dilewati) lalu jalankan pencocokan"""
+    _get_account(db, account_id)
+    if fmt not in ("csv", "ofx"):
+        raise ValueError("Format harus csv atau ofx")
+    parsed = parse_ofx(content) if fmt == "ofx" else parse_csv(content)
+
+    # Cek duplikat dengan satu query IN (bukan per baris)
+    external_ids = [line["external_id"] for line in parsed]
+    existing = set(db.scalars(
+        select(BankStatementLine.external_id).where(
+            BankStatementLine.account_id == account_id,
+            BankStatementLine.external_id.in_(external_ids)
+        )
+    )) if external_ids else set()
+
+    new_lines = []
+    for line in parsed:
+        if line["external_id"] in existing:
+            continue
+        existing.add(line["external_id"])
+        new_lines.append(BankStatementLine(account_id=account_id, **line))
+    db.add_all(new_lines)
+    db.flush()
+
+    result = match_statement(db, account_id, date_window, commit=False)
+    db.commit()
+    result.update({"imported": len(new_lines), "duplicates": len(parsed) - len(new_lines)})
+    return result
+
+def _norm_ref(value: str):
+    ref = re.sub(r"[^0-9A-Z]", "", (value or "").upper())
+    return ref or None
+
+def _cents(amount) -> int:
+    return int((Decimal(amount) * 100).to_integral_value())
+
+class _DateBucket:
+    """
+    Entry satu nominal, terurut per tanggal (ordinal). Entry yang sudah diambil tidak
+    dihapus dari list (pop O(n)) tapi dilompati lewat pointer "berikutnya / sebelumnya
+    yang masih ada" (union-find dengan path compression, amortized ~O(1)).
+    """
+
+    def __init__(self, dates: list, ids: list):
+        self.dates = dates
+        self.ids = ids
+        self._next = list(range(len(dates) + 1))  # _next[i]: index hidup pertama >= i (len = habis)
+        self._prev = list(range(len(dates) + 1))  # _prev[i + 1]: index hidup terakhir <= i (-1 = habis)
+
+    @staticmethod
+    def _find(parent: list, i: int) -> int:
+        root = i
+        while parent[root] != root:
+            root = parent[root]
+        while parent[i] != root:
+            parent[i], i = root, parent[i]
+        return root
+
+    def next_alive(self, i: int) -> int:
+        return self._find(self._next, i)
+
+    def prev_alive(self, i: int) -> int:
+        return self._find(self._prev, i + 1) - 1
+
+    def remove(self, i: int):
+        self._next[i] = i + 1
+        self._prev[i + 1] = i
+
+class _AmountIndex:
+    """Entry kandidat per nominal, tanggal (ordinal) terurut untuk binary search"""
+
+    def __init__(self):
+        self._buckets = {}  # key -> ([ordinal], [entry_id]), menjadi _DateBucket setelah sort()
+
+    def add(self, key, ordinal: int, entry_id: int):
+        self._buckets.setdefault(key, ([], []))
+        dates, ids = self._buckets[key]
+        dates.append(ordinal)
+        ids.append(entry_id)
+
+    def sort(self):
+        for key, (dates, ids) in self._buckets.items():
+            order = sorted(range(len(dates)), key=dates.__getitem__)
+            self._buckets[key] = _DateBucket([dates[i] for i in order], [ids[i] for i in order])
+
+    def take_nearest(self, key, ordinal: int, window: int, used: set):
+        """
+        Ambil entry dengan tanggal terdekat dalam ±window hari yang belum terpakai
+        (seri: tanggal lebih awal menang). Binary search ke posisi tanggal lalu cek
+        tetangga hidup di kiri & kanan; entry yang sudah terpakai lewat index lain dibuang.
+        """
+        bucket = self._buckets.get(key)
+        if not bucket:
+            return None
+        dates, ids = bucket.dates, bucket.ids
+        i = bisect_left(dates, ordinal)
+
+        right = bucket.next_alive(i)
+        while right < len(dates) and ids[right] in used:
+            bucket.remove(right)
+            right = bucket.next_alive(right)
+        left = bucket.prev_alive(i - 1)
+        while left >= 0 and ids[left] in used:
+            bucket.remove(left)
+            left = bucket.prev_alive(left)
+
+        candidates = []
+        if left >= 0 and dates[left] >= ordinal - window:
+            candidates.append(left)
+        if right < len(dates) and dates[right] <= ordinal + window:
+            candidates.append(right)
+        if not candidates:
+            return None
+        best = min(candidates, key=lambda j: (abs(dates[j] - ordinal), dates[j]))
+        bucket.remove(best)
+        return ids[best]
+
+def match_statement(db: Session, account_id: int, date_window: int = DEFAULT_DATE_WINDOW, commit: bool = True) -> dict:
+    """
+    Cocokkan baris mutasi yang belum cocok dengan entry akun yang belum direkonsiliasi.
+    Sisi bank: uang masuk (positif) = Debit pada akun Kas/Bank.
+    """
+    _get_account(db, account_id)
+    lines = db.execute(
+        select(BankStatementLine.id, BankStatementLine.line_date, BankStatementLine.amount, BankStatementLine.reference_no)
+        .where(BankStatementLine.account_id == account_id, BankStatementLine.matched_at.is_(None))
+        .order_by(BankStatementLine.line_date, BankStatementLine.id)
+    ).all()
+    if not lines:
+        return {"matched": 0, "unmatched_lines": 0}
+
+    # Kandidat hanya entry dalam rentang tanggal mutasi ± jendela
+    window_start = datetime.combine(lines[0].line_date - timedelta(days=date_window), datetime.min.time())
+    window_end = datetime.combine(lines[-1].line_date + timedelta(days=date_window), datetime.max.time())
+    entries = db.execute(
+        select(TransactionEntry.id, TransactionEntry.entry_type, TransactionEntry.amount,
+               Transaction.transaction_date, Transaction.reference_no)
+        .join(Transaction, TransactionEntry.transaction_id == Transaction.id)
+        .where(
+            TransactionEntry.account_id == account_id,
+            TransactionEntry.reconciled_at.is_(None),
+            Transaction.transaction_date.between(window_start, window_end)
+        )
+    ).all()
+
+    by_reference = _AmountIndex()
+    by_amount = _AmountIndex()
+    for e in entries:
+        cents = _cents(e.amount) if e.entry_type == EntryType.DEBIT else -_cents(e.amount)
+        ordinal = e.transaction_date.toordinal()
+        by_amount.add(cents, ordinal, e.id)
+        ref = _norm_ref(e.reference_no)
+        if ref:
+            by_reference.add((cents, ref), ordinal, e.id)
+    by_reference.sort()
+    by_amount.sort()
+
+    used = set()
+    pairs = []
+    pending = []
+    # Tahap 1: nominal + referensi
+    for line in lines:
+        ref = _norm_ref(line.reference_no)
+        entry_id = by_reference.take_nearest((_cents(line.amount), ref), line.line_date.toordinal(), date_window, used) if ref else None
+        if entry_id is None:
+            pending.append(line)
+        else:
+            used.add(entry_id)
+            pairs.append((line.id, entry_id))
+    # Tahap 2: nominal + tanggal terdekat
+    for line in pending:
+        entry_id = by_amount.take_nearest(_cents(line.amount), line.line_date.toordinal(), date_window, used)
+        if entry_id is not None:
+            used.add(entry_id)
+            pairs.append((line.id, entry_id))
+
+    if pairs:
+        now = datetime.now()
+        # Bulk UPDATE berdasarkan primary key (executemany)
+        db.execute(update(BankStatementLine), [{"id": line_id, "matched_at": now} for line_id, _ in pairs])
+        db.execute(update(TransactionEntry), [
+            {"id": entry_id, "statement_line_id": line_id, "reconciled_at": now} for line_id, entry_id in pairs
+        ])
+    if commit:
+        db.commit()
+    return {"matched": len(pairs), "unmatched_lines": len(lines) - len(pairs)}
+
+def get_unmatched(db: Session, account_id: int, limit: int = 500) -> dict:
+    """Baris mutasi yang belum cocok & entry akun yang belum direkonsiliasi"""
+    account = _get_account(db, account_id)
+    lines = db.scalars(
+        select(BankStatementLine)
+        .where(BankStatementLine.account_id == account_id, BankStatementLine.matched_at.is_(None))
+        .order_by(BankStatementLine.line_date, BankStatementLine.id).limit(limit)
+    ).all()
+    entries = db.execute(
+        select(TransactionEntry.id, TransactionEntry.transaction_id, TransactionEntry.entry_type, TransactionEntry.amount,
+               Transaction.transaction_date, Transaction.description, Transaction.reference_no)
+        .join(Transaction, TransactionEntry.transaction_id == Transaction.id)
+        .where(TransactionEntry.account_id == account_id, TransactionEntry.reconciled_at.is_(None))
+        .order_by(TransactionEntry.account_seq).limit(limit)
+    ).all()
+
+    return {
+        "account_id": account.id,
+        "account_name": account.name,
+        "statement_lines": [{
+            "id": line.id,
+            "line_date": line.line_date.isoformat(),
+            "amount": line.amount,
+            "description": line.description,
+            "reference_no": line.reference_no,
+        } for line in lines],
+        "entries": [{
+            "entry_id": e.id,
+            "transaction_id": e.transaction_id,
+            "transaction_date": e.transaction_date,
+            "description": e.description,
+            "reference_no": e.reference_no,
+            "amount": e.amount if e.entry_type == EntryType.DEBIT else -e.amount,
+        } for e in entries],
+    }
@@ -1,5 +1,5 @@
 from pydantic import field_validator, ConfigDict, BaseModel, Field
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 from enum import Enum
 
@@ -34,6 +34,12 @@ class AccountResponse(AccountCreate):
     id: int
     model_config = ConfigDict(from_attributes=True)
 
+class AccountImportResult(BaseModel):
+    created: int
+    updated: int
+    unchanged: int
+    dry_run: bool = False               # True: hanya validasi, tidak disimpan
+
 # --- SCHEMAS UNTUK TRANSAKSI ---
 class TransactionEntryCreate(BaseModel):
     account_id: int
@@ -43,6 +49,7 @@ class TransactionEntryCreate(BaseModel):
 class TransactionCreate(BaseModel):
     description: str
     reference_no: Optional[str] = None
+    transaction_date: Optional[datetime] = None  # Kosong = sekarang
     entries: List[TransactionEntryCreate]
 
     @field_validator('entries')
@@ -69,6 +76,23 @@ class TransactionResponse(BaseModel):
     entries: List[TransactionEntryResponse]
     model_config = ConfigDict(from_attributes=True)
 
+class TransactionSearchResponse(BaseModel):
+    query: str
+    page: int
+    per_page: int
+    has_more: bool
+    items: List[TransactionResponse]
+
+# Feed perubahan untuk client offline (GET /sync)
+class SyncResponse(BaseModel):
+    since: int
+    next_since: int                     # Isi ke `since` request berikutnya
+    has_more: bool
+    reset: bool = False                 # True: sinkronisasi ulang dari since=0
+    accounts: List[AccountResponse]
+    transactions: List[TransactionResponse]
+    deleted_transactions: List[int] = []  # Id jurnal yang diarsipkan (hapus dari salinan lokal)
+
 # Schema untuk satu baris akun (misal: "Kas Masjid": 5.000.000)
 class BalanceLineItem(BaseModel):
     account_name: str
@@ -94,6 +118,36 @@ class BalanceSheetResponse(BaseModel):
     is_balance: bool
     diff: float  # Selisih (seharusnya 0)
 
+# Schema untuk Laporan Laba Rugi (Pendapatan - Beban) satu periode
+class IncomeStatementResponse(BaseModel):
+    period_start: str
+    period_end: str
+    revenues: List[BalanceLineItem]
+    total_revenue: float
+    expenses: List[BalanceLineItem]
+    total_expense: float
+    surplus: float  # Surplus (+) / Defisit (-)
+
+# Schema untuk Dashboard (ringkasan halaman depan)
+class DashboardResponse(BaseModel):
+    report_date: str
+
+    # Saldo per akun Aset (Kas/Bank)
+    cash_balances: List[BalanceLineItem]
+    total_cash: float
+
+    # Bulan berjalan (sejak tanggal 1)
+    month_to_date_revenue: float
+    month_to_date_expense: float
+
+    # Ringkasan Neraca
+    total_assets: float
+    total_liabilities: float
+    total_equities: float
+    is_balance: bool
+
+    recent_transactions: List[TransactionResponse]
+
 # --- SCHEMAS UNTUK BUKU BESAR (LEDGER) ---
 
 class LedgerEntryItem(BaseModel):
@@ -112,4 +166,72 @@ class LedgerResponse(BaseModel):
     period_end: Optional[str] = None
     opening_balance: float      # Saldo sebelum periode yang dipilih
     closing_balance: float      # Saldo akhir periode
-    entries: List[LedgerEntryItem]
\ No newline at end of file
+    entries: List[LedgerEntryItem]
+    next_cursor: Optional[str] = None  # Isi ke parameter `after` untuk halaman berikutnya
+
+# --- SCHEMAS UNTUK PIVOT MULTI-PERIODE ---
+
+class PivotRow(BaseModel):
+    account_id: int
+    account_code: str
+    account_name: str
+    account_type: str
+    values: List[float]            # nilai per periode (sejajar `periods`)
+    total: float
+    yoy_delta: List[float]         # selisih dengan periode yang sama tahun lalu
+    moving_average: List[float]    # rata-rata `window` periode terakhir
+
+class PivotResponse(BaseModel):
+    granularity: str
+    start: str
+    end: str
+    window: int
+    periods: List[str]
+    rows: List[PivotRow]
+    totals: Dict[str, List[float]]  # total per tipe akun (+ SURPLUS)
+
+# --- SCHEMAS UNTUK REKONSILIASI BANK ---
+
+class ReconciliationResult(BaseModel):
+    imported: Optional[int] = None      # Baris baru dari file (kosong jika hanya pencocokan ulang)
+    duplicates: Optional[int] = None    # Baris yang sudah pernah diimport
+    matched: int
+    unmatched_lines: int
+
+class StatementLineItem(BaseModel):
+    id: int
+    line_date: str
+    amount: float                       # Positif = uang masuk
+    description: Optional[str] = None
+    reference_no: Optional[str] = None
+
+class UnreconciledEntryItem(BaseModel):
+    entry_id: int
+    transaction_id: int
+    transaction_date: datetime
+    description: str
+    reference_no: Optional[str] = None
+    amount: float                       # Positif = Debit (uang masuk)
+
+class UnmatchedResponse(BaseModel):
+    account_id: int
+    account_name: str
+    statement_lines: List[StatementLineItem]
+    entries: List[UnreconciledEntryItem]
+
+# --- SCHEMAS UNTUK TUTUP BUKU ---
+
+class FiscalYearCloseRequest(BaseModel):
+    retained_earnings_account_id: int   # Akun EQUITY penampung surplus/defisit
+
+class FiscalYearResponse(BaseModel):
+    year: int
+    closed_at: datetime
+    closing_transaction_id: Optional[int] = None
+    retained_earnings_account_id: int
+    archived_at: Optional[datetime] = None
+
+class ArchiveResult(BaseModel):
+    year: int
+    transactions: int   # Jumlah jurnal yang dipindahkan
+    entries: int
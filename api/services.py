@@ -1,8 +1,90 @@
-from datetime import datetime
-from sqlalchemy import func, case
-from sqlalchemy.orm import Session
-from models.finance import Account, AccountType, EntryType, Transaction, TransactionEntry
-from api.schemas import AccountCreate, TransactionCreate
+import re
+from datetime import datetime, timedelta
+from decimal import Decimal
+from sqlalchemy import func, case, select, text, literal_column, update, insert, delete, extract
+from sqlalchemy.orm import Session, selectinload
+from models.finance import (
+    Account, AccountType, EntryType, Transaction, TransactionEntry, TRANSACTION_SEARCH_TSVECTOR,
+    FiscalYear, AccountCarryForward, ArchivedTransaction, ArchivedTransactionEntry, AccountPeriodTotal
+)
+from models.version import DataVersion
+from api.schemas import AccountCreate, TransactionCreate, TransactionResponse
+from core.database import SessionLocal, GroupCommitQueue, GROUP_COMMIT_ENABLED
+
+# --- VERSI DATA (untuk ETag / Last-Modified) ---
+
+# Versi 'ledger' = penghitung perubahan global ('changes', lihat next_change_seq).
+# Setiap penulisan jurnal sudah mengambil nomor urut perubahan, jadi posting
+# cukup memegang SATU kunci baris global (bukan 'changes' + 'ledger').
+VERSION_ROWS = {"ledger": "changes"}
+
+def bump_version(db: Session, scope: str):
+    """
+    Naikkan versi data; panggil SEBELUM commit agar ikut dalam transaksi yang sama.
+    'ledger': beri nomor urut perubahan ke jurnal baru di session (sequence_changes),
+    atau satu nomor kosong jika tidak ada (tutup buku, arsip, susun ulang ringkasan).
+    """
+    if VERSION_ROWS.get(scope) == "changes":
+        if not sequence_changes(db):
+            next_change_seq(db)
+        return
+    row = db.get(DataVersion, scope, with_for_update=True)
+    if row is None:
+        row = DataVersion(scope=scope, version=0)
+        db.add(row)
+    row.version += 1
+    row.updated_at = datetime.now()
+
+def get_versions(db: Session, *scopes: str) -> dict:
+    """Return {scope: (version, updated_at)}; scope yang belum pernah ditulis = (0, None)"""
+    rows = db.query(DataVersion).filter(DataVersion.scope.in_({VERSION_ROWS.get(s, s) for s in scopes})).all()
+    found = {row.scope: (row.version, row.updated_at) for row in rows}
+    return {scope: found.get(VERSION_ROWS.get(scope, scope), (0, None)) for scope in scopes}
+
+def commit_loaded(db: Session):
+    """
+    Commit tanpa meng-expire objek session, pengganti commit() + refresh().
+    Hasil penulisan bisa langsung diserialisasi tanpa SELECT ulang. Di mode SQLite
+    SELECT ulang dari thread penulis membuka BEGIN IMMEDIATE baru, dan kunci tulisnya
+    tertahan sampai request menutup session.
+    """
+    expire, db.expire_on_commit = db.expire_on_commit, False
+    try:
+        db.commit()
+    finally:
+        db.expire_on_commit = expire
+
+def next_change_seq(db: Session, count: int = 1) -> int:
+    """
+    Ambil `count` nomor urut perubahan untuk feed /sync; return nomor pertama.
+    Penghitung global (data_versions 'changes') terkunci s/d commit, jadi urutan
+    nomor = urutan commit: client yang sudah menerima nomor N tidak akan
+    melewatkan perubahan bernomor lebih kecil. Panggil SETELAH baris akun
+    yang diubah dikunci (urutan kunci sama dengan posting jurnal).
+    """
+    row = db.get(DataVersion, "changes", with_for_update=True)
+    if row is None:
+        row = DataVersion(scope="changes", version=0)
+        db.add(row)
+    first = row.version + 1
+    row.version += count
+    row.updated_at = datetime.now()
+    return first
+
+def sequence_changes(db: Session) -> int:
+    """
+    Beri nomor urut perubahan ke semua jurnal yang diposting di session ini
+    (post_transaction) dengan SATU next_change_seq, tepat sebelum commit: kunci
+    penghitung global hanya dipegang selama commit, dan group commit mengambilnya
+    sekali per batch. Return jumlah jurnal yang diberi nomor.
+    """
+    # Jurnal yang SAVEPOINT-nya di-rollback sudah tidak ada di session
+    pending = [tx for tx in db.info.pop("unsequenced", []) if tx in db and tx.change_seq is None]
+    if pending:
+        first = next_change_seq(db, len(pending))
+        for offset, tx in enumerate(pending):
+            tx.change_seq = first + offset
+    return len(pending)
 
 def get_all_accounts(db: Session):
     return db.query(Account).order_by(Account.code).all()
@@ -11,95 +93,569 @@ def create_account(db: Session, account: AccountCreate):
     db_account = Account(
         code=account.code,
         name=account.name,
-        account_type=account.account_type, # Konversi otomatis dari Enum Pydantic
-        description=account.description
+        account_type=AccountType(account.account_type.value),  # Enum Pydantic -> Enum SQLAlchemy (objek tidak di-refresh)
+        description=account.description,
+        change_seq=next_change_seq(db)
     )
     db.add(db_account)
-    db.commit()
-    db.refresh(db_account)
+    bump_version(db, "accounts")
+    commit_loaded(db)
     return db_account
 
 def create_transaction(db: Session, tx_data: TransactionCreate):
+    new_tx = post_transaction(db, tx_data)
+    bump_version(db, "ledger")
+    commit_loaded(db)
+    return new_tx
+
+def _post_in_batch(db: Session, tx_data: TransactionCreate) -> TransactionResponse:
+    # Dijalankan thread group commit di dalam SAVEPOINT; hasil dilepas dari session
+    new_tx = post_transaction(db, tx_data)
+    db.flush()
+    return TransactionResponse.model_validate(new_tx)
+
+journal_writer = GroupCommitQueue(
+    SessionLocal, enabled=GROUP_COMMIT_ENABLED, before_commit=lambda db: bump_version(db, "ledger")
+)
+
+def create_transaction_grouped(tx_data: TransactionCreate) -> TransactionResponse:
+    """Seperti create_transaction, tapi di-commit bersama posting lain yang datang bersamaan"""
+    return journal_writer.submit(_post_in_batch, tx_data)
+
+def post_transaction(db: Session, tx_data: TransactionCreate) -> Transaction:
+    """Tambahkan jurnal ke session (tanpa commit), dipakai juga oleh proses tutup buku"""
     # 1. Buat Header Transaksi
     new_tx = Transaction(
         description=tx_data.description,
         reference_no=tx_data.reference_no
     )
+    # Jurnal mundur (back-dated) diizinkan, saldo berjalan akan disusun ulang
+    new_tx.transaction_date = tx_data.transaction_date or datetime.now()
     
     # 2. Buat Detail Jurnal
     for entry in tx_data.entries:
         new_entry = TransactionEntry(
             account_id=entry.account_id,
-            entry_type=entry.entry_type, # Konversi str ke Enum SQLAlchemy
+            entry_type=EntryType(entry.entry_type), # Konversi str ke Enum SQLAlchemy
             amount=entry.amount
         )
         # Append ke relasi (SQLAlchemy mengurus foreign key transaction_id)
         new_tx.entries.append(new_entry)
     
     db.add(new_tx)
-    db.commit()
-    db.refresh(new_tx)
+    assign_running_balances(db, new_tx)
+    update_period_totals(db, new_tx)
+    # Nomor urut perubahan diberikan menjelang commit (bump_version 'ledger' / sequence_changes)
+    db.info.setdefault("unsequenced", []).append(new_tx)
     return new_tx
 
+def _signed_amount(entry: TransactionEntry) -> Decimal:
+    """Debit (+), Kredit (-)"""
+    amount = Decimal(str(entry.amount))
+    return amount if entry.entry_type == EntryType.DEBIT else -amount
+
+# Slot account_seq per bulan: account_seq = bulan absolut * MONTH_SEQ_SPAN + urutan di bulan tsb
+MONTH_SEQ_SPAN = 1_000_000
+
+def assign_running_balances(db: Session, tx: Transaction):
+    """
+    Isi account_seq (urutan di buku besar akun) dan running_balance untuk setiap
+    entry jurnal baru.
+
+    Urutan buku besar: (tanggal transaksi, id transaksi, id entry).
+    account_seq memakai slot per bulan (month_index * MONTH_SEQ_SPAN + urutan)
+    dan running_balance adalah kumulatif Debit - Kredit SEJAK AWAL BULAN entry.
+    Saldo penuh = saldo awal bulan (dari account_period_totals, lihat
+    month_openings) + running_balance.
+    Jurnal normal selalu jatuh di akhir: cukup 1 query per akun (entry terakhir
+    di bulan tsb). Jurnal mundur (back-dated) hanya menggeser entry akun yang
+    lebih baru DI BULAN YANG SAMA (satu UPDATE berbasis set); bulan-bulan
+    sesudahnya tidak disentuh karena saldo awalnya ikut naik lewat
+    update_period_totals.
+    """
+    # Kunci baris akun (urut id agar tidak deadlock) supaya posting paralel
+    # ke akun yang sama tidak mendapat nomor urut yang sama
+    account_ids = sorted({e.account_id for e in tx.entries})
+    locked = db.query(Account.id).filter(Account.id.in_(account_ids)).order_by(Account.id).with_for_update().all()
+    missing = set(account_ids) - {row.id for row in locked}
+    if missing:
+        raise ValueError(f"Akun tidak ditemukan: {', '.join(str(i) for i in sorted(missing))}")
+
+    # Dicek setelah kunci akun didapat: tutup buku yang berjalan bersamaan sudah commit
+    closed_year = db.query(func.max(FiscalYear.year)).scalar()
+    if closed_year is not None and tx.transaction_date <= fiscal_year_end(closed_year):
+        raise ValueError(f"Tahun buku {closed_year} sudah ditutup, jurnal tidak bisa diposting ke periode tersebut")
+
+    month_first = month_index(tx.transaction_date) * MONTH_SEQ_SPAN
+    month_last = month_first + MONTH_SEQ_SPAN - 1
+
+    def last_entry(account_id, *filters):
+        return db.query(TransactionEntry.account_seq, TransactionEntry.running_balance, Transaction.transaction_date)\
+            .join(Transaction).filter(
+                TransactionEntry.account_id == account_id,
+                TransactionEntry.account_seq.between(month_first, month_last),
+                *filters
+            ).order_by(TransactionEntry.account_seq.desc()).first()
+
+    for account_id in account_ids:
+        entries = [e for e in tx.entries if e.account_id == account_id]
+        signed = [_signed_amount(e) for e in entries]
+
+        base = last_entry(account_id)
+        if base is not None and base.account_seq + len(entries) > month_last:
+            raise ValueError(f"Entry akun {account_id} di bulan {tx.transaction_date:%m/%Y} melebihi {MONTH_SEQ_SPAN - 1}")
+        if base is not None and base.transaction_date > tx.transaction_date:
+            # Jurnal mundur: cari titik sisip, lalu geser entry setelahnya (bulan yang sama saja)
+            base = last_entry(account_id, Transaction.transaction_date <= tx.transaction_date)
+            base_seq = base.account_seq if base else month_first
+            db.execute(
+                update(TransactionEntry)
+                .where(TransactionEntry.account_id == account_id, TransactionEntry.account_seq.between(base_seq + 1, month_last))
+                .values(
+                    account_seq=TransactionEntry.account_seq + len(entries),
+                    running_balance=TransactionEntry.running_balance + sum(signed)
+                )
+                .execution_options(synchronize_session="fetch")
+            )
+
+        seq = base.account_seq if base else month_first
+        balance = Decimal(str(base.running_balance)) if base else Decimal("0")
+        for entry, amount in zip(entries, signed):
+            seq += 1
+            balance += amount
+            entry.account_seq = seq
+            entry.running_balance = balance
+
+# --- RINGKASAN PER AKUN PER BULAN (account_period_totals) ---
+
+def month_index(dt: datetime) -> int:
+    """Bulan absolut: tahun * 12 + (bulan - 1), sama dengan api.analytics"""
+    return dt.year * 12 + dt.month - 1
+
+def month_start(month: int) -> datetime:
+    return datetime(month // 12, month % 12 + 1, 1)
+
+def month_openings(db: Session, account_id: int, months) -> dict:
+    """
+    Saldo awal (Debit - Kredit kumulatif) akun di awal setiap bulan di `months`,
+    dari account_period_totals (termasuk bulan yang sudah diarsipkan).
+    Return: {bulan: Decimal}
+    """
+    months = sorted(set(months))
+    if not months:
+        return {}
+    net = AccountPeriodTotal.debit_total - AccountPeriodTotal.credit_total
+    opening = Decimal(str(db.query(func.coalesce(func.sum(net), 0)).filter(
+        AccountPeriodTotal.account_id == account_id, AccountPeriodTotal.month < months[0]
+    ).scalar()))
+    rows = dict(db.query(AccountPeriodTotal.month, net).filter(
+        AccountPeriodTotal.account_id == account_id, AccountPeriodTotal.month.between(months[0], months[-1] - 1)
+    ))
+    result = {}
+    for month in range(months[0], months[-1] + 1):
+        result[month] = opening
+        opening += Decimal(str(rows.get(month, 0)))
+    return {month: result[month] for month in months}
+
+def update_period_totals(db: Session, tx: Transaction):
+    """
+    Tambahkan entry jurnal baru ke ringkasan bulanan akunnya (tanpa commit).
+    Dipanggil setelah assign_running_balances: baris akun sudah dikunci,
+    jadi UPDATE lalu INSERT (jika bulan tsb belum ada) aman dari posting paralel.
+    """
+    month = month_index(tx.transaction_date)
+    deltas = {}
+    for entry in tx.entries:
+        debit, credit, count = deltas.get(entry.account_id, (Decimal(0), Decimal(0), 0))
+        amount = Decimal(str(entry.amount))
+        if entry.entry_type == EntryType.DEBIT:
+            debit += amount
+        else:
+            credit += amount
+        deltas[entry.account_id] = (debit, credit, count + 1)
+
+    for account_id, (debit, credit, count) in sorted(deltas.items()):
+        updated = db.execute(
+            update(AccountPeriodTotal)
+            .where(AccountPeriodTotal.account_id == account_id, AccountPeriodTotal.month == month)
+            .values(
+                debit_total=AccountPeriodTotal.debit_total + debit,
+                credit_total=AccountPeriodTotal.credit_total + credit,
+                entry_count=AccountPeriodTotal.entry_count + count
+            )
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not updated:
+            db.execute(insert(AccountPeriodTotal).values(
+                account_id=account_id, month=month, debit_total=debit, credit_total=credit, entry_count=count
+            ))
+
+def rebuild_period_totals(db: Session) -> dict:
+    """Susun ulang account_period_totals dari nol (jurnal aktif + arsip), lalu commit"""
+    def grouped(entry_model, tx_model):
+        month = extract("year", tx_model.transaction_date) * 12 + extract("month", tx_model.transaction_date) - 1
+        return db.execute(
+            select(
+                entry_model.account_id, month,
+                func.sum(case((entry_model.entry_type == EntryType.DEBIT, entry_model.amount), else_=0)),
+                func.sum(case((entry_model.entry_type == EntryType.CREDIT, entry_model.amount), else_=0)),
+                func.count()
+            ).join(tx_model, entry_model.transaction_id == tx_model.id)
+            .group_by(entry_model.account_id, month)
+        ).all()
+
+    rows = {}
+    for account_id, month, debit, credit, count in grouped(TransactionEntry, Transaction) + grouped(ArchivedTransactionEntry, ArchivedTransaction):
+        base = rows.get((account_id, int(month)), (0, 0, 0))
+        rows[(account_id, int(month))] = (base[0] + (debit or 0), base[1] + (credit or 0), base[2] + count)
+
+    db.execute(delete(AccountPeriodTotal))
+    if rows:
+        db.execute(insert(AccountPeriodTotal), [
+            {"account_id": account_id, "month": month, "debit_total": debit, "credit_total": credit, "entry_count": count}
+            for (account_id, month), (debit, credit, count) in rows.items()
+        ])
+    # Cache laporan (ETag, ekstrak analitik) ikut dibuang
+    bump_version(db, "ledger")
+    db.commit()
+    return {"rows": len(rows)}
+
+def get_period_totals(db: Session, start_dt: datetime = None, end_dt: datetime = None,
+                      account_ids=None, include_closing: bool = True) -> dict:
+    """
+    Total Debit & Kredit per akun untuk jurnal bertanggal [start_dt, end_dt] (kosong = tanpa batas).
+    Bulan yang tercakup penuh dibaca dari account_period_totals (O(akun x bulan));
+    jurnal mentah hanya dibaca untuk bulan batas yang terpotong sebagian.
+    Bulan terakhir dianggap penuh jika end_dt sudah mencapai detik terakhirnya
+    (seperti _parse_as_of: 23:59:59).
+    include_closing=False: jurnal penutup tahun buku tidak dihitung (laporan laba rugi).
+    Return: {account_id: (debit, credit)}
+    """
+    first = last = None
+    if start_dt:
+        first = month_index(start_dt)
+        if start_dt > month_start(first):
+            first += 1
+    if end_dt:
+        last = month_index(end_dt)
+        if end_dt < month_start(last + 1) - timedelta(seconds=1):
+            last -= 1
+
+    closing = None if include_closing else False
+    if first is not None and last is not None and first > last:
+        # Rentang di dalam satu bulan (tidak ada bulan penuh)
+        return _sum_journal(db, start_dt - timedelta(microseconds=1), end_dt, account_ids, closing)
+
+    query = db.query(AccountPeriodTotal.account_id, func.sum(AccountPeriodTotal.debit_total), func.sum(AccountPeriodTotal.credit_total))
+    if first is not None:
+        query = query.filter(AccountPeriodTotal.month >= first)
+    if last is not None:
+        query = query.filter(AccountPeriodTotal.month <= last)
+    if account_ids is not None:
+        query = query.filter(AccountPeriodTotal.account_id.in_(account_ids))
+    totals = {}
+    _add_totals(totals, {acc_id: (debit, credit) for acc_id, debit, credit in query.group_by(AccountPeriodTotal.account_id)})
+
+    full_after = month_start(first) - timedelta(microseconds=1) if first is not None else None
+    full_until = month_start(last + 1) - timedelta(microseconds=1) if last is not None else None
+    if not include_closing:
+        # Ringkasan bulanan memuat jurnal penutup: kurangi (paling banyak satu jurnal per tahun)
+        for acc_id, (debit, credit) in _sum_journal(db, full_after, full_until, account_ids, closing=True).items():
+            base_debit, base_credit = totals.get(acc_id, (0, 0))
+            totals[acc_id] = (base_debit - (debit or 0), base_credit - (credit or 0))
+    if start_dt and start_dt - timedelta(microseconds=1) < full_after:
+        _add_totals(totals, _sum_journal(db, start_dt - timedelta(microseconds=1), full_after, account_ids, closing))
+    if end_dt and end_dt > full_until:
+        _add_totals(totals, _sum_journal(db, full_until, end_dt, account_ids, closing))
+    return totals
+
 def get_transactions(db: Session, limit: int = 100):
     return db.query(Transaction).order_by(Transaction.transaction_date.desc()).limit(limit).all()
 
-def calculate_balance(db: Session, account_id: int, account_type: AccountType) -> float:
-    """Helper internal untuk menghitung saldo satu akun"""
-    totals = db.query(
-        func.sum(case((TransactionEntry.entry_type == EntryType.DEBIT, TransactionEntry.amount), else_=0)),
-        func.sum(case((TransactionEntry.entry_type == EntryType.CREDIT, TransactionEntry.amount), else_=0))
-    ).filter(TransactionEntry.account_id == account_id).first()
-    
-    debit, credit = totals if totals else (0, 0)
+def get_transactions_after(db: Session, last_seq: int, limit: int = 500):
+    """Jurnal dengan change_seq > last_seq (urut change_seq), untuk stream SSE"""
+    return (
+        db.query(Transaction).options(selectinload(Transaction.entries))
+        .filter(Transaction.change_seq > last_seq).order_by(Transaction.change_seq).limit(limit).all()
+    )
+
+def current_change_seq(db: Session) -> int:
+    """Nomor urut perubahan terakhir; semua nomor <= nilai ini sudah commit (lihat next_change_seq)"""
+    return db.query(DataVersion.version).filter(DataVersion.scope == "changes").scalar() or 0
+
+# --- FEED PERUBAHAN (sinkronisasi client offline) ---
+
+SYNC_DEFAULT_LIMIT = 500
+SYNC_MAX_LIMIT = 2000
+
+def get_changes(db: Session, since: int = 0, limit: int = SYNC_DEFAULT_LIMIT) -> dict:
+    """
+    Akun & jurnal yang dibuat/diubah setelah nomor urut `since`, urut change_seq,
+    paling banyak `limit` item (akun + jurnal). Biaya sebanding jumlah perubahan
+    (index change_seq), bukan ukuran buku besar.
+    - next_since: isi ke `since` request berikutnya
+    - has_more: masih ada halaman berikutnya
+    - reset: `since` di depan server (misal database dipulihkan dari backup),
+      client perlu sinkronisasi ulang dari 0
+    - deleted_transactions: jurnal yang diarsipkan (tutup buku) setelah `since`;
+      tidak dikirim untuk since=0 (client belum punya salinan)
+    """
+    limit = min(max(limit, 1), SYNC_MAX_LIMIT)
+    # Dibaca SEBELUM data: semua nomor <= current sudah commit (lihat next_change_seq)
+    current = current_change_seq(db)
+    if since > current:
+        return {"since": since, "next_since": 0, "has_more": False, "reset": True, "accounts": [], "transactions": [],
+                "deleted_transactions": []}
+
+    accounts = db.query(Account).filter(Account.change_seq > since)\
+        .order_by(Account.change_seq).limit(limit + 1).all()
+    txs = db.query(Transaction).options(selectinload(Transaction.entries))\
+        .filter(Transaction.change_seq > since).order_by(Transaction.change_seq).limit(limit + 1).all()
+    deleted = db.query(ArchivedTransaction.change_seq, ArchivedTransaction.id)\
+        .filter(ArchivedTransaction.change_seq > since).order_by(ArchivedTransaction.change_seq).limit(limit + 1).all() if since else []
+
+    changes = sorted([(a.change_seq, 0, a) for a in accounts] + [(t.change_seq, 1, t) for t in txs]
+                     + [(seq, 2, tx_id) for seq, tx_id in deleted], key=lambda c: c[:2])
+    page, has_more = changes[:limit], len(changes) > limit
+    # Halaman terakhir: lompati celah nomor (penulisan yang di-rollback) sampai current
+    next_since = page[-1][0] if has_more else max([since, current] + [seq for seq, _, _ in page])
+    return {
+        "since": since,
+        "next_since": next_since,
+        "has_more": has_more,
+        "reset": False,
+        "accounts": [obj for _, kind, obj in page if kind == 0],
+        "transactions": [obj for _, kind, obj in page if kind == 1],
+        "deleted_transactions": [obj for _, kind, obj in page if kind == 2],
+    }
+
+def _normal_balance(account_type: AccountType, debit, credit) -> float:
+    """Saldo normal akun: Asset & Expense di Debit, sisanya di Kredit"""
     debit = debit or 0
     credit = credit or 0
+    if account_type in [AccountType.ASSET, AccountType.EXPENSE]:
+        return float(debit - credit)
+    return float(credit - debit)
+
+def search_transactions(db: Session, q: str, page: int = 1, per_page: int = 20, fuzzy: bool = False):
+    """
+    Cari jurnal berdasarkan keterangan / no bukti memakai index full-text.
+    - Default: setiap kata dicocokkan sebagai awalan (prefix), misal "listr" -> "Listrik"
+    - fuzzy=True: toleran salah ketik, diurutkan berdasarkan kemiripan trigram
+      (PostgreSQL pg_trgm; SQLite: FTS5 tokenizer trigram, jurnal yang berbagi
+      trigram terbanyak / terjarang di urutan atas menurut bm25). Seluruh
+      pengurutan & halaman dikerjakan database, jadi has_more selalu tepat.
+      Di SQLite kata kunci minimal 3 huruf.
+    Return: (list Transaction, has_more)
+    """
+    terms = re.findall(r"\w+", q.lower())
+    if not terms:
+        raise ValueError("Kata kunci pencarian kosong")
+
+    offset = (page - 1) * per_page
+    limit = per_page + 1  # ambil 1 lebih untuk tahu ada halaman berikutnya
+    dialect = db.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        if fuzzy:
+            phrase = " ".join(terms)
+            score = func.greatest(
+                func.similarity(Transaction.description, phrase),
+                func.similarity(func.coalesce(Transaction.reference_no, ""), phrase)
+            )
+            ids_query = db.query(Transaction.id).filter(
+                Transaction.description.op("%")(phrase) | Transaction.reference_no.op("%")(phrase)
+            ).order_by(score.desc(), Transaction.id.desc())
+        else:
+            tsquery = " & ".join(f"{t}:*" for t in terms)
+            ids_query = db.query(Transaction.id).filter(
+                literal_column(TRANSACTION_SEARCH_TSVECTOR).op("@@")(func.to_tsquery("simple", tsquery))
+            ).order_by(Transaction.id.desc())
+        ids = [row[0] for row in ids_query.offset(offset).limit(limit).all()]
+
+    elif dialect == "sqlite":
+        if fuzzy:
+            # Setiap trigram kata kunci sebagai frasa (OR); rank = bm25
+            trigrams = sorted({t[i:i + 3] for t in terms for i in range(len(t) - 2)})
+            if not trigrams:
+                raise ValueError("Pencarian fuzzy membutuhkan kata minimal 3 huruf")
+            ids = [row[0] for row in db.execute(
+                text("SELECT rowid FROM transactions_fts_trigram WHERE transactions_fts_trigram MATCH :match "
+                     "ORDER BY rank, rowid DESC LIMIT :limit OFFSET :offset"),
+                {"match": " OR ".join(f'"{t}"' for t in trigrams), "limit": limit, "offset": offset}
+            ).all()]
+        else:
+            match = " ".join(f'"{t}"*' for t in terms)
+            ids = [row[0] for row in db.execute(
+                text("SELECT rowid FROM transactions_fts WHERE transactions_fts MATCH :match "
+                     "ORDER BY rowid DESC LIMIT :limit OFFSET :offset"),
+                {"match": match, "limit": limit, "offset": offset}
+            ).all()]
+
+    else:
+        raise ValueError(f"Pencarian belum didukung untuk database {dialect}")
+
+    has_more = len(ids) > per_page
+    ids = ids[:per_page]
+
+    # Ambil jurnal + detailnya, pertahankan urutan hasil pencarian
+    txs = db.query(Transaction).options(selectinload(Transaction.entries)).filter(Transaction.id.in_(ids)).all()
+    by_id = {tx.id: tx for tx in txs}
+    return [by_id[i] for i in ids if i in by_id], has_more
+
+def calculate_balance(db: Session, account_id: int, account_type: AccountType) -> float:
+    """Helper internal untuk menghitung saldo satu akun"""
+    debit, credit = _account_totals(db, account_ids=[account_id]).get(account_id, (0, 0))
 
     # Rumus Saldo Normal:
     # Asset & Expense bertambah di Debit
-    if account_type in [AccountType.ASSET, AccountType.EXPENSE]:
-        return float(debit - credit)
     # Liability, Equity, Revenue bertambah di Kredit
-    else:
-        return float(credit - debit)
+    return _normal_balance(account_type, debit, credit)
+
+def _parse_as_of(as_of: str = None):
+    """Konversi 'YYYY-MM-DD' ke datetime akhir hari (23:59:59)"""
+    if not as_of:
+        return None
+    return datetime.strptime(as_of, "%Y-%m-%d").replace(hour=23, minute=59, second=59)
+
+# --- TAHUN BUKU & SALDO PINDAHAN (lihat api.closing) ---
+
+def fiscal_year_end(year: int) -> datetime:
+    """Batas akhir tahun buku; jurnal penutup diberi tanggal ini"""
+    return datetime(year, 12, 31, 23, 59, 59, 999999)
+
+def _carry_forward(db: Session, as_of_dt: datetime = None, account_ids=None):
+    """
+    Saldo pindahan tahun buku terakhir yang sudah ditutup s/d as_of_dt.
+    Return (tahun, batas akhir tahun, {account_id: AccountCarryForward}); (None, None, {}) jika belum ada
+    """
+    query = db.query(func.max(FiscalYear.year))
+    if as_of_dt:
+        last_year = as_of_dt.year if as_of_dt >= fiscal_year_end(as_of_dt.year) else as_of_dt.year - 1
+        query = query.filter(FiscalYear.year <= last_year)
+    year = query.scalar()
+    if year is None:
+        return None, None, {}
+
+    rows = db.query(AccountCarryForward).filter(AccountCarryForward.fiscal_year == year)
+    if account_ids is not None:
+        rows = rows.filter(AccountCarryForward.account_id.in_(account_ids))
+    return year, fiscal_year_end(year), {row.account_id: row for row in rows}
+
+def _sum_entries(db: Session, entry_model, tx_model, after_dt=None, as_of_dt=None, account_ids=None, closing=None) -> dict:
+    """
+    Total Debit & Kredit per akun dari tabel jurnal aktif / arsip dalam rentang (after_dt, as_of_dt].
+    closing: None = semua jurnal, False = tanpa jurnal penutup, True = hanya jurnal penutup
+    """
+    query = db.query(
+        entry_model.account_id,
+        func.sum(case((entry_model.entry_type == EntryType.DEBIT, entry_model.amount), else_=0)),
+        func.sum(case((entry_model.entry_type == EntryType.CREDIT, entry_model.amount), else_=0))
+    )
+    if after_dt or as_of_dt:
+        query = query.join(tx_model, entry_model.transaction_id == tx_model.id)
+    if after_dt:
+        query = query.filter(tx_model.transaction_date > after_dt)
+    if as_of_dt:
+        query = query.filter(tx_model.transaction_date <= as_of_dt)
+    if account_ids is not None:
+        query = query.filter(entry_model.account_id.in_(account_ids))
+    if closing is not None:
+        in_closing = entry_model.transaction_id.in_(
+            select(FiscalYear.closing_transaction_id).where(FiscalYear.closing_transaction_id.isnot(None))
+        )
+        query = query.filter(in_closing if closing else ~in_closing)
+    return {acc_id: (debit, credit) for acc_id, debit, credit in query.group_by(entry_model.account_id).all()}
+
+def _sum_journal(db: Session, after_dt=None, as_of_dt=None, account_ids=None, closing=None) -> dict:
+    """_sum_entries untuk jurnal aktif + arsip (arsip hanya dibaca jika rentangnya menyentuh tahun yang diarsipkan)"""
+    totals = {}
+    _add_totals(totals, _sum_entries(db, TransactionEntry, Transaction, after_dt, as_of_dt, account_ids, closing))
+    archived = db.query(FiscalYear.year).filter(FiscalYear.archived_at.isnot(None))
+    if after_dt:
+        archived = archived.filter(FiscalYear.year >= after_dt.year)
+    if as_of_dt:
+        archived = archived.filter(FiscalYear.year <= as_of_dt.year)
+    if archived.first():
+        _add_totals(totals, _sum_entries(db, ArchivedTransactionEntry, ArchivedTransaction, after_dt, as_of_dt, account_ids, closing))
+    return totals
+
+def _add_totals(totals: dict, more: dict):
+    for acc_id, (debit, credit) in more.items():
+        base_debit, base_credit = totals.get(acc_id, (0, 0))
+        totals[acc_id] = (base_debit + (debit or 0), base_credit + (credit or 0))
+
+def _account_totals(db: Session, as_of_dt: datetime = None, account_ids=None) -> dict:
+    """
+    Total Debit & Kredit semua akun (kumulatif sejak awal).
+    Dimulai dari saldo pindahan tahun buku terakhir yang ditutup, lalu
+    ditambah jurnal SETELAH tahun tersebut dalam SATU query GROUP BY,
+    jadi biaya laporan hanya sebanding dengan periode yang masih terbuka.
+    Jika as_of_dt diisi, hanya jurnal s/d tanggal tersebut yang dihitung
+    (memanfaatkan index transactions.transaction_date).
+    Return: {account_id: (debit, credit)}
+    """
+    year, cutoff, carry = _carry_forward(db, as_of_dt, account_ids)
+    totals = {acc_id: (row.debit_total, row.credit_total) for acc_id, row in carry.items()}
+    _add_totals(totals, _sum_entries(db, TransactionEntry, Transaction, cutoff, as_of_dt, account_ids))
+
+    # as_of di tengah tahun yang sudah diarsipkan: sisa periodenya ada di tabel arsip
+    if as_of_dt and db.query(FiscalYear.year).filter(
+        FiscalYear.archived_at.isnot(None), FiscalYear.year > (year or 0), FiscalYear.year <= as_of_dt.year
+    ).first():
+        _add_totals(totals, _sum_entries(db, ArchivedTransactionEntry, ArchivedTransaction, cutoff, as_of_dt, account_ids))
+    return totals
 
-def generate_balance_sheet(db: Session):
+def _balances_by_type(accounts, totals: dict) -> dict:
+    """Kelompokkan saldo normal akun per tipe: {AccountType: [(account, saldo), ...]}"""
+    balances = {t: [] for t in AccountType}
+    for acc in accounts:
+        debit, credit = totals.get(acc.id, (0, 0))
+        balances[acc.account_type].append((acc, _normal_balance(acc.account_type, debit, credit)))
+    return balances
+
+def generate_balance_sheet(db: Session, as_of: str = None):
+    """
+    Neraca per tanggal tertentu (as_of, format YYYY-MM-DD).
+    Tanpa as_of = posisi saat ini, report_date akhir hari ini (stabil sepanjang hari,
+    sehingga bisa di-cache per versi data + tanggal).
+    """
+    as_of_dt = _parse_as_of(as_of)
+
+    # Saldo semua akun dihitung sekali (bukan 1 query per akun)
+    totals = _account_totals(db, as_of_dt)
+    balances = _balances_by_type(db.query(Account).order_by(Account.code).all(), totals)
+    return _build_balance_sheet(balances, as_of_dt or datetime.now().replace(hour=23, minute=59, second=59, microsecond=0))
+
+def _build_balance_sheet(balances: dict, report_dt: datetime):
+    """Susun struktur neraca dari saldo yang sudah dihitung (lihat _balances_by_type)"""
     # 1. Hitung ASSETS
-    asset_accounts = db.query(Account).filter(Account.account_type == AccountType.ASSET).all()
     assets_list = []
     total_assets = 0
-    for acc in asset_accounts:
-        bal = calculate_balance(db, acc.id, acc.account_type)
+    for acc, bal in balances[AccountType.ASSET]:
         if bal != 0:
             assets_list.append({"account_name": acc.name, "amount": bal})
             total_assets += bal
 
     # 2. Hitung LIABILITIES
-    liab_accounts = db.query(Account).filter(Account.account_type == AccountType.LIABILITY).all()
     liab_list = []
     total_liabilities = 0
-    for acc in liab_accounts:
-        bal = calculate_balance(db, acc.id, acc.account_type)
+    for acc, bal in balances[AccountType.LIABILITY]:
         if bal != 0:
             liab_list.append({"account_name": acc.name, "amount": bal})
             total_liabilities += bal
 
     # 3. Hitung EQUITY (Modal Awal)
-    equity_accounts = db.query(Account).filter(Account.account_type == AccountType.EQUITY).all()
     equity_list = []
     total_base_equity = 0
-    for acc in equity_accounts:
-        bal = calculate_balance(db, acc.id, acc.account_type)
+    for acc, bal in balances[AccountType.EQUITY]:
         equity_list.append({"account_name": acc.name, "amount": bal})
         total_base_equity += bal
 
     # 4. Hitung SURPLUS/DEFISIT BERJALAN (Revenue - Expense)
     # Ini penting agar Balance Sheet seimbang
-    rev_accounts = db.query(Account).filter(Account.account_type == AccountType.REVENUE).all()
-    exp_accounts = db.query(Account).filter(Account.account_type == AccountType.EXPENSE).all()
-    
-    total_revenue = sum([calculate_balance(db, a.id, a.account_type) for a in rev_accounts])
-    total_expense = sum([calculate_balance(db, a.id, a.account_type) for a in exp_accounts])
+    total_revenue = sum(bal for _, bal in balances[AccountType.REVENUE])
+    total_expense = sum(bal for _, bal in balances[AccountType.EXPENSE])
     
     current_earnings = total_revenue - total_expense
     
@@ -117,7 +673,7 @@ def generate_balance_sheet(db: Session):
     is_balance = abs(diff) < 0.01
 
     return {
-        "report_date": datetime.now().isoformat(),
+        "report_date": report_dt.isoformat(),
         "assets": assets_list,
         "total_assets": total_assets,
         "liabilities": liab_list,
@@ -128,7 +684,101 @@ def generate_balance_sheet(db: Session):
         "diff": diff
     }
 
-def get_general_ledger(db: Session, account_id: int, start_date: str = None, end_date: str = None):
+def generate_income_statement(db: Session, start: str = None, end: str = None):
+    """
+    Laporan Laba Rugi (Pendapatan - Beban) periode [start, end] (format YYYY-MM-DD).
+    Default: awal tahun berjalan s/d hari ini. Jurnal penutup tahun buku tidak ikut.
+    Dihitung dari ringkasan bulanan (lihat get_period_totals).
+    """
+    now = datetime.now()
+    start_dt = datetime.strptime(start, "%Y-%m-%d") if start else datetime(now.year, 1, 1)
+    end_dt = _parse_as_of(end) or now.replace(hour=23, minute=59, second=59, microsecond=0)
+    if start_dt > end_dt:
+        raise ValueError("start harus sebelum end")
+
+    totals = get_period_totals(db, start_dt, end_dt, include_closing=False)
+    accounts = db.query(Account).filter(
+        Account.account_type.in_([AccountType.REVENUE, AccountType.EXPENSE])
+    ).order_by(Account.code).all()
+    balances = _balances_by_type(accounts, totals)
+
+    revenues = [{"account_name": acc.name, "amount": bal} for acc, bal in balances[AccountType.REVENUE] if bal != 0]
+    expenses = [{"account_name": acc.name, "amount": bal} for acc, bal in balances[AccountType.EXPENSE] if bal != 0]
+    total_revenue = sum(item["amount"] for item in revenues)
+    total_expense = sum(item["amount"] for item in expenses)
+    return {
+        "period_start": start_dt.date().isoformat(),
+        "period_end": end_dt.date().isoformat(),
+        "revenues": revenues,
+        "total_revenue": total_revenue,
+        "expenses": expenses,
+        "total_expense": total_expense,
+        "surplus": total_revenue - total_expense,
+    }
+
+def generate_dashboard(db: Session, recent_limit: int = 5):
+    """
+    Angka utama halaman depan dalam satu kali jalan:
+    saldo kas per akun aset, pendapatan & beban bulan berjalan, total neraca,
+    dan N jurnal terakhir.
+    Semua saldo berasal dari SATU query GROUP BY + satu query jurnal terbaru.
+    """
+    now = datetime.now()
+    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    is_debit = TransactionEntry.entry_type == EntryType.DEBIT
+    in_month = Transaction.transaction_date >= month_start
+
+    # Saldo pindahan tahun buku terakhir + jurnal periode terbuka
+    _, cutoff, carry = _carry_forward(db)
+    query = db.query(
+        TransactionEntry.account_id,
+        func.sum(case((is_debit, TransactionEntry.amount), else_=0)),
+        func.sum(case((~is_debit, TransactionEntry.amount), else_=0)),
+        func.sum(case((is_debit & in_month, TransactionEntry.amount), else_=0)),
+        func.sum(case((~is_debit & in_month, TransactionEntry.amount), else_=0))
+    ).join(Transaction)
+    if cutoff:
+        query = query.filter(Transaction.transaction_date > cutoff)
+    rows = query.group_by(TransactionEntry.account_id).all()
+
+    totals = {acc_id: (row.debit_total, row.credit_total) for acc_id, row in carry.items()}
+    _add_totals(totals, {acc_id: (debit, credit) for acc_id, debit, credit, _, _ in rows})
+    mtd_totals = {acc_id: (debit, credit) for acc_id, _, _, debit, credit in rows}
+
+    accounts = db.query(Account).order_by(Account.code).all()
+    balances = _balances_by_type(accounts, totals)
+    mtd_balances = _balances_by_type(accounts, mtd_totals)
+    balance_sheet = _build_balance_sheet(balances, now)
+
+    recent = db.query(Transaction).options(selectinload(Transaction.entries))\
+        .order_by(Transaction.transaction_date.desc(), Transaction.id.desc())\
+        .limit(recent_limit).all()
+
+    cash_balances = [{"account_name": acc.name, "amount": bal} for acc, bal in balances[AccountType.ASSET]]
+
+    return {
+        "report_date": now.isoformat(),
+        "cash_balances": cash_balances,
+        "total_cash": sum(item["amount"] for item in cash_balances),
+        "month_to_date_revenue": sum(bal for _, bal in mtd_balances[AccountType.REVENUE]),
+        "month_to_date_expense": sum(bal for _, bal in mtd_balances[AccountType.EXPENSE]),
+        "total_assets": balance_sheet["total_assets"],
+        "total_liabilities": balance_sheet["total_liabilities"],
+        "total_equities": balance_sheet["total_equities"],
+        "is_balance": balance_sheet["is_balance"],
+        "recent_transactions": recent
+    }
+
+def get_general_ledger(db: Session, account_id: int, start_date: str = None, end_date: str = None,
+                       after: str = None, limit: int = None):
+    """
+    Buku besar satu akun.
+    Saldo berjalan = saldo awal bulan (month_openings) + running_balance yang
+    tersimpan di setiap entry, jadi halaman mana pun bisa diambil tanpa
+    menghitung entry sebelumnya:
+    - limit: jumlah entry per halaman (kosong = seluruh periode)
+    - after: cursor dari next_cursor halaman sebelumnya (keyset pagination)
+    """
     # 1. Ambil Info Akun
     account = db.get(Account, account_id)
     if not account:
@@ -137,69 +787,79 @@ def get_general_ledger(db: Session, account_id: int, start_date: str = None, end
     # Konversi string date ke object datetime (jika ada)
     # Asumsi format input "YYYY-MM-DD"
     start_dt = datetime.strptime(start_date, "%Y-%m-%d") if start_date else None
-    end_dt = datetime.strptime(end_date, "%Y-%m-%d") if end_date else None
+    # Set ke akhir hari (23:59:59) agar transaksi hari itu masuk semua
+    end_dt = _parse_as_of(end_date)
 
-    # Tentukan faktor pengali berdasarkan tipe akun
-    # Asset/Expense: Debit menambah (+), Kredit mengurangi (-)
-    # Liability/Equity/Revenue: Kredit menambah (+), Debit mengurangi (-)
-    is_normal_debit = account.account_type in [AccountType.ASSET, AccountType.EXPENSE]
+    # running_balance disimpan sebagai (Debit - Kredit) sejak awal bulan entry.
+    # Asset/Expense: saldo normal = nilai tsb; Liability/Equity/Revenue: dibalik tandanya
+    sign = 1 if account.account_type in [AccountType.ASSET, AccountType.EXPENSE] else -1
 
-    # 2. Hitung OPENING BALANCE (Saldo Awal)
-    # Yaitu total semua transaksi SEBELUM start_date
-    opening_balance = 0.0
-    
+    # Jurnal tahun yang sudah diarsipkan tidak ada lagi di tabel aktif
+    archived_year = db.query(func.max(FiscalYear.year)).filter(FiscalYear.archived_at.isnot(None)).scalar()
+    if archived_year is not None and start_dt and start_dt <= fiscal_year_end(archived_year):
+        raise ValueError(f"Periode s/d tahun {archived_year} sudah diarsipkan")
+
+    def carried_balance(as_of_dt=None):
+        row = _carry_forward(db, as_of_dt, [account_id])[2].get(account_id)
+        return sign * float(row.running_balance) if row else 0.0
+
+    def full_balance(seq, running_balance, openings):
+        return sign * float(openings[seq // MONTH_SEQ_SPAN] + Decimal(str(running_balance)))
+
+    def balance_before(filter_, as_of_dt=None):
+        row = db.query(TransactionEntry.account_seq, TransactionEntry.running_balance).join(Transaction).filter(
+            TransactionEntry.account_id == account_id, filter_
+        ).order_by(TransactionEntry.account_seq.desc()).first()
+        if row is None:
+            # Belum ada entry aktif s/d tanggal tsb: saldo pindahan tahun buku terakhir
+            return carried_balance(as_of_dt)
+        return full_balance(row.account_seq, row.running_balance,
+                            month_openings(db, account_id, [row.account_seq // MONTH_SEQ_SPAN]))
+
+    # 2. OPENING BALANCE (Saldo Awal) = saldo entry terakhir SEBELUM start_date
     if start_dt:
-        # Query transaksi sebelum tanggal mulai
-        hist_query = db.query(TransactionEntry).join(Transaction).filter(
-            TransactionEntry.account_id == account_id,
-            Transaction.transaction_date < start_dt
-        )
-        
-        # Hitung manual (atau pakai func.sum sql)
-        for entry in hist_query.all():
-            amount = float(entry.amount)
-            if entry.entry_type == EntryType.DEBIT:
-                opening_balance += amount if is_normal_debit else -amount
-            else: # CREDIT
-                opening_balance -= amount if is_normal_debit else +amount
-
-    # 3. Ambil Transaksi PERIODE BERJALAN
-    query = db.query(TransactionEntry).join(Transaction).filter(
+        opening_balance = balance_before(Transaction.transaction_date < start_dt, start_dt - timedelta(microseconds=1))
+    else:
+        opening_balance = carried_balance(fiscal_year_end(archived_year)) if archived_year is not None else 0.0
+
+    # CLOSING BALANCE = saldo entry terakhir s/d end_date
+    closing_balance = balance_before(Transaction.transaction_date <= end_dt, end_dt) if end_dt else \
+        balance_before(TransactionEntry.account_seq.isnot(None))
+
+    # 3. Ambil Transaksi PERIODE BERJALAN (urut account_seq)
+    query = db.query(TransactionEntry).join(Transaction).options(selectinload(TransactionEntry.transaction)).filter(
         TransactionEntry.account_id == account_id
     )
 
     if start_dt:
         query = query.filter(Transaction.transaction_date >= start_dt)
     if end_dt:
-        # Set ke akhir hari (23:59:59) agar transaksi hari itu masuk semua
-        end_dt = end_dt.replace(hour=23, minute=59, second=59)
         query = query.filter(Transaction.transaction_date <= end_dt)
+    if after:
+        query = query.filter(TransactionEntry.account_seq > int(after))
 
-    # Urutkan berdasarkan tanggal
-    entries_db = query.order_by(Transaction.transaction_date.asc(), Transaction.id.asc()).all()
+    query = query.order_by(TransactionEntry.account_seq.asc())
+    if limit:
+        query = query.limit(limit + 1)
+    entries_db = query.all()
 
-    # 4. Susun Data & Hitung Running Balance
-    ledger_entries = []
-    current_balance = opening_balance
+    next_cursor = None
+    if limit and len(entries_db) > limit:
+        entries_db = entries_db[:limit]
+        next_cursor = str(entries_db[-1].account_seq)
 
+    # 4. Susun Data (saldo awal bulan halaman ini + running_balance)
+    openings = month_openings(db, account_id, [entry.account_seq // MONTH_SEQ_SPAN for entry in entries_db])
+    ledger_entries = []
     for entry in entries_db:
         amount = float(entry.amount)
-        debit_amt = amount if entry.entry_type == EntryType.DEBIT else 0
-        credit_amt = amount if entry.entry_type == EntryType.CREDIT else 0
-
-        # Update Saldo Berjalan
-        if is_normal_debit:
-            current_balance += (debit_amt - credit_amt)
-        else:
-            current_balance += (credit_amt - debit_amt)
-
         ledger_entries.append({
             "transaction_date": entry.transaction.transaction_date,
             "description": entry.transaction.description,
             "reference_no": entry.transaction.reference_no,
-            "debit": debit_amt,
-            "credit": credit_amt,
-            "balance": current_balance
+            "debit": amount if entry.entry_type == EntryType.DEBIT else 0,
+            "credit": amount if entry.entry_type == EntryType.CREDIT else 0,
+            "balance": full_balance(entry.account_seq, entry.running_balance, openings)
         })
 
     return {
@@ -209,6 +869,92 @@ def get_general_ledger(db: Session, account_id: int, start_date: str = None, end
         "period_start": start_date,
         "period_end": end_date,
         "opening_balance": opening_balance,
-        "closing_balance": current_balance,
-        "entries": ledger_entries
-    }
\ No newline at end of file
+        "closing_balance": closing_balance,
+        "entries": ledger_entries,
+        "next_cursor": next_cursor
+    }
+
+MAX_LEDGER_ACCOUNTS = 500
+
+def get_multi_ledger(db: Session, account_ids=None, account_types=None, start_date: str = None, end_date: str = None):
+    """
+    Buku besar banyak akun sekaligus (misal semua akun Aset & Beban untuk audit tahunan).
+    - Saldo awal semua akun dihitung dalam satu query GROUP BY (lihat _account_totals)
+    - Saldo berjalan dihitung database: SUM() OVER (PARTITION BY akun ORDER BY tanggal, id)
+    Return (info, rows): info = {period_start, period_end, accounts: [dict akun + opening_balance]},
+    rows = iterator (account_id, entry) urut per akun (kode), dibaca bertahap dari database.
+    """
+    query = db.query(Account)
+    if account_ids:
+        query = query.filter(Account.id.in_(account_ids))
+    if account_types:
+        query = query.filter(Account.account_type.in_([AccountType(t) for t in account_types]))
+    accounts = query.order_by(Account.code).all()
+    if account_ids and len(accounts) != len(set(account_ids)):
+        missing = sorted(set(account_ids) - {a.id for a in accounts})
+        raise ValueError(f"Akun tidak ditemukan: {', '.join(map(str, missing))}")
+    if not accounts:
+        raise ValueError("Tidak ada akun yang dipilih")
+    if len(accounts) > MAX_LEDGER_ACCOUNTS:
+        raise ValueError(f"Maksimal {MAX_LEDGER_ACCOUNTS} akun per laporan")
+
+    start_dt = datetime.strptime(start_date, "%Y-%m-%d") if start_date else None
+    end_dt = _parse_as_of(end_date)
+
+    archived_year = db.query(func.max(FiscalYear.year)).filter(FiscalYear.archived_at.isnot(None)).scalar()
+    if archived_year is not None and start_dt and start_dt <= fiscal_year_end(archived_year):
+        raise ValueError(f"Periode s/d tahun {archived_year} sudah diarsipkan")
+
+    # 1. Saldo awal (Debit - Kredit) semua akun sekaligus
+    ids = [a.id for a in accounts]
+    opening_dt = start_dt - timedelta(microseconds=1) if start_dt else (
+        fiscal_year_end(archived_year) if archived_year is not None else None)
+    totals = _account_totals(db, opening_dt, ids) if opening_dt else {}
+    opening = {acc_id: float((debit or 0) - (credit or 0)) for acc_id, (debit, credit) in totals.items()}
+
+    signs = {a.id: 1 if a.account_type in [AccountType.ASSET, AccountType.EXPENSE] else -1 for a in accounts}
+    info = {
+        "period_start": start_date,
+        "period_end": end_date,
+        "accounts": [{
+            "account_id": a.id,
+            "account_code": a.code,
+            "account_name": a.name,
+            "account_type": a.account_type.value,
+            "opening_balance": signs[a.id] * opening.get(a.id, 0.0),
+        } for a in accounts],
+    }
+
+    # 2. Mutasi periode + saldo berjalan per akun (window function di database)
+    signed = case((TransactionEntry.entry_type == EntryType.DEBIT, TransactionEntry.amount), else_=-TransactionEntry.amount)
+    running = func.sum(signed).over(
+        partition_by=TransactionEntry.account_id,
+        order_by=(Transaction.transaction_date, Transaction.id, TransactionEntry.id),
+        rows=(None, 0)
+    )
+    stmt = select(
+        TransactionEntry.account_id, Transaction.transaction_date, Transaction.description, Transaction.reference_no,
+        TransactionEntry.entry_type, TransactionEntry.amount, running.label("running")
+    ).join(Transaction, TransactionEntry.transaction_id == Transaction.id).where(TransactionEntry.account_id.in_(ids))
+    if start_dt:
+        stmt = stmt.where(Transaction.transaction_date >= start_dt)
+    if end_dt:
+        stmt = stmt.where(Transaction.transaction_date <= end_dt)
+    stmt = stmt.join(Account, TransactionEntry.account_id == Account.id).order_by(
+        Account.code, Transaction.transaction_date, Transaction.id, TransactionEntry.id
+    ).execution_options(yield_per=1000)
+
+    def rows():
+        for row in db.execute(stmt):
+            amount = float(row.amount)
+            sign = signs[row.account_id]
+            yield row.account_id, {
+                "transaction_date": row.transaction_date,
+                "description": row.description,
+                "reference_no": row.reference_no,
+                "debit": amount if row.entry_type == EntryType.DEBIT else 0,
+                "credit": amount if row.entry_type == EntryType.CREDIT else 0,
+                "balance": sign * (opening.get(row.account_id, 0.0) + float(row.running)),
+            }
+
+    return info, rows()
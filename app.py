@@ -1,16 +1,32 @@
-from flask import Flask, jsonify, request
-from flasgger import Swagger
-from core.database import SessionLocal, engine, Base
-from api import schemas, services
+import hashlib
+import os
+import sys
+import threading
+from datetime import date, datetime, timezone
+from functools import wraps
+import click
+from flask import Flask, Blueprint, Response, current_app, g, jsonify, request
+from core.database import SessionLocal, Base, replica_router, write_queue
+from api import schemas, services, reconciliation, closing, coa
 from models.user import User
-from core.security import hash_password, verify_password, create_access_token, token_required
+from core.security import hash_password, verify_password, create_access_token, token_required, admin_required
 from pydantic import ValidationError
+from core.jobs import report_queue, QueueFull
+from core.events import journal_events
+from core.admission import admission
+from core.audit import audit_log, audited
+from core.profiling import profiler
+from core.compression import report_cache
+from core import compression
+from core.metrics import metrics
+from api.jobs import REPORTS, run_integrity
+from api import integrity
 
-# Inisialisasi App
-app = Flask(__name__)
+# Semua route API didaftarkan di blueprint ini, app dibuat lewat create_app()
+bp = Blueprint('api', __name__)
 
 # --- KONFIGURASI SWAGGER ---
-app.config['SWAGGER'] = {
+SWAGGER_CONFIG = {
     'title': 'Masjid Finance API',
     'uiversion': 3
 }
@@ -33,10 +49,42 @@ swagger_template = {
     }
 }
 
-swagger = Swagger(app, template=swagger_template)
+# Path yang dilayani Flasgger (UI, static, spec JSON)
+SWAGGER_PATHS = ('/apidocs', '/apispec_1.json', '/flasgger_static', '/oauth2-redirect.html')
+
+class LazySwagger:
+    """
+    WSGI middleware: request ke halaman dokumentasi diteruskan ke app Flasgger
+    terpisah yang baru dibuat (dan spec-nya di-cache) saat pertama kali diakses.
+    App dokumentasi mendaftarkan blueprint API yang sama, sehingga spec-nya
+    identik, tapi boot worker tidak perlu memuat Flasgger sama sekali.
+    """
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+        self._docs_app = None
+        self._lock = threading.Lock()
+
+    @property
+    def docs_app(self):
+        if self._docs_app is None:
+            with self._lock:
+                if self._docs_app is None:
+                    from flasgger import Swagger
+
+                    docs_app = Flask(__name__)
+                    docs_app.config['SWAGGER'] = SWAGGER_CONFIG
+                    docs_app.register_blueprint(bp)
+                    Swagger(docs_app, template=swagger_template)
+                    self._docs_app = docs_app
+        return self._docs_app
+
+    def __call__(self, environ, start_response):
+        if environ.get('PATH_INFO', '').startswith(SWAGGER_PATHS):
+            return self.docs_app(environ, start_response)
+        return self.wsgi_app(environ, start_response)
 
 # Middleware untuk DB Session
-@app.teardown_appcontext
 def shutdown_session(exception=None):
     """Menutup koneksi database setiap request selesai"""
     # Catatan: SessionLocal harus dikelola manual atau pakai Flask-SQLAlchemy
@@ -47,11 +95,129 @@ def get_db():
     """Helper manual untuk route"""
     return SessionLocal()
 
+VERSION_SCOPES = ("accounts", "ledger")
+
+def format_versions(versions: dict) -> str:
+    """{'accounts': (3, ts), 'ledger': (12, ts)} -> 'accounts=3,ledger=12'"""
+    return ",".join(f"{scope}={v[0]}" for scope, v in versions.items())
+
+def parse_versions(header: str) -> dict:
+    """'accounts=3,ledger=12' -> {'accounts': 3, 'ledger': 12} (bagian yang salah format diabaikan)"""
+    versions = {}
+    for part in (header or "").split(","):
+        scope, _, value = part.strip().partition("=")
+        if scope in VERSION_SCOPES and value.isdigit():
+            versions[scope] = int(value)
+    return versions
+
+def get_read_db():
+    """
+    Session untuk endpoint baca (laporan & daftar).
+    Memakai read replica jika dikonfigurasi dan cukup mutakhir; selain itu primary.
+    Read-your-writes: client mengirim ulang header X-Data-Version dari respons
+    penulisan terakhir sebagai X-Min-Data-Version, atau X-Read-Primary: 1.
+    Database dipilih sekali per request (disimpan di g): ETag conditional_get dan
+    body laporan selalu dibaca dari database yang sama.
+    """
+    factory = g.get("read_session_factory")
+    if factory is None:
+        if replica_router.enabled and request.headers.get('X-Read-Primary') != '1':
+            factory = replica_router.session_factory(parse_versions(request.headers.get('X-Min-Data-Version')))
+        g.read_session_factory = factory = factory or SessionLocal
+    return factory()
+
+def with_data_version(resp, db):
+    """Tambahkan header X-Data-Version (versi data setelah penulisan) ke respons"""
+    resp.headers['X-Data-Version'] = format_versions(services.get_versions(db, *VERSION_SCOPES))
+    return resp
+
+def _versions_unchanged(scopes, versions: dict) -> bool:
+    db = get_read_db()
+    try:
+        return services.get_versions(db, *scopes) == versions
+    finally:
+        db.close()
+
+def report_day() -> date:
+    """Tanggal hari ini untuk laporan yang default-nya bergantung waktu (mudah di-patch di test)"""
+    return date.today()
+
+def conditional_get(*scopes, last_modified=False, primary=False, daily=False):
+    """
+    Decorator ETag untuk endpoint GET.
+    ETag dihitung dari versi data (lihat services.bump_version) + URL request,
+    sehingga jika client mengirim If-None-Match yang sama langsung dibalas 304
+    tanpa menjalankan query laporan maupun serialisasi JSON.
+    primary=True: versi & body selalu dibaca dari primary (bukan replica).
+    daily=True: laporan dengan default tanggal dari hari ini (neraca per hari ini,
+    laba rugi tahun berjalan, pivot s/d bulan ini); tanggal hari ini ikut ETag &
+    kunci cache, jadi pergantian hari/bulan/tahun tanpa penulisan tidak membekukan laporan.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if primary:
+                g.read_session_factory = SessionLocal
+            # Versi dibaca dari database yang sama dengan yang melayani laporan
+            db = get_read_db()
+            try:
+                versions = services.get_versions(db, *scopes)
+            finally:
+                db.close()
+
+            version_tag = "-".join(str(versions[scope][0]) for scope in scopes)
+            day = report_day() if daily else None
+            if day:
+                version_tag += f"-{day:%Y%m%d}"
+            url_hash = hashlib.sha1(request.full_path.encode('utf-8')).hexdigest()[:12]
+            etag = f"{version_tag}-{url_hash}"
+
+            # Last-Modified (resolusi detik) hanya jika detik versi terakhir sudah lewat: penulisan
+            # berikutnya pasti jatuh di detik yang lebih baru, jadi If-Modified-Since tidak memberi
+            # 304 basi. Versi dari detik berjalan hanya divalidasi lewat ETag.
+            modified = [ts for _, ts in versions.values() if ts]
+            latest = max(modified) if last_modified and modified else None
+            modified_at = latest.astimezone(timezone.utc).replace(microsecond=0) \
+                if latest and latest < datetime.now().replace(microsecond=0) else None
+
+            # Weak comparison: respons terkompresi memakai W/"etag" (lihat core.compression)
+            not_modified = request.if_none_match.contains_weak(etag) or (
+                not request.if_none_match and modified_at and request.if_modified_since
+                and modified_at <= request.if_modified_since
+            )
+            # Body laporan di-cache per versi data + URL (waktu versi: database yang dibuat ulang tidak tertukar)
+            cache_key = f"{etag}|{'|'.join(str(ts) for _, ts in versions.values())}"
+            cached = None if not_modified else report_cache.get(cache_key)
+            if not_modified:
+                resp = current_app.response_class(status=304)
+            elif cached is not None:
+                metrics.incr("report_cache.hit")
+                resp = current_app.response_class(cached[1], mimetype=cached[0])
+                g.report_cache_key = cache_key
+            else:
+                resp = current_app.make_response(f(*args, **kwargs))
+                if resp.status_code != 200:
+                    return resp
+                # Di-cache hanya jika versi data tidak berubah selama laporan dibuat
+                # (body persis milik ETag ini, bukan penulisan yang masuk di tengah jalan)
+                if not resp.is_streamed and _versions_unchanged(scopes, versions) \
+                        and (not daily or report_day() == day):
+                    report_cache.put(cache_key, "identity", resp.get_data(), resp.mimetype)
+                    g.report_cache_key = cache_key
+
+            resp.set_etag(etag)
+            if modified_at:
+                resp.last_modified = modified_at
+            return resp
+        return decorated
+    return decorator
+
 # --- ROUTES AKUN (COA) ---
 
-@app.route('/accounts', methods=['GET'])
+@bp.route('/accounts', methods=['GET'])
+@conditional_get("accounts", last_modified=True)
 def list_accounts():
-    db = get_db()
+    db = get_read_db()
     try:
         accounts = services.get_all_accounts(db)
         # Konversi object SQLAlchemy -> Pydantic -> Dict
@@ -59,23 +225,8 @@ def list_accounts():
     finally:
         db.close()
 
-# --- FUNGSI BANTUAN SEED ADMIN ---
-def create_default_admin():
-    db = SessionLocal()
-    try:
-        # Cek apakah user admin sudah ada
-        user = db.query(User).filter_by(username="admin").first()
-        if not user:
-            print("Membuat user default: admin / admin123")
-            hashed = hash_password("admin123")
-            new_admin = User(username="admin", password_hash=hashed, role="admin")
-            db.add(new_admin)
-            db.commit()
-    finally:
-        db.close()
-
 # --- ROUTE AUTH (LOGIN) ---
-@app.route('/auth/login', methods=['POST'])
+@bp.route('/auth/login', methods=['POST'])
 def login():
     """
     Login User Admin
@@ -133,17 +284,19 @@ def login():
     finally:
         db.close()
 
-@app.route('/accounts', methods=['POST'])
+@bp.route('/accounts', methods=['POST'])
 @token_required
+@admission.limit("accounts-write", write=True)
+@audited("account")
 def add_account():
     db = get_db()
     try:
         # 1. Validasi JSON masuk
         payload = schemas.AccountCreate(**request.json)
         # 2. Simpan ke DB
-        new_acc = services.create_account(db, payload)
+        new_acc = write_queue.run(services.create_account, db, payload)
         # 3. Return response
-        return jsonify(schemas.AccountResponse.model_validate(new_acc).model_dump()), 201
+        return with_data_version(jsonify(schemas.AccountResponse.model_validate(new_acc).model_dump()), db), 201
     except ValidationError as e:
         return jsonify(e.errors()), 400
     except Exception as e:
@@ -151,10 +304,75 @@ def add_account():
     finally:
         db.close()
 
+@bp.route('/accounts/import', methods=['POST'])
+@token_required
+@admission.limit("accounts-write", write=True)
+@audited("account_import")
+def import_accounts():
+    """
+    Import COA Massal (CSV / JSON)
+    Upsert berdasarkan kode akun; import ulang file yang sama tidak mengubah apa pun.
+    ---
+    tags:
+      - Accounts
+    security:
+      - Bearer: []
+    consumes:
+      - multipart/form-data
+      - application/json
+    parameters:
+      - in: formData
+        name: file
+        type: file
+        required: false
+        description: CSV (kolom kode, nama, tipe, keterangan) atau JSON list akun
+      - in: query
+        name: format
+        type: string
+        enum: ['csv', 'json']
+        required: false
+        description: Kosong = dideteksi dari nama / isi file
+      - in: query
+        name: dry_run
+        type: boolean
+        required: false
+        description: Hanya validasi & hitung perubahan, tanpa menyimpan
+    responses:
+      200:
+        description: Jumlah akun dibuat, diubah & tidak berubah
+      400:
+        description: Ada baris tidak valid (semua kesalahan dilaporkan)
+    """
+    upload = request.files.get('file')
+    if upload is not None:
+        filename, raw = upload.filename, upload.read()
+    else:
+        filename, raw = None, request.get_data()
+    if not raw:
+        return jsonify({"message": "File COA kosong"}), 400
+
+    db = get_db()
+    try:
+        content = raw.decode('utf-8-sig', errors='replace')
+        fmt = request.args.get('format') or coa.detect_format(filename, content)
+        dry_run = request.args.get('dry_run', '').lower() in ('1', 'true', 'yes')
+        result = write_queue.run(coa.import_file, db, content, fmt, dry_run)
+        return with_data_version(jsonify(schemas.AccountImportResult(**result).model_dump()), db)
+    except ValueError as e:
+        db.rollback()
+        return jsonify({"message": str(e)}), 400
+    except Exception as e:
+        db.rollback()
+        return jsonify({"error": str(e)}), 500
+    finally:
+        db.close()
+
 # --- ROUTES TRANSAKSI ---
 
-@app.route('/transactions', methods=['POST'])
+@bp.route('/transactions', methods=['POST'])
 @token_required
+@admission.limit("transactions-write", write=True)
+@audited("transaction")
 def add_transaction():
     """
     Tambah Transaksi Baru (Jurnal Umum)
@@ -207,10 +425,14 @@ def add_transaction():
         # Validasi Input (termasuk cek Balance Debit == Kredit)
         payload = schemas.TransactionCreate(**request.json)
         
-        # Simpan
-        new_tx = services.create_transaction(db, payload)
+        # Simpan (GROUP_COMMIT=1: digabung dengan posting lain dalam satu commit)
+        if services.journal_writer.enabled:
+            result = services.create_transaction_grouped(payload)
+        else:
+            new_tx = write_queue.run(services.create_transaction, db, payload)
+            result = schemas.TransactionResponse.model_validate(new_tx)
         
-        return jsonify(schemas.TransactionResponse.model_validate(new_tx).model_dump()), 201
+        return with_data_version(jsonify(result.model_dump()), db), 201
     except ValidationError as e:
         return jsonify({"message": "Validasi Gagal", "details": e.errors()}), 400
     except ValueError as e:
@@ -221,18 +443,217 @@ def add_transaction():
     finally:
         db.close()
 
-@app.route('/transactions', methods=['GET'])
+@bp.route('/transactions', methods=['GET'])
+@conditional_get("ledger", last_modified=True)
 def list_transactions():
-    db = get_db()
+    db = get_read_db()
     try:
         txs = services.get_transactions(db)
         return jsonify([schemas.TransactionResponse.model_validate(t).model_dump() for t in txs])
     finally:
         db.close()
 
+SSE_KEEPALIVE_SECONDS = float(os.getenv("SSE_KEEPALIVE_SECONDS", "15"))
+SSE_POLL_SECONDS = float(os.getenv("SSE_POLL_SECONDS", "1"))
+SSE_REPLAY_LIMIT = 500
+
+def format_sse(event: str, data: str, event_id=None) -> str:
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines += [f"event: {event}", f"data: {data}"]
+    return "\n".join(lines) + "\n\n"
+
+def _journal_changes(after_seq: int) -> list:
+    """Sumber event SSE: jurnal yang sudah commit (worker mana pun) dengan change_seq > after_seq"""
+    db = SessionLocal()
+    try:
+        return [(t.change_seq, t.id, "journal", schemas.TransactionResponse.model_validate(t).model_dump_json())
+                for t in services.get_transactions_after(db, after_seq, SSE_REPLAY_LIMIT)]
+    finally:
+        db.close()
+
+journal_events.poll_from(_journal_changes, SSE_POLL_SECONDS)
+
+@bp.route('/transactions/stream', methods=['GET'])
+def stream_transactions():
+    """
+    Stream Jurnal Baru (Server-Sent Events)
+    Setiap jurnal yang baru di-commit dikirim sekali sebagai event `journal`
+    (id event = nomor urut perubahan / change_seq jurnal, seperti /sync).
+    Jurnal dibaca dari database (poll setiap SSE_POLL_SECONDS), jadi jurnal yang
+    diposting lewat worker gunicorn mana pun ikut terkirim. Jurnal yang
+    dipulihkan dari arsip mendapat nomor baru dan dikirim ulang.
+    Reconnect dengan header Last-Event-ID (otomatis oleh EventSource) untuk
+    menerima jurnal yang terlewat. Event `reset` berarti ada jurnal yang
+    terlewat dan client perlu memuat ulang daftar jurnal.
+    ---
+    tags:
+      - Transactions
+    produces:
+      - text/event-stream
+    parameters:
+      - in: header
+        name: Last-Event-ID
+        type: integer
+        required: false
+      - in: query
+        name: last_id
+        type: integer
+        required: false
+        description: Sama dengan Last-Event-ID (untuk client tanpa EventSource)
+    responses:
+      200:
+        description: Stream text/event-stream
+      503:
+        description: Batas koneksi stream (SSE_MAX_SUBSCRIBERS) tercapai, coba lagi setelah Retry-After
+    """
+    last_id = request.headers.get('Last-Event-ID', request.args.get('last_id'))
+    last_id = int(last_id) if last_id and last_id.isdigit() else None
+
+    if journal_events.subscribe() is None:
+        resp = jsonify({"message": "Terlalu banyak koneksi stream, coba lagi nanti"})
+        resp.headers['Retry-After'] = '10'
+        return resp, 503
+    replay, truncated = [], False
+    db = get_read_db()
+    try:
+        # Posisi awal: nomor terakhir yang sudah commit, atau jurnal setelah Last-Event-ID
+        position = services.current_change_seq(db) if last_id is None else last_id
+        if last_id is not None:
+            txs = services.get_transactions_after(db, last_id, SSE_REPLAY_LIMIT + 1)
+            truncated = len(txs) > SSE_REPLAY_LIMIT
+            replay = [(t.change_seq, schemas.TransactionResponse.model_validate(t).model_dump_json())
+                      for t in txs[:SSE_REPLAY_LIMIT]]
+            if replay:
+                position = replay[-1][0]
+    except Exception:
+        journal_events.unsubscribe()
+        raise
+    finally:
+        db.close()
+
+    def generate(position):
+        yield "retry: 3000\n\n"
+        if truncated:
+            yield format_sse("reset", "{}")
+        for seq, data in replay:
+            yield format_sse("journal", data, seq)
+        while True:
+            events, position, lost = journal_events.wait(position, SSE_KEEPALIVE_SECONDS)
+            if lost:
+                metrics.incr("events.lost")
+                yield format_sse("reset", "{}")
+            if not events:
+                yield ": keepalive\n\n"
+                continue
+            for event in events:
+                yield format_sse(event.name, event.data, event.seq)
+
+    resp = Response(generate(position), mimetype='text/event-stream')
+    # Dipanggil server saat koneksi ditutup (juga jika generator belum sempat jalan)
+    resp.call_on_close(journal_events.unsubscribe)
+    resp.headers['Cache-Control'] = 'no-cache'
+    resp.headers['X-Accel-Buffering'] = 'no'  # nginx: jangan buffer stream
+    return resp
+
+@bp.route('/sync', methods=['GET'])
+# Primary: replica yang tertinggal dari `since` client akan terbaca sebagai reset
+@conditional_get("accounts", "ledger", primary=True)
+@admission.limit("sync", concurrency=4, rate=10, burst=20)
+def sync_changes():
+    """
+    Feed Perubahan (Sinkronisasi Client Offline)
+    Akun & jurnal yang dibuat/diubah setelah nomor urut `since`, urut nomor urut perubahan.
+    Mulai dengan since=0, lalu ulangi dengan `next_since` selama `has_more`.
+    `reset` = true berarti client harus sinkronisasi ulang dari since=0.
+    `deleted_transactions`: id jurnal yang diarsipkan (tutup buku), hapus dari salinan lokal.
+    ---
+    tags:
+      - Sync
+    parameters:
+      - in: query
+        name: since
+        type: integer
+        required: false
+        description: next_since dari respons sebelumnya (default 0 = semua)
+      - in: query
+        name: limit
+        type: integer
+        required: false
+        description: Jumlah item per halaman (default 500, maks 2000)
+    responses:
+      200:
+        description: Daftar perubahan
+      400:
+        description: Parameter tidak valid
+    """
+    since = request.args.get('since', 0, type=int)
+    if since < 0:
+        return jsonify({"message": "since tidak boleh negatif"}), 400
+    db = get_read_db()
+    try:
+        data = services.get_changes(db, since, request.args.get('limit', services.SYNC_DEFAULT_LIMIT, type=int))
+        # Ringkas: field kosong (null) tidak dikirim
+        return jsonify(schemas.SyncResponse.model_validate(data).model_dump(exclude_none=True))
+    finally:
+        db.close()
+
+@bp.route('/transactions/search', methods=['GET'])
+@admission.limit("search", concurrency=4, rate=10, burst=20)
+def search_transactions():
+    """
+    Cari Jurnal
+    Pencarian berdasarkan keterangan atau no bukti (awalan kata / fuzzy).
+    ---
+    tags:
+      - Transactions
+    parameters:
+      - in: query
+        name: q
+        type: string
+        required: true
+        example: listrik
+      - in: query
+        name: fuzzy
+        type: boolean
+        required: false
+        description: Toleran salah ketik, urut kemiripan trigram (SQLite - kata minimal 3 huruf)
+      - in: query
+        name: page
+        type: integer
+        required: false
+      - in: query
+        name: per_page
+        type: integer
+        required: false
+        description: Default 20, maks 100
+    responses:
+      200:
+        description: Hasil pencarian
+      400:
+        description: Kata kunci kosong / terlalu pendek untuk fuzzy
+    """
+    db = get_read_db()
+    try:
+        q = request.args.get('q', '')
+        page = max(request.args.get('page', 1, type=int), 1)
+        per_page = min(max(request.args.get('per_page', 20, type=int), 1), 100)
+        fuzzy = request.args.get('fuzzy', '').lower() in ('1', 'true', 'yes')
+
+        items, has_more = services.search_transactions(db, q, page, per_page, fuzzy)
+        return jsonify(schemas.TransactionSearchResponse(
+            query=q, page=page, per_page=per_page, has_more=has_more,
+            items=[schemas.TransactionResponse.model_validate(t) for t in items]
+        ).model_dump())
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    finally:
+        db.close()
+
 # --- ROUTES LAPORAN ---
 
-@app.route('/reports/balance-sheet', methods=['GET'])
+@bp.route('/reports/balance-sheet', methods=['GET'])
+@conditional_get("accounts", "ledger", daily=True)
+@admission.limit("balance-sheet", concurrency=4, rate=5, burst=10)
 def get_balance_sheet():
     """
     Lihat Laporan Neraca (Posisi Keuangan)
@@ -240,6 +661,12 @@ def get_balance_sheet():
     ---
     tags:
       - Reports
+    parameters:
+      - in: query
+        name: as_of
+        type: string
+        required: false
+        description: Posisi per tanggal (YYYY-MM-DD). Kosong = hari ini.
     responses:
       200:
         description: Laporan berhasil diambil
@@ -257,26 +684,144 @@ def get_balance_sheet():
             is_balance:
               type: boolean
     """
-    db = get_db()
+    db = get_read_db()
     try:
-        report_data = services.generate_balance_sheet(db)
+        report_data = services.generate_balance_sheet(db, request.args.get('as_of'))
         # Validasi dengan Schema Pydantic sebelum return JSON
         return jsonify(schemas.BalanceSheetResponse(**report_data).model_dump())
+    except ValueError as e:
+        # Format tanggal as_of salah
+        return jsonify({"message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        db.close()
+
+@bp.route('/reports/income-statement', methods=['GET'])
+@conditional_get("accounts", "ledger", daily=True)
+@admission.limit("income-statement", concurrency=4, rate=5, burst=10)
+def get_income_statement():
+    """
+    Laporan Laba Rugi (Surplus/Defisit) per periode
+    Pendapatan & Beban per akun, dihitung dari ringkasan bulanan per akun.
+    ---
+    tags:
+      - Reports
+    parameters:
+      - in: query
+        name: start
+        type: string
+        required: false
+        description: Tanggal awal (YYYY-MM-DD). Kosong = 1 Januari tahun berjalan.
+      - in: query
+        name: end
+        type: string
+        required: false
+        description: Tanggal akhir (YYYY-MM-DD). Kosong = hari ini.
+    responses:
+      200:
+        description: Laporan berhasil diambil
+      400:
+        description: Format tanggal salah
+    """
+    db = get_read_db()
+    try:
+        data = services.generate_income_statement(db, request.args.get('start'), request.args.get('end'))
+        return jsonify(schemas.IncomeStatementResponse(**data).model_dump())
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        db.close()
+
+@bp.route('/reports/dashboard', methods=['GET'])
+@admission.limit("dashboard", concurrency=4, rate=5, burst=10)
+def get_dashboard():
+    """
+    Ringkasan Dashboard
+    Saldo kas, pendapatan/beban bulan berjalan, total neraca & jurnal terakhir dalam satu request.
+    ---
+    tags:
+      - Reports
+    parameters:
+      - in: query
+        name: recent
+        type: integer
+        required: false
+        description: Jumlah jurnal terakhir (default 5, 0-50)
+    responses:
+      200:
+        description: Ringkasan berhasil diambil
+    """
+    db = get_read_db()
+    try:
+        recent = min(max(request.args.get('recent', 5, type=int), 0), 50)
+        data = services.generate_dashboard(db, recent)
+        return jsonify(schemas.DashboardResponse.model_validate(data).model_dump())
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     finally:
         db.close()
 
-@app.route('/reports/ledger/<int:account_id>', methods=['GET'])
+@bp.route('/reports/ledger/<int:account_id>', methods=['GET'])
+@conditional_get("accounts", "ledger")
+@admission.limit("ledger", concurrency=3, rate=5, burst=10, max_wait=2.0)
 def view_ledger(account_id):
-    db = get_db()
+    """
+    Buku Besar per Akun
+    Saldo berjalan tersimpan per entry, sehingga halaman mana pun bisa diambil langsung.
+    ---
+    tags:
+      - Reports
+    parameters:
+      - in: path
+        name: account_id
+        type: integer
+        required: true
+      - in: query
+        name: start_date
+        type: string
+        required: false
+        description: YYYY-MM-DD
+      - in: query
+        name: end_date
+        type: string
+        required: false
+        description: YYYY-MM-DD
+      - in: query
+        name: limit
+        type: integer
+        required: false
+        description: Jumlah entry per halaman (maks 1000). Kosong = seluruh periode.
+      - in: query
+        name: after
+        type: string
+        required: false
+        description: Cursor halaman berikutnya (next_cursor dari respons sebelumnya)
+    responses:
+      200:
+        description: Buku besar berhasil diambil
+      400:
+        description: Cursor tidak valid
+      404:
+        description: Akun tidak ditemukan
+    """
+    db = get_read_db()
     
     # Ambil parameter tanggal dari URL (opsional)
     start_date = request.args.get('start_date') # Format YYYY-MM-DD
     end_date = request.args.get('end_date')     # Format YYYY-MM-DD
+    limit = request.args.get('limit', type=int)
+    after = request.args.get('after')
+    if after is not None and not after.isdigit():
+        db.close()
+        return jsonify({"message": "Cursor after tidak valid"}), 400
     
     try:
-        data = services.get_general_ledger(db, account_id, start_date, end_date)
+        if limit is not None:
+            limit = min(max(limit, 1), 1000)
+        data = services.get_general_ledger(db, account_id, start_date, end_date, after=after, limit=limit)
         return jsonify(schemas.LedgerResponse(**data).model_dump())
     except ValueError as e:
         return jsonify({"message": str(e)}), 404
@@ -287,8 +832,768 @@ def view_ledger(account_id):
     finally:
         db.close()
 
+@bp.route('/reports/ledger', methods=['GET'])
+@conditional_get("accounts", "ledger")
+@admission.limit("ledger-multi", concurrency=2, rate=2, burst=5, max_wait=2.0)
+def view_multi_ledger():
+    """
+    Buku Besar Banyak Akun
+    Saldo awal semua akun dihitung sekali, saldo berjalan dihitung database (window function).
+    Respons di-stream per akun, jadi laporan setahun untuk ratusan akun tidak ditampung di memori.
+    ---
+    tags:
+      - Reports
+    parameters:
+      - in: query
+        name: account_ids
+        type: string
+        required: false
+        description: Daftar id akun dipisah koma, misal 1,2,5
+      - in: query
+        name: account_types
+        type: string
+        required: false
+        description: Filter tipe akun dipisah koma, misal ASSET,EXPENSE
+      - in: query
+        name: start_date
+        type: string
+        required: false
+        description: YYYY-MM-DD
+      - in: query
+        name: end_date
+        type: string
+        required: false
+        description: YYYY-MM-DD
+    responses:
+      200:
+        description: "{period_start, period_end, accounts: [{akun, opening_balance, entries, closing_balance}]}"
+      400:
+        description: Parameter tidak valid / akun tidak ditemukan
+    """
+    def split(name):
+        return [v.strip() for v in request.args.get(name, '').split(',') if v.strip()]
+
+    db = get_read_db()
+    try:
+        account_ids = [int(v) for v in split('account_ids')]
+        account_types = [schemas.AccountTypeEnum(v.upper()).value for v in split('account_types')]
+        if not account_ids and not account_types:
+            raise ValueError("Isi account_ids atau account_types")
+        info, rows = services.get_multi_ledger(
+            db, account_ids, account_types, request.args.get('start_date'), request.args.get('end_date')
+        )
+    except ValueError as e:
+        db.close()
+        return jsonify({"message": str(e)}), 400
+    except Exception:
+        db.close()
+        raise
+
+    dumps = current_app.json.dumps
+
+    def generate():
+        # {"period_start": .., "period_end": .., "accounts": [ {akun.., "entries": [..], "closing_balance": ..}, ..]}
+        yield dumps({"period_start": info["period_start"], "period_end": info["period_end"]})[:-1] + ', "accounts": ['
+        pending = iter(rows)
+        row = next(pending, None)
+        for i, account in enumerate(info["accounts"]):
+            balance = account["opening_balance"]
+            yield ("," if i else "") + dumps(account)[:-1] + ', "entries": ['
+            first = True
+            while row is not None and row[0] == account["account_id"]:
+                entry = row[1]
+                balance = entry["balance"]
+                yield ("" if first else ",") + dumps(entry)
+                first = False
+                row = next(pending, None)
+            yield f'], "closing_balance": {dumps(balance)}}}'
+        yield "]}"
+
+    resp = Response(generate(), mimetype='application/json')
+    # Session ditutup setelah stream selesai (atau client memutus koneksi)
+    resp.call_on_close(db.close)
+    return resp
+
+@bp.route('/reports/pivot', methods=['GET'])
+@conditional_get("accounts", "ledger", daily=True)
+@admission.limit("pivot", concurrency=2, rate=2, burst=5, max_wait=2.0)
+def get_pivot():
+    """
+    Pivot Pendapatan/Beban Multi-Periode
+    Nilai per akun per bulan/kuartal/tahun, selisih year-over-year dan rata-rata bergerak.
+    ---
+    tags:
+      - Reports
+    parameters:
+      - in: query
+        name: start
+        type: string
+        required: false
+        description: Bulan awal YYYY-MM (default Januari tahun lalu)
+      - in: query
+        name: end
+        type: string
+        required: false
+        description: Bulan akhir YYYY-MM (default bulan berjalan)
+      - in: query
+        name: granularity
+        type: string
+        enum: ['month', 'quarter', 'year']
+        required: false
+      - in: query
+        name: types
+        type: string
+        required: false
+        description: Tipe akun dipisah koma (default REVENUE,EXPENSE)
+      - in: query
+        name: window
+        type: integer
+        required: false
+        description: Jumlah periode rata-rata bergerak (default 3)
+    responses:
+      200:
+        description: Pivot berhasil dihitung
+      400:
+        description: Parameter tidak valid
+    """
+    # numpy baru dimuat saat laporan pivot pertama diminta (tidak memperlambat boot)
+    from api import analytics
+    from models.finance import AccountType
+
+    db = get_read_db()
+    try:
+        types = [AccountType(t.strip().upper()) for t in request.args.get('types', '').split(',') if t.strip()]
+        data = analytics.generate_pivot(
+            db,
+            start=request.args.get('start'),
+            end=request.args.get('end'),
+            granularity=request.args.get('granularity', 'month'),
+            account_types=types,
+            window=request.args.get('window', 3, type=int),
+        )
+        return jsonify(schemas.PivotResponse(**data).model_dump())
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        db.close()
+
+# --- ROUTES REKONSILIASI BANK ---
+
+@bp.route('/reconciliation/<int:account_id>/statements', methods=['POST'])
+@token_required
+@admission.limit("reconciliation-write", write=True)
+@audited("bank_statement")
+def import_bank_statement(account_id):
+    """
+    Import Rekening Koran (CSV / OFX)
+    Baris mutasi disimpan lalu otomatis dicocokkan dengan jurnal akun Kas/Bank.
+    File yang sama boleh diimport ulang (baris lama dilewati).
+    ---
+    tags:
+      - Reconciliation
+    security:
+      - Bearer: []
+    consumes:
+      - multipart/form-data
+    parameters:
+      - in: path
+        name: account_id
+        type: integer
+        required: true
+      - in: formData
+        name: file
+        type: file
+        required: true
+        description: CSV (kolom tanggal, keterangan, ref, amount atau credit/debit) atau OFX
+      - in: query
+        name: format
+        type: string
+        enum: ['csv', 'ofx']
+        required: false
+        description: Kosong = dideteksi dari nama / isi file
+      - in: query
+        name: date_window
+        type: integer
+        required: false
+        description: Toleransi selisih tanggal dalam hari (default 3)
+    responses:
+      200:
+        description: Jumlah baris diimport, duplikat, cocok & belum cocok
+      400:
+        description: File / akun tidak valid
+    """
+    upload = request.files.get('file')
+    if upload is not None:
+        filename, raw = upload.filename, upload.read()
+    else:
+        filename, raw = None, request.get_data()
+    if not raw:
+        return jsonify({"message": "File mutasi kosong"}), 400
+
+    db = get_db()
+    try:
+        content = raw.decode('utf-8-sig', errors='replace')
+        fmt = request.args.get('format') or reconciliation.detect_format(filename, content)
+        window = min(max(request.args.get('date_window', reconciliation.DEFAULT_DATE_WINDOW, type=int), 0), 31)
+        result = write_queue.run(reconciliation.import_statement, db, account_id, content, fmt, window)
+        return jsonify(schemas.ReconciliationResult(**result).model_dump())
+    except ValueError as e:
+        db.rollback()
+        return jsonify({"message": str(e)}), 400
+    except Exception as e:
+        db.rollback()
+        return jsonify({"error": str(e)}), 500
+    finally:
+        db.close()
+
+@bp.route('/reconciliation/<int:account_id>/match', methods=['POST'])
+@token_required
+@admission.limit("reconciliation-write", write=True)
+@audited("bank_statement")
+def rematch_bank_statement(account_id):
+    """
+    Cocokkan Ulang Mutasi yang Belum Cocok
+    Dipakai setelah jurnal yang kurang dicatat menyusul.
+    ---
+    tags:
+      - Reconciliation
+    security:
+      - Bearer: []
+    parameters:
+      - in: path
+        name: account_id
+        type: integer
+        required: true
+      - in: query
+        name: date_window
+        type: integer
+        required: false
+    responses:
+      200:
+        description: Jumlah baris yang berhasil dicocokkan
+      400:
+        description: Akun bukan ASSET (Kas/Bank)
+      404:
+        description: Akun tidak ditemukan
+    """
+    db = get_db()
+    try:
+        window = min(max(request.args.get('date_window', reconciliation.DEFAULT_DATE_WINDOW, type=int), 0), 31)
+        result = write_queue.run(reconciliation.match_statement, db, account_id, window)
+        return jsonify(schemas.ReconciliationResult(**result).model_dump())
+    except reconciliation.AccountNotFound as e:
+        return jsonify({"message": str(e)}), 404
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    except Exception as e:
+        db.rollback()
+        return jsonify({"error": str(e)}), 500
+    finally:
+        db.close()
+
+@bp.route('/reconciliation/<int:account_id>/unmatched', methods=['GET'])
+def list_unmatched(account_id):
+    """
+    Item Rekonsiliasi yang Belum Cocok
+    Baris rekening koran tanpa pasangan jurnal & entry jurnal yang belum muncul di rekening koran.
+    ---
+    tags:
+      - Reconciliation
+    parameters:
+      - in: path
+        name: account_id
+        type: integer
+        required: true
+      - in: query
+        name: limit
+        type: integer
+        required: false
+        description: Maksimal item per daftar (default 500)
+    responses:
+      200:
+        description: Daftar item belum cocok
+      400:
+        description: Akun bukan ASSET (Kas/Bank)
+      404:
+        description: Akun tidak ditemukan
+    """
+    db = get_read_db()
+    try:
+        limit = min(max(request.args.get('limit', 500, type=int), 1), 5000)
+        data = reconciliation.get_unmatched(db, account_id, limit)
+        return jsonify(schemas.UnmatchedResponse(**data).model_dump())
+    except reconciliation.AccountNotFound as e:
+        return jsonify({"message": str(e)}), 404
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        db.close()
+
+# --- ROUTES TUTUP BUKU ---
+
+@bp.route('/fiscal-years', methods=['GET'])
+def list_fiscal_years():
+    """
+    Daftar Tahun Buku yang Sudah Ditutup
+    ---
+    tags:
+      - Fiscal Years
+    responses:
+      200:
+        description: Tahun buku beserta status arsip
+    """
+    db = get_read_db()
+    try:
+        return jsonify([schemas.FiscalYearResponse(**fy).model_dump() for fy in closing.list_fiscal_years(db)])
+    finally:
+        db.close()
+
+@bp.route('/fiscal-years/<int:year>/close', methods=['POST'])
+@token_required
+@admission.limit("fiscal-years-write", write=True)
+@audited("fiscal_year", id_key="year")
+def close_fiscal_year(year):
+    """
+    Tutup Buku Tahunan
+    Posting jurnal penutup (Pendapatan & Beban -> Ekuitas) bertanggal 31 Desember
+    dan simpan saldo pindahan. Setelah ditutup, jurnal ke tahun tsb ditolak.
+    ---
+    tags:
+      - Fiscal Years
+    security:
+      - Bearer: []
+    parameters:
+      - in: path
+        name: year
+        type: integer
+        required: true
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          required:
+            - retained_earnings_account_id
+          properties:
+            retained_earnings_account_id:
+              type: integer
+              example: 3
+    responses:
+      201:
+        description: Tahun buku ditutup
+      400:
+        description: Tahun belum berakhir / sudah ditutup / akun bukan Ekuitas
+    """
+    db = get_db()
+    try:
+        payload = schemas.FiscalYearCloseRequest(**(request.json or {}))
+        result = write_queue.run(closing.close_fiscal_year, db, year, payload.retained_earnings_account_id)
+        return with_data_version(jsonify(schemas.FiscalYearResponse(**result).model_dump()), db), 201
+    except ValidationError as e:
+        return jsonify({"message": "Validasi Gagal", "details": e.errors()}), 400
+    except ValueError as e:
+        db.rollback()
+        return jsonify({"message": str(e)}), 400
+    except Exception as e:
+        db.rollback()
+        return jsonify({"error": str(e)}), 500
+    finally:
+        db.close()
+
+def _run_archive_action(func, year):
+    db = get_db()
+    try:
+        result = write_queue.run(func, db, year)
+        return with_data_version(jsonify(schemas.ArchiveResult(**result).model_dump()), db)
+    except ValueError as e:
+        db.rollback()
+        return jsonify({"message": str(e)}), 400
+    except Exception as e:
+        db.rollback()
+        return jsonify({"error": str(e)}), 500
+    finally:
+        db.close()
+
+@bp.route('/fiscal-years/<int:year>/archive', methods=['POST'])
+@token_required
+@admission.limit("fiscal-years-write", write=True)
+@audited("fiscal_year", id_key="year")
+def archive_fiscal_year(year):
+    """
+    Arsipkan Jurnal Tahun Buku yang Sudah Ditutup
+    Jurnal dipindah ke tabel arsip; laporan memakai saldo pindahan.
+    ---
+    tags:
+      - Fiscal Years
+    security:
+      - Bearer: []
+    parameters:
+      - in: path
+        name: year
+        type: integer
+        required: true
+    responses:
+      200:
+        description: Jumlah jurnal & entry yang diarsipkan
+      400:
+        description: Tahun belum ditutup / sudah diarsipkan
+    """
+    return _run_archive_action(closing.archive_fiscal_year, year)
+
+@bp.route('/fiscal-years/<int:year>/restore', methods=['POST'])
+@token_required
+@admission.limit("fiscal-years-write", write=True)
+@audited("fiscal_year", id_key="year")
+def restore_fiscal_year(year):
+    """
+    Pulihkan Arsip Tahun Buku ke Tabel Aktif
+    ---
+    tags:
+      - Fiscal Years
+    security:
+      - Bearer: []
+    parameters:
+      - in: path
+        name: year
+        type: integer
+        required: true
+    responses:
+      200:
+        description: Jumlah jurnal & entry yang dipulihkan
+      400:
+        description: Tahun tidak diarsipkan
+    """
+    return _run_archive_action(closing.restore_fiscal_year, year)
+
+# --- ROUTES JOB LAPORAN (ASYNC) ---
+
+def _queue_full(error: QueueFull):
+    resp = jsonify({"message": f"{error}, coba lagi nanti"})
+    resp.headers['Retry-After'] = '5'
+    return resp, 503
+
+@bp.route('/reports/jobs', methods=['POST'])
+@token_required
+@admission.limit("report-jobs", rate=1, burst=5)
+def submit_report_job():
+    """
+    Jalankan Laporan Berat di Background
+    Laporan dikerjakan worker process; hasil diambil lewat GET /reports/jobs/{job_id}.
+    Request identik yang masih berjalan akan mendapat job_id yang sama.
+    ---
+    tags:
+      - Reports
+    security:
+      - Bearer: []
+    parameters:
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          required:
+            - report
+          properties:
+            report:
+              type: string
+              enum: ['balance_sheet', 'ledger']
+            params:
+              type: object
+              example: {"account_id": 1, "start_date": "2025-01-01", "end_date": "2025-12-31"}
+    responses:
+      202:
+        description: Job diterima
+      400:
+        description: Jenis laporan / parameter tidak dikenal
+      401:
+        description: Token tidak valid
+      503:
+        description: Antrian job penuh (JOB_MAX_PENDING), coba lagi setelah Retry-After
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"message": "Body harus objek JSON"}), 400
+    report = data.get('report')
+    params = data.get('params')
+    if params is None:
+        params = {}
+    if not isinstance(params, dict):
+        return jsonify({"message": "params harus objek JSON"}), 400
+
+    if report not in REPORTS:
+        return jsonify({"message": f"Laporan tidak dikenal: {report}"}), 400
+    func, allowed = REPORTS[report]
+    unknown = set(params) - allowed
+    if unknown:
+        return jsonify({"message": f"Parameter tidak dikenal: {', '.join(sorted(unknown))}"}), 400
+
+    db = get_db()
+    try:
+        job, coalesced = report_queue.submit(report, func, params, db)
+    except QueueFull as e:
+        return _queue_full(e)
+    finally:
+        db.close()
+    resp = jsonify({"job_id": job.id, "status": job.status, "coalesced": coalesced})
+    resp.headers['Location'] = f"/reports/jobs/{job.id}"
+    return resp, 202
+
+@bp.route('/reports/jobs/<job_id>', methods=['GET'])
+def get_report_job(job_id):
+    """
+    Status & Hasil Job Laporan
+    ---
+    tags:
+      - Reports
+    parameters:
+      - in: path
+        name: job_id
+        type: string
+        required: true
+    responses:
+      200:
+        description: Status job (pending/running/done/failed), hasil jika sudah selesai
+      404:
+        description: Job tidak ditemukan
+    """
+    db = get_db()
+    try:
+        job = report_queue.get(job_id, db)
+        if not job:
+            return jsonify({"message": "Job tidak ditemukan"}), 404
+        return jsonify(job.to_dict())
+    finally:
+        db.close()
+
+# --- ROUTES ADMIN (PROFILING) ---
+
+@bp.route('/admin/profiles', methods=['GET'])
+@admin_required
+def list_profiles():
+    """
+    Daftar Hasil Profiling Request
+    Request admin dengan `?profile=1` atau header `X-Profile: 1` diprofil (cProfile, tracemalloc, SQL);
+    id hasilnya dikirim di header X-Profile-Id.
+    ---
+    tags:
+      - Admin
+    security:
+      - Bearer: []
+    responses:
+      200:
+        description: Ringkasan profil terbaru
+      403:
+        description: Bukan admin
+    """
+    return jsonify(profiler.list())
+
+@bp.route('/admin/profiles/<profile_id>', methods=['GET'])
+@admin_required
+def get_profile(profile_id):
+    """
+    Detail Hasil Profiling
+    Fungsi teratas (cumulative time), lokasi alokasi memori dan SQL yang dijalankan request.
+    ---
+    tags:
+      - Admin
+    security:
+      - Bearer: []
+    parameters:
+      - in: path
+        name: profile_id
+        type: string
+        required: true
+    responses:
+      200:
+        description: Detail profil
+      404:
+        description: Profil tidak ditemukan (sudah terbuang dari penyimpanan)
+    """
+    report = profiler.get(profile_id)
+    if report is None:
+        return jsonify({"message": "Profil tidak ditemukan"}), 404
+    return jsonify(report)
+
+@bp.route('/admin/integrity', methods=['POST'])
+@admin_required
+def verify_integrity():
+    """
+    Verifikasi Integritas Buku Besar (Job Background)
+    Memeriksa seluruh jurnal aktif & arsip per potongan id di process pool: jurnal tidak seimbang,
+    jurnal < 2 entry, header tanpa entry, entry yatim (transaksi/akun hilang), nominal <= 0.
+    Hasil diambil lewat GET /reports/jobs/{job_id}.
+    ---
+    tags:
+      - Admin
+    security:
+      - Bearer: []
+    parameters:
+      - in: body
+        name: body
+        required: false
+        schema:
+          type: object
+          properties:
+            workers:
+              type: integer
+            chunk_size:
+              type: integer
+              example: 50000
+            include_archive:
+              type: boolean
+              default: true
+    responses:
+      202:
+        description: Job diterima
+      400:
+        description: Parameter tidak valid
+      403:
+        description: Bukan admin
+      503:
+        description: Antrian job penuh (JOB_MAX_PENDING), coba lagi setelah Retry-After
+    """
+    data = request.get_json(silent=True) or {}
+    params = {"include_archive": bool(data.get("include_archive", True))}
+    for key in ("workers", "chunk_size"):
+        if data.get(key) is not None:
+            if not isinstance(data[key], int) or isinstance(data[key], bool) or data[key] < 1:
+                return jsonify({"message": f"{key} harus bilangan bulat >= 1"}), 400
+            params[key] = data[key]
+
+    db = get_db()
+    try:
+        job, coalesced = report_queue.submit("integrity", run_integrity, params, db)
+    except QueueFull as e:
+        return _queue_full(e)
+    finally:
+        db.close()
+    resp = jsonify({"job_id": job.id, "status": job.status, "coalesced": coalesced})
+    resp.headers['Location'] = f"/reports/jobs/{job.id}"
+    return resp, 202
+
+@bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Snapshot metrik aplikasi (antrian job, durasi, dll) + konfigurasi admission control & audit log"""
+    data = metrics.snapshot()
+    data["admission"] = {"capacity": admission.pool.capacity, "write_reserved": admission.write_reserved,
+                         "routes": admission.routes}
+    data["audit"] = {"enabled": audit_log.enabled, "durability": audit_log.durability,
+                     "queue_size": audit_log.queue_size, "batch_size": audit_log.batch_size}
+    return jsonify(data)
+
+# --- FUNGSI BANTUAN SEED ADMIN ---
+def create_default_admin(username: str = "admin", password: str = "admin123"):
+    db = SessionLocal()
+    try:
+        # Cek apakah user admin sudah ada
+        user = db.query(User).filter_by(username=username).first()
+        if not user:
+            print(f"Membuat user default: {username}")
+            hashed = hash_password(password)
+            new_admin = User(username=username, password_hash=hashed, role="admin")
+            db.add(new_admin)
+            db.commit()
+        else:
+            print(f"User {username} sudah ada.")
+    finally:
+        db.close()
+
+# --- APP FACTORY ---
+def create_app(config: dict = None):
+    """
+    Buat instance Flask.
+    Tidak ada koneksi database maupun hashing password saat boot:
+    engine dibuat saat query pertama, dokumentasi Swagger saat /apidocs pertama
+    dibuka, dan admin default dibuat lewat perintah CLI `python app.py seed-admin`
+    (COA massal: `python app.py import-coa coa.csv`).
+    """
+    app = Flask(__name__)
+    app.config['SWAGGER_ENABLED'] = os.getenv("SWAGGER_ENABLED", "1") == "1"
+    if config:
+        app.config.update(config)
+
+    app.register_blueprint(bp)
+    app.teardown_appcontext(shutdown_session)
+    profiler.init_app(app)
+    compression.init_app(app)
+
+    if app.config['SWAGGER_ENABLED']:
+        app.wsgi_app = LazySwagger(app.wsgi_app)
+
+    @app.cli.command("import-coa")
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--dry-run", is_flag=True, help="Hanya validasi, tanpa menyimpan")
+    def import_coa(path, dry_run):
+        """Import / upsert Chart of Accounts dari file CSV atau JSON"""
+        with open(path, encoding="utf-8-sig") as f:
+            content = f.read()
+        db = SessionLocal()
+        try:
+            result = coa.import_file(db, content, coa.detect_format(path, content), dry_run)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        finally:
+            db.close()
+        click.echo(f"Dibuat: {result['created']}, diubah: {result['updated']}, tidak berubah: {result['unchanged']}"
+                   + (" (dry run)" if dry_run else ""))
+
+    @app.cli.command("rebuild-period-totals")
+    def rebuild_period_totals():
+        """Susun ulang ringkasan per akun per bulan (account_period_totals) dari jurnal"""
+        db = SessionLocal()
+        try:
+            result = services.rebuild_period_totals(db)
+        finally:
+            db.close()
+        click.echo(f"Ringkasan bulanan disusun ulang: {result['rows']} baris")
+
+    @app.cli.command("verify-ledger")
+    @click.option("--workers", type=int, default=integrity.VERIFY_WORKERS, show_default=True, help="Jumlah proses")
+    @click.option("--chunk-size", type=int, default=integrity.VERIFY_CHUNK_SIZE, show_default=True,
+                  help="Id transaksi per potongan")
+    @click.option("--no-archive", is_flag=True, help="Lewati tabel arsip")
+    def verify_ledger(workers, chunk_size, no_archive):
+        """Verifikasi integritas jurnal (seimbang, tidak yatim); exit code 1 jika ada temuan"""
+        def progress(done, total, result):
+            click.echo(f"[{done}/{total}] {result['entries_checked']} entry diperiksa, "
+                       f"{len(result['issues'])} temuan", err=True)
+
+        db = SessionLocal()
+        try:
+            result = integrity.verify_ledger(db, workers, chunk_size, not no_archive, progress)
+        finally:
+            db.close()
+        for issue in result["issues"]:
+            details = ", ".join(f"{k}={v}" for k, v in issue.items() if k not in ("type", "table", "transaction_id"))
+            click.echo(f"{issue['type']}: {issue['table']} transaksi #{issue['transaction_id']}"
+                       + (f" ({details})" if details else ""))
+        click.echo(f"{result['transactions_checked']} transaksi, {result['entries_checked']} entry, "
+                   f"{len(result['issues'])} temuan, {result['seconds']} detik")
+        if not result["ok"]:
+            sys.exit(1)
+
+    @app.cli.command("seed-admin")
+    @click.option("--username", default="admin")
+    @click.option("--password", default="admin123")
+    def seed_admin(username, password):
+        """Buat user admin default jika belum ada"""
+        create_default_admin(username, password)
+
+    return app
+
+app = create_app()
+
 if __name__ == '__main__':
     # Pastikan tabel dibuat jika belum ada (alternatif alembic untuk dev)
-    # Base.metadata.create_all(bind=engine)
-    create_default_admin()
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    # Base.metadata.create_all(bind=get_engine())
+    if len(sys.argv) > 1:
+        # Perintah CLI, misal: python app.py seed-admin --username admin
+        with app.app_context():
+            app.cli.main(prog_name="app.py")
+    else:
+        # Server development; production: gunicorn -c gunicorn.conf.py app:app
+        app.run(debug=True, port=5000)
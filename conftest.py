@@ -1,3 +1,7 @@
+import os
+# Audit log write-behind dimatikan: thread penulisnya memakai database sungguhan,
+# bukan session test (test audit memasang writer sendiri)
+os.environ.setdefault("AUDIT_ENABLED", "0")
 import pytest
 from unittest.mock import patch
 from sqlalchemy import create_engine
@@ -6,6 +10,8 @@ from core.database import Base
 from app import app
 from models.user import User
 from core.security import hash_password
+from api import services
+from api.schemas import AccountCreate, TransactionCreate, TransactionEntryCreate, EntryTypeEnum
 
 # Gunakan SQLite in-memory untuk testing agar cepat dan terisolasi
 TEST_DATABASE_URL = "sqlite:///:memory:"
@@ -50,4 +56,25 @@ def admin_token(client, db_session):
         "username": "admin",
         "password": "admin123"
     })
-    return response.json['access_token']
\ No newline at end of file
+    return response.json['access_token']
+
+class LedgerFactory:
+    """Pembuat akun & jurnal sederhana (1 debit, 1 kredit) lewat api.services untuk test"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def account(self, code, name, account_type) -> int:
+        return services.create_account(self.db, AccountCreate(code=code, name=name, account_type=account_type)).id
+
+    def post(self, debit: int, credit: int, amount, tanggal, description="Jurnal", ref=None):
+        return services.create_transaction(self.db, TransactionCreate(
+            description=description, reference_no=ref, transaction_date=tanggal, entries=[
+                TransactionEntryCreate(account_id=debit, entry_type=EntryTypeEnum.DEBIT, amount=amount),
+                TransactionEntryCreate(account_id=credit, entry_type=EntryTypeEnum.CREDIT, amount=amount)
+            ]))
+
+@pytest.fixture(scope="function")
+def ledger_factory(db_session):
+    """Fixture factory akun & jurnal (lihat LedgerFactory)"""
+    return LedgerFactory(db_session)
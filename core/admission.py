@@ -0,0 +1,212 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import Response, g, request, jsonify
+from core.metrics import metrics
+from core.security import get_token_payload
+
+# --- KONFIGURASI (environment) ---
+# Kapasitas total request berat yang boleh berjalan bersamaan (sebaiknya <= thread worker
+# dan <= pool koneksi DB). WRITE_RESERVED slot hanya boleh dipakai endpoint tulis,
+# sehingga laporan berat tidak bisa memblokir POST /transactions.
+# Semua batas (slot, antrian, rate limit per client) dihitung PER PROSES worker:
+# dengan WEB_CONCURRENCY=N batas efektif server = N x nilai di bawah, dan rate limit
+# seorang client tergantung worker mana yang menerima request-nya.
+ADMISSION_CAPACITY = int(os.getenv("ADMISSION_CAPACITY", "12"))
+ADMISSION_WRITE_RESERVED = int(os.getenv("ADMISSION_WRITE_RESERVED", "4"))
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "1") == "1"
+
+def _env(name: str, key: str, default, cast=float):
+    """Override per route: ADMISSION_<NAME>_<KEY>, misal ADMISSION_LEDGER_CONCURRENCY=2"""
+    value = os.getenv(f"ADMISSION_{name.upper().replace('-', '_')}_{key}")
+    return cast(value) if value else default
+
+class TokenBucket:
+    """Rate limit: `rate` token per detik, maksimal `burst` token tersimpan"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+
+    def take(self) -> float:
+        """Ambil 1 token; return 0 jika berhasil, atau detik yang harus ditunggu"""
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+class RateLimiter:
+    """Token bucket per client (dibatasi `max_clients`, client terlama dibuang)"""
+
+    def __init__(self, rate: float, burst: int, max_clients: int = 10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key) -> float:
+        with self._lock:
+            bucket = self._buckets.pop(key, None) or TokenBucket(self.rate, self.burst)
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+            return bucket.take()
+
+class Slots:
+    """
+    Semaphore dengan batas waktu tunggu & panjang antrian.
+    acquire(reserve=n): hanya berhasil jika setelah diambil masih tersisa >= n slot
+    (dipakai untuk kapasitas cadangan endpoint tulis).
+    """
+
+    def __init__(self, capacity: int, max_queue: int = None, metric_prefix: str = None):
+        self.capacity = capacity
+        self.max_queue = max_queue
+        self.in_use = 0
+        self.waiting = 0
+        self._cond = threading.Condition()
+        if metric_prefix:
+            metrics.gauge(f"{metric_prefix}.in_use", lambda: self.in_use)
+            metrics.gauge(f"{metric_prefix}.waiting", lambda: self.waiting)
+
+    def acquire(self, timeout: float, reserve: int = 0) -> bool:
+        limit = self.capacity - reserve
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            if self.in_use < limit:
+                self.in_use += 1
+                return True
+            if timeout <= 0 or (self.max_queue is not None and self.waiting >= self.max_queue):
+                return False
+            self.waiting += 1
+            try:
+                while self.in_use >= limit:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+                self.in_use += 1
+                return True
+            finally:
+                self.waiting -= 1
+
+    def release(self):
+        with self._cond:
+            self.in_use -= 1
+            self._cond.notify_all()
+
+def _client_key():
+    # Client = user (claim `sub` token yang sudah diverifikasi) atau alamat IP.
+    # Token palsu / kedaluwarsa jatuh ke IP, jadi tidak bisa membuat bucket baru tiap request.
+    payload = g.get("token_payload") or get_token_payload()
+    if payload and payload.get("sub"):
+        return f"user:{payload['sub']}"
+    return request.remote_addr
+
+def _release_after(chunks, release):
+    """Iterator body stream yang melepas slot admission begitu habis / ditutup"""
+    try:
+        yield from chunks
+    finally:
+        close = getattr(chunks, "close", None)
+        if close:
+            close()
+        release()
+
+def _reject(status: int, message: str, retry_after: float):
+    resp = jsonify({"message": message})
+    resp.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return resp, status
+
+class AdmissionController:
+    """
+    Admission control untuk endpoint mahal:
+    1. Rate limit per client (token bucket) -> 429 + Retry-After
+    2. Batas konkurensi per route (antri maks `max_wait` detik / `max_queue` request) -> 503
+    3. Kapasitas bersama: endpoint baca hanya boleh memakai capacity - write_reserved slot,
+       endpoint tulis boleh memakai seluruhnya -> 503 jika penuh
+    Request 304 dari conditional_get tidak melewati limiter (pasang decorator di bawahnya).
+    """
+
+    def __init__(self, capacity: int, write_reserved: int, enabled: bool = True, name: str = "admission"):
+        self.name = name
+        self.enabled = enabled
+        self.write_reserved = write_reserved
+        self.pool = Slots(capacity, metric_prefix=f"{name}.pool")
+        self.routes = {}
+
+    def limit(self, name: str, concurrency: int = None, rate: float = None, burst: int = None,
+              max_wait: float = 1.0, max_queue: int = None, write: bool = False):
+        concurrency = _env(name, "CONCURRENCY", concurrency, int)
+        rate = _env(name, "RATE", rate)
+        burst = _env(name, "BURST", burst, int)
+        max_wait = _env(name, "MAX_WAIT", max_wait)
+        max_queue = _env(name, "MAX_QUEUE", max_queue, int)
+
+        slots = Slots(concurrency, max_queue, metric_prefix=f"{self.name}.{name}") if concurrency else None
+        limiter = RateLimiter(rate, burst or max(1, int(rate))) if rate else None
+        self.routes[name] = {"concurrency": concurrency, "rate": rate, "burst": burst,
+                             "max_wait": max_wait, "max_queue": max_queue, "write": write}
+        reserve = 0 if write else self.write_reserved
+
+        def decorator(f):
+            @wraps(f)
+            def decorated(*args, **kwargs):
+                if not self.enabled:
+                    return f(*args, **kwargs)
+
+                if limiter:
+                    wait = limiter.take(_client_key())
+                    if wait > 0:
+                        metrics.incr(f"{self.name}.{name}.rate_limited")
+                        return _reject(429, "Terlalu banyak permintaan, coba lagi nanti", wait)
+
+                start = time.monotonic()
+                if slots and not slots.acquire(max_wait):
+                    metrics.incr(f"{self.name}.{name}.rejected")
+                    return _reject(503, "Server sedang sibuk, coba lagi sebentar", 1)
+                remaining = max_wait - (time.monotonic() - start)
+                if not self.pool.acquire(max(remaining, 0), reserve=reserve):
+                    if slots:
+                        slots.release()
+                    metrics.incr(f"{self.name}.{name}.rejected")
+                    return _reject(503, "Server sedang sibuk, coba lagi sebentar", 1)
+
+                released = []
+
+                def release():
+                    if released:
+                        return
+                    released.append(True)
+                    self.pool.release()
+                    if slots:
+                        slots.release()
+
+                streamed = False
+                try:
+                    metrics.observe(f"{self.name}.{name}.wait", time.monotonic() - start)
+                    metrics.incr(f"{self.name}.{name}.admitted")
+                    resp = f(*args, **kwargs)
+                    # Respons stream: query berat baru jalan saat body dikirim,
+                    # slot dilepas setelah stream selesai / koneksi ditutup
+                    if isinstance(resp, Response) and resp.is_streamed:
+                        resp.response = _release_after(resp.response, release)
+                        resp.call_on_close(release)  # stream tidak pernah dibaca
+                        streamed = True
+                    return resp
+                finally:
+                    if not streamed:
+                        release()
+            return decorated
+        return decorator
+
+admission = AdmissionController(ADMISSION_CAPACITY, ADMISSION_WRITE_RESERVED, enabled=ADMISSION_ENABLED)
@@ -0,0 +1,222 @@
+"""
+Audit log write-behind: siapa (claim `sub` token) menulis apa (route, hash body
+request, id hasil). Request hanya menaruh record di antrian in-process yang
+dibatasi; thread penulis menyimpannya per batch (satu INSERT + commit per batch),
+jadi posting jurnal tidak menunggu INSERT audit.
+
+Mode durability (AUDIT_DURABILITY):
+- buffered (default): record masuk antrian, request langsung lanjut. Antrian penuh:
+  request menunggu paling lama AUDIT_BLOCK_TIMEOUT detik (backpressure), setelah
+  itu record dibuang. Record yang belum ditulis hilang jika proses mati mendadak
+  (saat shutdown normal antrian dikosongkan dulu).
+- flush: request menunggu sampai batch berisi record-nya di-commit (tidak ada
+  yang hilang, tambah latensi satu batch; record yang datang bersamaan tetap
+  digabung dalam satu commit).
+- best_effort: tidak pernah menunggu; antrian penuh = record dibuang.
+
+Metrik (prefix `name`, default "audit"): gauge audit.queue.depth; counter
+audit.enqueued, audit.written, audit.batches, audit.blocked (request sempat
+tertahan antrian penuh), audit.dropped, audit.batch_failed; timer
+audit.flush.seconds & audit.enqueue_wait.seconds.
+"""
+import atexit
+import hashlib
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+from functools import wraps
+from flask import current_app, g, request
+from sqlalchemy import insert
+from core.database import SessionLocal, write_queue, _register_after_fork
+from core.metrics import metrics
+from models.audit import AuditLog
+
+AUDIT_ENABLED = os.getenv("AUDIT_ENABLED", "1") == "1"
+AUDIT_DURABILITY = os.getenv("AUDIT_DURABILITY", "buffered")
+AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "1.0"))    # detik
+AUDIT_BLOCK_TIMEOUT = float(os.getenv("AUDIT_BLOCK_TIMEOUT", "0.05"))     # detik
+AUDIT_MAX_RETRIES = 3
+
+DURABILITY_MODES = ("buffered", "flush", "best_effort")
+
+class AuditWriter:
+    """Antrian audit terbatas + thread penulis batch (lihat docstring modul)"""
+
+    def __init__(self, session_factory=SessionLocal, enabled: bool = AUDIT_ENABLED, durability: str = AUDIT_DURABILITY,
+                 queue_size: int = AUDIT_QUEUE_SIZE, batch_size: int = AUDIT_BATCH_SIZE,
+                 flush_interval: float = AUDIT_FLUSH_INTERVAL, block_timeout: float = AUDIT_BLOCK_TIMEOUT, runner=None,
+                 name: str = "audit"):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"AUDIT_DURABILITY harus salah satu dari: {', '.join(DURABILITY_MODES)}")
+        self.session_factory = session_factory
+        self.enabled = enabled
+        self.durability = durability
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.block_timeout = block_timeout
+        self.runner = runner or write_queue
+        self.name = name  # prefix metrik
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._lock = threading.Lock()
+        metrics.gauge(f"{name}.queue.depth", lambda: self._queue.qsize())
+        _register_after_fork(self._after_fork)
+
+    def _after_fork(self):
+        # Thread penulis & isi antrian milik parent tidak berlaku di proses anak
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._loop, name=f"{self.name}-writer", daemon=True)
+                    self._thread.start()
+
+    def submit(self, record: dict) -> bool:
+        """Masukkan record ke antrian; False jika dibuang (antrian penuh / gagal ditulis di mode flush)"""
+        if not self.enabled:
+            return False
+        self._ensure_thread()
+        done = Future() if self.durability == "flush" else None
+        try:
+            self._queue.put_nowait((record, done))
+        except queue.Full:
+            if self.durability == "best_effort":
+                metrics.incr(f"{self.name}.dropped")
+                return False
+            metrics.incr(f"{self.name}.blocked")
+            start = time.perf_counter()
+            try:
+                # Mode flush menunggu tanpa batas waktu: record tidak boleh hilang
+                self._queue.put((record, done), timeout=None if done else self.block_timeout)
+            except queue.Full:
+                metrics.incr(f"{self.name}.dropped")
+                return False
+            finally:
+                metrics.observe(f"{self.name}.enqueue_wait.seconds", time.perf_counter() - start)
+        metrics.incr(f"{self.name}.enqueued")
+        return done.result() if done else True
+
+    def flush(self, timeout: float = None) -> bool:
+        """Tunggu sampai semua record yang sudah masuk antrian ditulis (test & shutdown)"""
+        if self._thread is None:
+            return True
+        marker = Future()
+        try:
+            self._queue.put((None, marker), timeout=timeout)
+            return marker.result(timeout=timeout)
+        except Exception:
+            return False
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        # Mode flush: langsung tulis yang sudah ada (pemanggil sedang menunggu)
+        deadline = time.monotonic() + (0 if self.durability == "flush" else self.flush_interval)
+        while len(batch) < self.batch_size and batch[-1][0] is not None:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            records = [record for record, _ in batch if record is not None]
+            ok = self._write(records) if records else True
+            for _, done in batch:
+                if done is not None:
+                    done.set_result(ok)
+
+    def _write(self, records: list) -> bool:
+        for attempt in range(AUDIT_MAX_RETRIES):
+            try:
+                with metrics.timer(f"{self.name}.flush.seconds"):
+                    self.runner.run(self._insert_batch, records)
+                metrics.incr(f"{self.name}.batches")
+                metrics.incr(f"{self.name}.written", len(records))
+                return True
+            except Exception:
+                metrics.incr(f"{self.name}.batch_failed")
+                time.sleep(min(0.1 * 2 ** attempt, 1.0))
+        metrics.incr(f"{self.name}.dropped", len(records))
+        return False
+
+    def _insert_batch(self, records: list):
+        session = self.session_factory()
+        try:
+            session.execute(insert(AuditLog), records)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+audit_log = AuditWriter()
+# Shutdown normal: record yang masih di antrian ditulis dulu
+atexit.register(audit_log.flush, 5.0)
+
+# --- DECORATOR ROUTE ---
+
+def _payload_hash() -> str:
+    digest = hashlib.sha256()
+    if request.files or request.form:
+        # Multipart / form: body mentah sudah diurai Flask, hash isi field & file
+        for name, value in sorted(request.form.items(multi=True)):
+            digest.update(f"{name}={value}\n".encode("utf-8"))
+        for name, storage in sorted(request.files.items(multi=True), key=lambda item: item[0]):
+            digest.update(f"{name}:{storage.filename}\n".encode("utf-8"))
+            digest.update(storage.read())
+            storage.seek(0)
+    else:
+        digest.update(request.get_data(cache=True))
+    return digest.hexdigest()
+
+def _result_ids(response, id_key: str) -> str:
+    """Id hasil dari body JSON (field `id_key`), atau dari parameter URL (misal account_id, year)"""
+    data = response.get_json(silent=True) if response.is_json and not response.is_streamed else None
+    if isinstance(data, dict) and data.get(id_key) is not None:
+        ids = [data[id_key]]
+    elif isinstance(data, list):
+        ids = [item[id_key] for item in data if isinstance(item, dict) and item.get(id_key) is not None]
+    else:
+        ids = list((request.view_args or {}).values())
+    return ",".join(str(i) for i in ids) or None
+
+def audited(resource: str, id_key: str = "id"):
+    """
+    Catat request tulis ke audit log (write-behind).
+    Pasang di bawah token_required, yang mengisi g.current_user.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if not audit_log.enabled:
+                return f(*args, **kwargs)
+            occurred_at = datetime.now()
+            payload_hash = _payload_hash()
+            response = current_app.make_response(f(*args, **kwargs))
+            audit_log.submit({
+                "occurred_at": occurred_at,
+                "username": g.get("current_user"),
+                "method": request.method,
+                "route": request.path[:255],
+                "status": response.status_code,
+                "payload_hash": payload_hash,
+                "resource": resource,
+                "resource_ids": _result_ids(response, id_key),
+            })
+            return response
+        return decorated
+    return decorator
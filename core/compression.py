@@ -0,0 +1,232 @@
+"""
+Kompresi respons berdasarkan Accept-Encoding (zstd / br jika modulnya terpasang, gzip selalu).
+
+- Respons biasa dikompres jika ukurannya >= COMPRESS_MIN_SIZE byte
+- Respons stream (misal buku besar banyak akun) dikompres bertahap per potongan,
+  tanpa menunggu seluruh body
+- Body laporan (endpoint conditional_get) di-cache per versi data + URL, termasuk
+  hasil kompresinya, jadi request berikutnya dari client lain tidak perlu
+  menghitung ulang laporan maupun mengompres ulang
+- ETag respons terkompresi dijadikan weak (W/"...") karena byte-nya berbeda
+  dari versi tanpa kompresi; If-None-Match tetap cocok (weak comparison)
+"""
+import importlib.util
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from flask import g, request
+from core.metrics import metrics
+
+COMPRESS_ENABLED = os.getenv("COMPRESS_ENABLED", "1") == "1"
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))      # byte
+COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", "6"))                # gzip 1-9
+COMPRESS_STREAM_FLUSH = 64 * 1024                                     # flush stream tiap N byte input
+REPORT_CACHE_MAX_BYTES = int(os.getenv("REPORT_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+COMPRESSIBLE_TYPES = ("application/json", "text/csv", "text/plain", "text/html", "application/xml")
+
+class _Gzip:
+    def __init__(self):
+        self._c = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, 31)  # wbits 31 = format gzip
+
+    def compress(self, data: bytes) -> bytes:
+        return self._c.compress(data)
+
+    def flush(self) -> bytes:
+        return self._c.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._c.flush(zlib.Z_FINISH)
+
+class _Brotli:
+    def __init__(self):
+        import brotli
+        self._c = brotli.Compressor(quality=5)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._c.process(data)
+
+    def flush(self) -> bytes:
+        return self._c.flush()
+
+    def finish(self) -> bytes:
+        return self._c.finish()
+
+class _Zstd:
+    def __init__(self):
+        import zstandard
+        self._flush_block = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        self._c = zstandard.ZstdCompressor(level=3).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._c.compress(data)
+
+    def flush(self) -> bytes:
+        return self._c.flush(self._flush_block)
+
+    def finish(self) -> bytes:
+        return self._c.flush()
+
+# Urutan preferensi server; br & zstd hanya jika modul opsionalnya terpasang
+ENCODERS = OrderedDict([("zstd", ("zstandard", _Zstd)), ("br", ("brotli", _Brotli)), ("gzip", (None, _Gzip))])
+
+_available = None
+
+def available_encodings() -> list:
+    global _available
+    if _available is None:
+        found = []
+        for name, (module, _) in ENCODERS.items():
+            if module is None or importlib.util.find_spec(module) is not None:
+                found.append(name)
+        _available = found
+    return _available
+
+def negotiate(accept_encoding: str):
+    """Pilih encoding dari header Accept-Encoding (menghormati q=0); None = tanpa kompresi"""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name.strip().lower()] = q
+    candidates = [enc for enc in available_encodings() if accepted.get(enc, accepted.get("*", 0)) > 0]
+    if not candidates:
+        return None
+    # q tertinggi menang; jika sama, urutan preferensi server
+    return max(candidates, key=lambda enc: accepted.get(enc, accepted.get("*", 0)))
+
+def compress(data: bytes, encoding: str) -> bytes:
+    encoder = ENCODERS[encoding][1]()
+    start = time.perf_counter()
+    out = encoder.compress(data) + encoder.finish()
+    _record(encoding, len(data), len(out), time.perf_counter() - start)
+    return out
+
+def _record(encoding: str, size_in: int, size_out: int, seconds: float):
+    metrics.observe(f"compression.{encoding}.seconds", seconds)
+    metrics.incr(f"compression.{encoding}.bytes_in", size_in)
+    metrics.incr(f"compression.{encoding}.bytes_out", size_out)
+
+def compress_stream(chunks, encoding: str):
+    """Kompres iterator body stream secara bertahap (flush berkala agar client tetap menerima data)"""
+    encoder = ENCODERS[encoding][1]()
+    seconds, size_in, size_out, pending = 0.0, 0, 0, 0
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            start = time.perf_counter()
+            out = encoder.compress(chunk)
+            pending += len(chunk)
+            if pending >= COMPRESS_STREAM_FLUSH:
+                out += encoder.flush()
+                pending = 0
+            seconds += time.perf_counter() - start
+            size_in += len(chunk)
+            if out:
+                size_out += len(out)
+                yield out
+        start = time.perf_counter()
+        out = encoder.finish()
+        seconds += time.perf_counter() - start
+        size_out += len(out)
+        yield out
+    finally:
+        close = getattr(chunks, "close", None)
+        if close:
+            close()
+        _record(encoding, size_in, size_out, seconds)
+
+class ReportCache:
+    """
+    LRU body laporan per kunci (ETag + waktu versi data), dibatasi total byte.
+    Setiap entry menyimpan body asli ("identity") dan varian terkompresinya.
+    """
+
+    def __init__(self, max_bytes: int = REPORT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> {"mimetype": str, encoding: bytes}
+        self._size = 0
+        metrics.gauge("report_cache.bytes", lambda: self._size)
+
+    def get(self, key: str, encoding: str = "identity"):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or encoding not in entry:
+                return None
+            self._entries.move_to_end(key)
+            return entry["mimetype"], entry[encoding]
+
+    def put(self, key: str, encoding: str, body: bytes, mimetype: str = None):
+        if len(body) > self.max_bytes // 4:
+            return  # laporan raksasa tidak di-cache
+        with self._lock:
+            entry = self._entries.setdefault(key, {"mimetype": mimetype})
+            if encoding in entry:
+                return
+            entry[encoding] = body
+            self._size += len(body)
+            self._entries.move_to_end(key)
+            while self._size > self.max_bytes and self._entries:
+                _, old = self._entries.popitem(last=False)
+                self._size -= sum(len(v) for k, v in old.items() if k != "mimetype")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+report_cache = ReportCache()
+
+def _compressible(response) -> bool:
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return False
+    if "Content-Encoding" in response.headers or request.method == "HEAD":
+        return False
+    return response.mimetype in COMPRESSIBLE_TYPES
+
+def compress_response(response):
+    """Hook after_request: kompres respons sesuai Accept-Encoding"""
+    if not COMPRESS_ENABLED or not _compressible(response):
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = negotiate(request.headers.get("Accept-Encoding"))
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = compress_stream(response.response, encoding)
+        response.headers.pop("Content-Length", None)
+    else:
+        body = response.get_data()
+        if len(body) < COMPRESS_MIN_SIZE:
+            return response
+        cache_key = g.get("report_cache_key")
+        cached = report_cache.get(cache_key, encoding) if cache_key else None
+        if cached is not None:
+            metrics.incr("compression.cache_hit")
+            data = cached[1]
+        else:
+            data = compress(body, encoding)
+            if cache_key:
+                report_cache.put(cache_key, encoding, data)
+        response.set_data(data)
+
+    response.headers["Content-Encoding"] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+def init_app(app):
+    app.after_request(compress_response)
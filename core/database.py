@@ -1,7 +1,13 @@
+import itertools
 import os
-from sqlalchemy import create_engine
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 from dotenv import load_dotenv
+from core.metrics import metrics
 
 load_dotenv() # Load variabel environment jika ada
 
@@ -16,17 +22,417 @@ DB_NAME = os.getenv("DB_NAME", "masfin")
 # SQLALCHEMY_DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 SQLALCHEMY_DATABASE_URL = f"postgresql://{DB_USER}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    echo=False 
-    # check_same_thread dihapus karena ini hanya untuk SQLite
-)
+# DATABASE_URL (opsional) menimpa konfigurasi di atas.
+# Mode SQLite untuk server kecil: DATABASE_URL=sqlite:////var/lib/masfin/masfin.db
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL") or SQLALCHEMY_DATABASE_URL
+IS_SQLITE = SQLALCHEMY_DATABASE_URL.startswith("sqlite")
+
+# --- TUNING SQLITE ---
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",                                          # pembaca tidak memblokir penulis
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),       # aman dengan WAL, fsync lebih sedikit
+    "cache_size": -int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536")), # negatif = KiB (64 MB)
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "temp_store": "MEMORY",
+    "foreign_keys": "ON",
+}
+
+# Nama thread penulis tunggal (lihat WriteQueue)
+WRITER_THREAD_NAME = "db-writer"
+
+def configure_sqlite(engine, pragmas: dict = None):
+    """
+    Pasang PRAGMA di setiap koneksi SQLite baru dan atur transaksi:
+    - driver sqlite3 tidak lagi membuka transaksi sendiri (isolation_level=None),
+      SQLAlchemy yang mengirim BEGIN
+    - transaksi dari thread penulis memakai BEGIN IMMEDIATE agar kunci tulis
+      diambil di awal (tidak gagal SQLITE_BUSY saat upgrade dari baca ke tulis)
+    """
+    pragmas = SQLITE_PRAGMAS if pragmas is None else pragmas
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def _on_begin(conn):
+        if threading.current_thread().name.startswith(WRITER_THREAD_NAME):
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+        else:
+            conn.exec_driver_sql("BEGIN")
+
+    return engine
+
+# Engine baru dibuat saat pertama kali dibutuhkan (bukan saat import),
+# supaya import aplikasi / boot worker tidak ikut memuat driver database.
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                if IS_SQLITE:
+                    # Session boleh dipakai lintas thread (request -> thread penulis)
+                    _engine = configure_sqlite(create_engine(
+                        SQLALCHEMY_DATABASE_URL, echo=False,
+                        connect_args={"check_same_thread": False}
+                    ))
+                else:
+                    _engine = create_engine(
+                        SQLALCHEMY_DATABASE_URL,
+                        echo=False 
+                        # check_same_thread dihapus karena ini hanya untuk SQLite
+                    )
+    return _engine
+
+def __getattr__(name):
+    # Kompatibilitas: `from core.database import engine` tetap berfungsi (lazy)
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+class _LazySessionLocal:
+    """Pengganti sessionmaker(bind=engine) yang baru membuat engine saat session pertama dibuat"""
+
+    def __init__(self, **options):
+        self._options = options
+        self._factory = None
+
+    def __call__(self, **kwargs):
+        if self._factory is None:
+            self._factory = sessionmaker(bind=get_engine(), **self._options)
+        return self._factory(**kwargs)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = _LazySessionLocal(autocommit=False, autoflush=False)
 
 class Base(DeclarativeBase):
     pass
 
+# --- READ REPLICA (opsional) ---
+# DB_REPLICA_URLS="postgresql://user@replica1/masfin,postgresql://user@replica2/masfin"
+# Endpoint baca (laporan, daftar akun/transaksi) diarahkan ke replica,
+# penulisan tetap ke primary (engine di atas).
+DB_REPLICA_URLS = [u.strip() for u in os.getenv("DB_REPLICA_URLS", "").split(",") if u.strip()]
+DB_REPLICA_MAX_LAG = int(os.getenv("DB_REPLICA_MAX_LAG", "0"))         # selisih versi data yang masih ditoleransi
+DB_REPLICA_CHECK_INTERVAL = float(os.getenv("DB_REPLICA_CHECK_INTERVAL", "1.0"))  # detik
+
+def _read_versions(session) -> dict:
+    """Baca tabel data_versions (lihat models.version) -> {scope: version}"""
+    return dict(session.execute(text("SELECT scope, version FROM data_versions")).all())
+
+class ReplicaRouter:
+    """
+    Memilih session replica untuk query baca.
+    - Lag diukur dari selisih data_versions primary vs replica (berlaku untuk
+      semua jenis database), dicek paling sering tiap `check_interval` detik
+    - Replica yang tertinggal > max_lag atau error tidak dipakai sementara
+    - Read-your-writes: jika client meminta versi minimum (min_versions)
+      yang belum sampai di replica, return None -> pakai primary
+    """
+
+    def __init__(self, primary_session_factory, replica_urls, max_lag=0, check_interval=1.0, engine_options=None):
+        self.primary_session_factory = primary_session_factory
+        self.replica_urls = list(replica_urls)
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._engine_options = engine_options or {}
+        self._engines = None
+        self._session_factories = None
+        self._engines_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._status = {}  # index replica -> (waktu cek, versi replica atau None jika error)
+        self._primary_versions = (0.0, {})
+        self._next = itertools.count()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.replica_urls)
+
+    def _ensure_engines(self):
+        # Engine replica juga dibuat lazy
+        if self._engines is None:
+            with self._engines_lock:
+                if self._engines is None:
+                    engines = [create_engine(url, **self._engine_options) for url in self.replica_urls]
+                    self._session_factories = [sessionmaker(autocommit=False, autoflush=False, bind=e) for e in engines]
+                    self._engines = engines
+
+    @property
+    def engines(self) -> list:
+        self._ensure_engines()
+        return self._engines
+
+    @property
+    def session_factories(self) -> list:
+        self._ensure_engines()
+        return self._session_factories
+
+    def _primary(self) -> dict:
+        checked_at, versions = self._primary_versions
+        if time.monotonic() - checked_at > self.check_interval:
+            session = self.primary_session_factory()
+            try:
+                versions = _read_versions(session)
+            finally:
+                session.close()
+            self._primary_versions = (time.monotonic(), versions)
+        return versions
+
+    def _replica(self, index: int):
+        checked_at, versions = self._status.get(index, (0.0, None))
+        if time.monotonic() - checked_at > self.check_interval:
+            session = self.session_factories[index]()
+            try:
+                versions = _read_versions(session)
+            except Exception:
+                versions = None  # replica mati / belum siap
+            finally:
+                session.close()
+            self._status[index] = (time.monotonic(), versions)
+        return versions
+
+    def lag(self, index: int):
+        """Jumlah versi data yang tertinggal dari primary (None jika replica tidak bisa dihubungi)"""
+        with self._lock:
+            replica = self._replica(index)
+            if replica is None:
+                return None
+            primary = self._primary()
+        return sum(max(v - replica.get(scope, 0), 0) for scope, v in primary.items())
+
+    def session(self, min_versions: dict = None):
+        """Session replica yang sehat & cukup mutakhir, atau None (pakai primary)"""
+        factory = self.session_factory(min_versions)
+        return factory() if factory else None
+
+    def session_factory(self, min_versions: dict = None):
+        """Seperti session(), tapi return sessionmaker replica (untuk dipakai ulang dalam satu request)"""
+        if not self.enabled:
+            return None
+
+        start = next(self._next)
+        for i in range(len(self.engines)):
+            index = (start + i) % len(self.engines)
+            lag = self.lag(index)
+            if lag is None or lag > self.max_lag:
+                continue
+            if min_versions:
+                replica = self._status[index][1]
+                if any(replica.get(scope, 0) < v for scope, v in min_versions.items()):
+                    continue
+            return self.session_factories[index]
+        return None
+
+replica_router = ReplicaRouter(
+    SessionLocal, DB_REPLICA_URLS,
+    max_lag=DB_REPLICA_MAX_LAG, check_interval=DB_REPLICA_CHECK_INTERVAL
+)
+
+def _register_after_fork(fn):
+    # Dipanggil di proses anak setelah fork (worker gunicorn, process pool)
+    if hasattr(os, "register_at_fork"):
+        os.register_at_fork(after_in_child=fn)
+
+class WriteQueue:
+    """
+    Antrian penulisan tunggal (single-writer) untuk mode SQLite.
+    SQLite hanya mengizinkan satu penulis; daripada banyak thread berebut kunci
+    (dan gagal SQLITE_BUSY), semua posting dijalankan berurutan (FIFO) oleh satu
+    thread penulis. Untuk PostgreSQL fungsi langsung dijalankan di thread pemanggil.
+    """
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        metrics.gauge("db.write_queue.depth", lambda: self._pending)
+        _register_after_fork(self._after_fork)
+
+    def _after_fork(self):
+        # Thread penulis milik parent tidak ikut ke proses anak
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=WRITER_THREAD_NAME)
+        return self._executor
+
+    def run(self, fn, *args, **kwargs):
+        """Jalankan fn di thread penulis dan tunggu hasilnya (exception ikut diteruskan)"""
+        if not self.enabled:
+            return fn(*args, **kwargs)
+
+        with self._lock:
+            self._pending += 1
+        try:
+            with metrics.timer("db.write_queue.seconds"):
+                return self.executor.submit(fn, *args, **kwargs).result()
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+write_queue = WriteQueue(enabled=IS_SQLITE)
+
+# --- GROUP COMMIT (opsional) ---
+# Posting jurnal yang datang bersamaan digabung ke satu transaksi database
+# (satu fsync) oleh thread pengumpul. Aktifkan: GROUP_COMMIT=1
+GROUP_COMMIT_ENABLED = os.getenv("GROUP_COMMIT", "0") == "1"
+GROUP_COMMIT_MAX_BATCH = int(os.getenv("GROUP_COMMIT_MAX_BATCH", "64"))
+GROUP_COMMIT_MAX_WAIT_MS = float(os.getenv("GROUP_COMMIT_MAX_WAIT_MS", "5"))
+
+class GroupCommitQueue:
+    """
+    Group commit: request memasukkan pekerjaan fn(session, *args) ke antrian,
+    thread pengumpul mengambil sebanyak-banyaknya `max_batch` pekerjaan yang
+    datang dalam `max_wait` detik lalu menjalankannya dalam SATU transaksi:
+    - tiap pekerjaan dibungkus SAVEPOINT: yang gagal (validasi, akun tidak ada,
+      tahun buku ditutup) di-rollback sendiri & exception-nya dikembalikan ke
+      pemanggilnya, pekerjaan lain di batch tetap di-commit
+    - before_commit(session) dipanggil sekali per batch (misal: naikkan versi data)
+    - jika COMMIT batch gagal, setiap pekerjaan diulang satu per satu dengan
+      transaksinya sendiri, sehingga satu jurnal tidak menggagalkan yang lain
+    Hasil fn harus sudah lepas dari session (misal schema Pydantic), karena
+    session ditutup setelah batch selesai.
+    Di mode SQLite batch dijalankan lewat write_queue (tetap satu penulis).
+    """
+
+    def __init__(self, session_factory, enabled: bool = False, max_batch: int = GROUP_COMMIT_MAX_BATCH,
+                 max_wait: float = GROUP_COMMIT_MAX_WAIT_MS / 1000, before_commit=None, runner=None):
+        self.session_factory = session_factory
+        self.enabled = enabled
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.before_commit = before_commit
+        self.runner = runner or write_queue
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        metrics.gauge("db.group_commit.depth", lambda: self._queue.qsize())
+        _register_after_fork(self._after_fork)
+
+    def _after_fork(self):
+        # Thread pengumpul & antrian milik parent tidak berlaku di proses anak
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args):
+        """Jalankan fn(session, *args) di batch berikutnya dan tunggu hasilnya"""
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._loop, name="group-commit", daemon=True)
+                    self._thread.start()
+        future = Future()
+        self._queue.put((fn, args, future))
+        return future.result()
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            try:
+                self.runner.run(self._run_batch, batch)
+            except Exception as e:  # pengaman: jangan sampai pemanggil menunggu selamanya
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _run_batch(self, batch: list):
+        metrics.incr("db.group_commit.batches")
+        metrics.incr("db.group_commit.jobs", len(batch))
+        with metrics.timer("db.group_commit.seconds"):
+            results = {}
+            session = self.session_factory()
+            try:
+                for i, (fn, args, _) in enumerate(batch):
+                    savepoint = session.begin_nested()
+                    try:
+                        results[i] = (fn(session, *args), None)
+                        savepoint.commit()
+                    except Exception as e:
+                        savepoint.rollback()
+                        results[i] = (None, e)
+                if any(error is None for _, error in results.values()):
+                    if self.before_commit:
+                        self.before_commit(session)
+                    session.commit()
+            except Exception:
+                session.rollback()
+                metrics.incr("db.group_commit.batch_failed")
+                self._run_individually(batch)
+                return
+            finally:
+                session.close()
+
+        for i, (_, _, future) in enumerate(batch):
+            result, error = results[i]
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def _run_individually(self, batch: list):
+        for fn, args, future in batch:
+            session = self.session_factory()
+            try:
+                result = fn(session, *args)
+                if self.before_commit:
+                    self.before_commit(session)
+                session.commit()
+                future.set_result(result)
+            except Exception as e:
+                session.rollback()
+                future.set_exception(e)
+            finally:
+                session.close()
+
+def dispose_engines(close: bool = True):
+    """
+    Lepas semua koneksi pool (primary & replica) yang sudah dibuat.
+    close=False dipakai di proses hasil fork: koneksi milik parent
+    ditinggalkan tanpa ditutup agar tidak mengganggu parent.
+    """
+    if _engine is not None:
+        _engine.dispose(close=close)
+    for e in replica_router._engines or []:
+        e.dispose(close=close)
+
+def _after_fork_in_child():
+    """
+    Setiap proses hasil fork (prefork server, process pool) membuat pool
+    koneksinya sendiri: koneksi warisan parent ditinggalkan tanpa ditutup
+    (socket-nya masih dipakai parent / worker lain).
+    """
+    global _engine_lock
+    _engine_lock = threading.Lock()
+    dispose_engines(close=False)
+
+_register_after_fork(_after_fork_in_child)
+
 def get_db():
     db = SessionLocal()
     try:
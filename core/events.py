@@ -0,0 +1,135 @@
+import os
+import threading
+import time
+from collections import deque, namedtuple
+from core.metrics import metrics
+
+Event = namedtuple("Event", "seq id name data")
+
+class EventBroker:
+    """
+    Fan-out event ke banyak subscriber (dipakai SSE /transactions/stream).
+    - Satu buffer bersama berukuran tetap (deque maxlen), bukan antrian per
+      subscriber: memori tidak bertambah walau subscriber banyak / lambat
+    - Setiap event punya nomor urut (seq); subscriber cukup mengingat seq
+      terakhir yang sudah dikirim. Nomor boleh berlubang
+    - Subscriber yang tertinggal lebih jauh dari isi buffer diberi tanda
+      `lost` agar client memuat ulang data lewat REST
+    - Sumber event: publish() dari proses ini, atau poll_from(fetch) yang
+      membaca database (seq = change_seq). Dengan poll, setiap worker gunicorn
+      melihat jurnal dari semua worker; satu subscriber yang sedang menunggu
+      menjalankan poll untuk semuanya (paling sering sekali per `interval`)
+    - Event hanya disimpan jika ada subscriber; client yang reconnect
+      mengejar ketinggalan dari database (lihat route stream)
+    - Maksimal `max_subscribers` subscriber (0 = tanpa batas): setiap koneksi SSE
+      memegang satu thread server selama terbuka
+    """
+
+    def __init__(self, max_events: int = 1000, max_subscribers: int = 0):
+        self.max_subscribers = max_subscribers
+        self._events = deque(maxlen=max_events)
+        self._cond = threading.Condition()
+        self._seq = 0      # seq event terakhir yang diketahui broker
+        self._floor = 0    # semua event dengan seq > _floor ada di buffer
+        self._subscribers = 0
+        self._fetch = None
+        self._interval = 1.0
+        self._synced = True
+        self._polling = False
+        self._next_poll = 0.0
+        metrics.gauge("events.subscribers", lambda: self._subscribers)
+
+    @property
+    def has_subscribers(self) -> bool:
+        return self._subscribers > 0
+
+    def poll_from(self, fetch, interval: float = 1.0):
+        """
+        Ambil event dari sumber luar: fetch(after_seq) -> [(seq, id, name, data), ...]
+        urut seq, hanya seq > after_seq.
+        """
+        with self._cond:
+            self._fetch = fetch
+            self._interval = interval
+            self._synced = False
+
+    def subscribe(self):
+        """Daftarkan subscriber; return posisi (seq) awal untuk wait(), None jika sudah penuh"""
+        with self._cond:
+            if self.max_subscribers and self._subscribers >= self.max_subscribers:
+                metrics.incr("events.rejected")
+                return None
+            self._subscribers += 1
+            return self._seq
+
+    def unsubscribe(self):
+        with self._cond:
+            self._subscribers -= 1
+            if self._fetch is not None and not self._subscribers:
+                # Tanpa subscriber tidak ada poll: posisi diambil lagi dari subscriber berikutnya
+                self._events.clear()
+                self._synced = False
+
+    def publish(self, name: str, event_id: int, payload: str):
+        """Kirim event (payload JSON, di-serialize sekali) ke semua subscriber"""
+        if not self.has_subscribers:
+            return
+        with self._cond:
+            self._append(Event(self._seq + 1, event_id, name, payload))
+            self._cond.notify_all()
+        metrics.incr("events.published")
+
+    def _append(self, event: Event):
+        if len(self._events) == self._events.maxlen:
+            self._floor = self._events[0].seq
+        self._events.append(event)
+        self._seq = event.seq
+
+    def _poll(self):
+        """Dipanggil dengan _cond dipegang; kunci dilepas selama fetch (query database)"""
+        self._polling = True
+        after = self._seq
+        self._cond.release()
+        try:
+            rows = self._fetch(after)
+        except Exception:
+            metrics.incr("events.poll_failed")
+            rows = []
+        finally:
+            self._cond.acquire()
+            self._polling = False
+        for row in rows:
+            if row[0] > self._seq:
+                self._append(Event(*row))
+        if rows:
+            metrics.incr("events.published", len(rows))
+        self._next_poll = time.monotonic() + self._interval
+        self._cond.notify_all()
+
+    def wait(self, position: int, timeout: float):
+        """
+        Tunggu event setelah `position` (maks `timeout` detik).
+        Return (events, posisi_baru, lost); lost=True jika ada event yang
+        sudah terbuang dari buffer sebelum sempat dikirim.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            if not self._synced or (position < self._floor and not self._events):
+                # Poll pertama (atau buffer kosong): mulai dari posisi subscriber ini
+                self._seq = self._floor = position
+                self._synced = True
+            while self._seq <= position:
+                now = time.monotonic()
+                if now >= deadline:
+                    break
+                if self._fetch is not None and not self._polling and now >= self._next_poll:
+                    self._poll()
+                    continue
+                wake = deadline if self._fetch is None or self._polling else min(deadline, self._next_poll)
+                self._cond.wait(max(wake - now, 0))
+            events = [e for e in self._events if e.seq > position]
+            return events, max(position, self._seq), position < self._floor
+
+# SSE_MAX_SUBSCRIBERS: di gunicorn diisi otomatis (gunicorn.conf.py) agar thread tersisa untuk request lain
+journal_events = EventBroker(max_events=int(os.getenv("SSE_BUFFER_SIZE", "1000")),
+                             max_subscribers=int(os.getenv("SSE_MAX_SUBSCRIBERS", "0")))
@@ -0,0 +1,298 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy import delete, update
+from core.metrics import metrics
+from models.job import ReportJob
+
+class QueueFull(Exception):
+    """Jumlah job belum selesai sudah mencapai `max_pending` (route membalas 503)"""
+
+def _timed_call(func, params: dict, store=None, job_id: str = None):
+    """Dijalankan di worker: eksekusi job dan ukur lama prosesnya (status ditulis ke store jika ada)"""
+    if store is not None:
+        store.start(job_id)
+    start = time.perf_counter()
+    try:
+        result = func(**params)
+    except Exception as e:
+        if store is not None:
+            store.fail(job_id, str(e))
+        raise
+    run_seconds = time.perf_counter() - start
+    if store is not None:
+        store.finish(job_id, result, run_seconds)
+    return result, run_seconds
+
+def _init_worker():
+    """
+    Worker process hasil fork tidak boleh memakai koneksi pool milik parent.
+    Buang pool yang diwarisi (tanpa menutup koneksi parent).
+    """
+    from core.database import dispose_engines
+    dispose_engines(close=False)
+
+class Job:
+    def __init__(self, job_id: str, name: str, params: dict, future):
+        self.id = job_id
+        self.name = name
+        self.params = params
+        self.future = future
+        self.submitted_at = datetime.now()
+        self.run_seconds = None
+
+    @property
+    def status(self) -> str:
+        if not self.future.done():
+            return "running" if self.future.running() else "pending"
+        # exception()/result() melempar CancelledError untuk future yang dibatalkan
+        if self.future.cancelled():
+            return "cancelled"
+        return "failed" if self.future.exception() else "done"
+
+    def to_dict(self, include_result: bool = True) -> dict:
+        data = {
+            "job_id": self.id,
+            "report": self.name,
+            "params": self.params,
+            "status": self.status,
+            "submitted_at": self.submitted_at.isoformat(),
+            "run_seconds": self.run_seconds,
+        }
+        if include_result and data["status"] in ("done", "failed"):
+            error = self.future.exception()
+            if error:
+                data["error"] = str(error)
+            else:
+                result, run_seconds = self.future.result()
+                data["result"] = result
+                # Dari hasil future langsung: callback _finish mungkin belum jalan
+                data["run_seconds"] = run_seconds
+        return data
+
+class StoredJob:
+    """Job yang dibaca dari tabel report_jobs (bisa disubmit oleh worker lain)"""
+
+    def __init__(self, row: ReportJob):
+        self.id = row.id
+        self.name = row.name
+        self.status = row.status
+        self._row = row
+
+    def to_dict(self, include_result: bool = True) -> dict:
+        row = self._row
+        data = {
+            "job_id": row.id,
+            "report": row.name,
+            "params": json.loads(row.params),
+            "status": row.status,
+            "submitted_at": row.submitted_at.isoformat(),
+            "run_seconds": row.run_seconds,
+        }
+        if include_result and row.status == "done":
+            data["result"] = json.loads(row.result)
+        elif include_result and row.status == "failed":
+            data["error"] = row.error
+        return data
+
+class JobStore:
+    """
+    Status & hasil job di database (tabel report_jobs), dibagi semua worker gunicorn.
+    - Baris dibuat & dibaca worker web dengan session request (create/find_active/get)
+    - Status running/done/failed ditulis process pool dengan session sendiri
+      (session_factory; default core.database.SessionLocal, dibaca saat dipakai
+      agar store bisa di-pickle ke process pool)
+    - Job aktif yang lebih tua dari `stale_seconds` (worker-nya mati/di-restart)
+      tidak lagi dipakai untuk penggabungan; hasil job selesai dihapus setelah `ttl_seconds`
+    """
+    ACTIVE = ("pending", "running")
+
+    def __init__(self, session_factory=None, ttl_seconds: int = 86400, stale_seconds: int = 3600):
+        self.session_factory = session_factory
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+
+    def _session(self):
+        if self.session_factory is not None:
+            return self.session_factory()
+        from core.database import SessionLocal
+        return SessionLocal()
+
+    def create(self, db, job_id: str, name: str, params: dict, key: str) -> StoredJob:
+        """Simpan job baru (pending) lalu commit, sebelum disubmit ke process pool"""
+        now = datetime.now()
+        db.execute(delete(ReportJob).where(ReportJob.finished_at < now - timedelta(seconds=self.ttl_seconds)))
+        row = ReportJob(id=job_id, name=name, params=json.dumps(params, default=str), params_key=key,
+                        status="pending", submitted_at=now)
+        db.add(row)
+        db.commit()
+        return StoredJob(row)
+
+    def find_active(self, db, key: str):
+        row = db.query(ReportJob).filter(
+            ReportJob.params_key == key, ReportJob.status.in_(self.ACTIVE),
+            ReportJob.submitted_at > datetime.now() - timedelta(seconds=self.stale_seconds)
+        ).order_by(ReportJob.submitted_at.desc()).first()
+        return StoredJob(row) if row else None
+
+    def count_active(self, db) -> int:
+        """Jumlah job pending/running (yang belum basi) di semua worker"""
+        return db.query(ReportJob).filter(
+            ReportJob.status.in_(self.ACTIVE),
+            ReportJob.submitted_at > datetime.now() - timedelta(seconds=self.stale_seconds)
+        ).count()
+
+    def get(self, db, job_id: str):
+        row = db.get(ReportJob, job_id, populate_existing=True)
+        return StoredJob(row) if row else None
+
+    def _update(self, job_id: str, *filters, **values):
+        db = self._session()
+        try:
+            db.execute(update(ReportJob).where(ReportJob.id == job_id, *filters).values(**values))
+            db.commit()
+        finally:
+            db.close()
+
+    def start(self, job_id: str):
+        self._update(job_id, status="running")
+
+    def finish(self, job_id: str, result, run_seconds: float):
+        self._update(job_id, status="done", finished_at=datetime.now(), run_seconds=run_seconds,
+                     result=json.dumps(result, default=str))
+
+    def fail(self, job_id: str, error: str):
+        # Hanya job yang belum selesai: dipanggil juga oleh worker web jika process pool mati
+        self._update(job_id, ReportJob.status.in_(self.ACTIVE), status="failed", finished_at=datetime.now(), error=error)
+
+class JobQueue:
+    """
+    Antrian job laporan berat yang dijalankan di process pool.
+    - submit() langsung mengembalikan Job (hasil diambil belakangan lewat get())
+    - Request identik (nama + parameter sama) yang masih berjalan digabung
+      ke job yang sama (coalescing)
+    - Hasil disimpan maksimal `max_results` job terakhir
+    - Dengan `store` (JobStore): status & hasil disimpan di database, submit()/get()
+      memakai session request (`db`), dan penggabungan berlaku lintas worker.
+      Process pool & depth() tetap per worker
+    - Job baru ditolak (QueueFull) jika job yang belum selesai sudah `max_pending`
+      (dengan store dihitung lintas worker); request yang digabung tetap diterima
+    """
+
+    def __init__(self, max_workers: int = None, executor=None, max_results: int = 500, store: JobStore = None,
+                 max_pending: int = None):
+        self._max_workers = max_workers
+        self._executor = executor
+        self._max_results = max_results
+        self.max_pending = max_pending
+        self.store = store
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        self._inflight = {}  # key -> job_id
+
+        metrics.gauge("jobs.queue_depth", self.depth)
+
+    @property
+    def executor(self):
+        # Process pool baru dibuat saat job pertama masuk (tidak memperlambat start)
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self._max_workers, initializer=_init_worker)
+        return self._executor
+
+    def depth(self) -> int:
+        """Jumlah job yang belum selesai (pending + running)"""
+        with self._lock:
+            return self._depth()
+
+    def _depth(self) -> int:
+        return sum(1 for job in self._jobs.values() if not job.future.done())
+
+    def submit(self, name: str, func, params: dict, db=None):
+        """Return (job, coalesced); QueueFull jika antrian penuh"""
+        key = (name, json.dumps(params, sort_keys=True, default=str))
+        if self.store is not None:
+            return self._submit_stored(db, name, func, params, hashlib.sha1("\0".join(key).encode()).hexdigest())
+
+        with self._lock:
+            running = self._jobs.get(self._inflight.get(key))
+            if running and not running.future.done():
+                metrics.incr("jobs.coalesced")
+                return running, True
+            if self.max_pending is not None and self._depth() >= self.max_pending:
+                metrics.incr("jobs.rejected")
+                raise QueueFull(f"Antrian job penuh ({self.max_pending})")
+
+            job_id = uuid.uuid4().hex
+            future = self.executor.submit(_timed_call, func, params)
+            job = Job(job_id, name, params, future)
+            self._jobs[job_id] = job
+            self._inflight[key] = job_id
+            self._evict()
+
+        metrics.incr("jobs.submitted")
+        future.add_done_callback(lambda f: self._finish(key, job, f))
+        return job, False
+
+    def _submit_stored(self, db, name: str, func, params: dict, key: str):
+        active = self.store.find_active(db, key)
+        if active:
+            metrics.incr("jobs.coalesced")
+            return active, True
+        if self.max_pending is not None and self.store.count_active(db) >= self.max_pending:
+            metrics.incr("jobs.rejected")
+            raise QueueFull(f"Antrian job penuh ({self.max_pending})")
+
+        job_id = uuid.uuid4().hex
+        stored = self.store.create(db, job_id, name, params, key)
+        try:
+            future = self.executor.submit(_timed_call, func, params, self.store, job_id)
+        except Exception as e:
+            self.store.fail(job_id, str(e))
+            raise
+        job = Job(job_id, name, params, future)
+        with self._lock:
+            self._jobs[job_id] = job
+            self._evict()
+
+        metrics.incr("jobs.submitted")
+        future.add_done_callback(lambda f: self._finish(None, job, f))
+        return stored, False
+
+    def get(self, job_id: str, db=None):
+        if self.store is not None:
+            return self.store.get(db, job_id)
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _finish(self, key, job: Job, future):
+        with self._lock:
+            if self._inflight.get(key) == job.id:
+                del self._inflight[key]
+
+        if future.cancelled() or future.exception():
+            metrics.incr("jobs.failed")
+            if self.store is not None:
+                # Process pool mati / job dibatalkan: worker pool tidak sempat menulis status
+                self.store.fail(job.id, "dibatalkan" if future.cancelled() else str(future.exception()))
+            return
+
+        job.run_seconds = future.result()[1]
+        metrics.observe(f"jobs.run.{job.name}", job.run_seconds)
+
+    def _evict(self):
+        # Buang hasil job paling lama yang sudah selesai jika melebihi kapasitas
+        excess = len(self._jobs) - self._max_results
+        for job_id in [j.id for j in self._jobs.values() if j.future.done()][:max(excess, 0)]:
+            del self._jobs[job_id]
+
+report_queue = JobQueue(max_workers=int(os.getenv("REPORT_WORKERS", "2")),
+                        max_pending=int(os.getenv("JOB_MAX_PENDING", "20")), store=JobStore(
+    ttl_seconds=int(os.getenv("JOB_RESULT_TTL_SECONDS", "86400")),
+    stale_seconds=int(os.getenv("JOB_STALE_SECONDS", "3600"))
+))
@@ -0,0 +1,58 @@
+import threading
+import time
+from contextlib import contextmanager
+
+class Metrics:
+    """
+    Registry metrik sederhana (counter, gauge, timer) yang thread-safe.
+    Isinya ditampilkan lewat endpoint GET /metrics.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._timers = {}
+
+    def incr(self, name: str, value: int = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def gauge(self, name: str, fn):
+        """Daftarkan gauge; fn dipanggil saat snapshot (misal: panjang antrian)"""
+        with self._lock:
+            self._gauges[name] = fn
+
+    def observe(self, name: str, seconds: float):
+        """Catat satu durasi (count, total, max)"""
+        with self._lock:
+            t = self._timers.setdefault(name, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+            t["count"] += 1
+            t["total_seconds"] += seconds
+            t["max_seconds"] = max(t["max_seconds"], seconds)
+
+    @contextmanager
+    def timer(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            timers = {k: dict(v) for k, v in self._timers.items()}
+
+        for t in timers.values():
+            t["avg_seconds"] = t["total_seconds"] / t["count"] if t["count"] else 0.0
+
+        return {
+            "counters": counters,
+            "gauges": {name: fn() for name, fn in gauges.items()},
+            "timers": timers,
+        }
+
+# Instance global yang dipakai seluruh aplikasi
+metrics = Metrics()
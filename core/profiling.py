@@ -0,0 +1,227 @@
+"""
+Profiling per request untuk admin (untuk kasus "laporan lambat" yang tidak bisa direproduksi).
+
+Aktif jika request membawa `?profile=1` atau header `X-Profile: 1` DAN token admin.
+Request tersebut dijalankan di bawah cProfile + tracemalloc, dan semua SQL yang
+dieksekusi thread request dicatat. Hasilnya (fungsi teratas, lokasi alokasi
+memori, SQL) disimpan di memori dan id-nya dikirim lewat header X-Profile-Id
+(lihat GET /admin/profiles/<id>).
+
+Batas sampling agar aman tetap aktif di production:
+- hanya PROFILE_MAX_CONCURRENT request yang diprofil bersamaan, dan paling
+  sering sekali tiap PROFILE_MIN_INTERVAL detik; selebihnya jalan normal
+  (header X-Profile: skipped)
+- jumlah fungsi / alokasi / SQL yang disimpan dibatasi, begitu pula jumlah
+  laporan yang disimpan (laporan terlama dibuang)
+"""
+import cProfile
+import itertools
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict
+from datetime import datetime
+from flask import g, jsonify, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from core.metrics import metrics
+from core.security import get_token_payload
+
+PROFILE_ENABLED = os.getenv("PROFILE_ENABLED", "1") == "1"
+PROFILE_MAX_CONCURRENT = int(os.getenv("PROFILE_MAX_CONCURRENT", "1"))
+PROFILE_MIN_INTERVAL = float(os.getenv("PROFILE_MIN_INTERVAL", "5"))      # detik
+PROFILE_TOP_N = int(os.getenv("PROFILE_TOP_N", "30"))
+PROFILE_MAX_SQL = int(os.getenv("PROFILE_MAX_SQL", "200"))
+PROFILE_SQL_MAX_LENGTH = 2000                                            # karakter per statement
+PROFILE_TRACEMALLOC_FRAMES = int(os.getenv("PROFILE_TRACEMALLOC_FRAMES", "5"))
+PROFILE_STORE_SIZE = int(os.getenv("PROFILE_STORE_SIZE", "20"))
+
+class _SqlCapture(threading.local):
+    statements = None  # list jika thread ini sedang diprofil
+    started = None
+
+_sql = _SqlCapture()
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _sql.statements is not None:
+        _sql.started = time.perf_counter()
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    statements = _sql.statements
+    if statements is None or _sql.started is None:
+        return
+    statements.append((statement[:PROFILE_SQL_MAX_LENGTH], time.perf_counter() - _sql.started, executemany))
+    _sql.started = None
+
+class _TracemallocUsers:
+    """
+    tracemalloc berlaku untuk seluruh proses: dihitung berapa profil yang sedang memakainya,
+    dan baru dihentikan saat profil terakhir selesai (hanya jika dinyalakan oleh profiler)
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.owned = False
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            if self.count == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start(PROFILE_TRACEMALLOC_FRAMES)
+                self.owned = True
+            self.count += 1
+
+    def release(self):
+        with self._lock:
+            self.count -= 1
+            if self.count == 0 and self.owned:
+                tracemalloc.stop()
+                self.owned = False
+
+_tracemalloc = _TracemallocUsers()
+
+class RequestProfiler:
+    """Menyimpan & membatasi profiling request (lihat docstring modul)"""
+
+    def __init__(self, max_concurrent=PROFILE_MAX_CONCURRENT, min_interval=PROFILE_MIN_INTERVAL,
+                 top_n=PROFILE_TOP_N, max_sql=PROFILE_MAX_SQL, store_size=PROFILE_STORE_SIZE, enabled=PROFILE_ENABLED):
+        self.enabled = enabled
+        self.min_interval = min_interval
+        self.top_n = top_n
+        self.max_sql = max_sql
+        self.store_size = store_size
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self._last_started = 0.0
+        self._ids = itertools.count(1)
+        self._reports = OrderedDict()
+
+    def try_start(self) -> bool:
+        """Ambil jatah profiling; False jika sedang penuh atau terlalu sering"""
+        if not self._slots.acquire(blocking=False):
+            return False
+        with self._lock:
+            now = time.monotonic()
+            if self._last_started and now - self._last_started < self.min_interval:
+                self._slots.release()
+                return False
+            self._last_started = now
+        return True
+
+    def begin(self) -> dict:
+        state = {"started_at": datetime.now(), "start": time.perf_counter()}
+        _tracemalloc.acquire()
+        state["snapshot"] = tracemalloc.take_snapshot()
+        _sql.statements = []
+        state["profile"] = cProfile.Profile()
+        state["profile"].enable()
+        return state
+
+    def end(self, state: dict, status: int) -> str:
+        """Hentikan profiling, simpan laporan, return id laporan"""
+        try:
+            state["profile"].disable()
+            duration = time.perf_counter() - state["start"]
+            statements, _sql.statements = _sql.statements or [], None
+            after = tracemalloc.take_snapshot()
+
+            report = {
+                "method": request.method,
+                "path": request.full_path.rstrip("?"),
+                "status": status,
+                "started_at": state["started_at"].isoformat(),
+                "duration_seconds": round(duration, 6),
+                "functions": self._top_functions(state["profile"]),
+                "allocations": self._top_allocations(state["snapshot"], after),
+                "sql_count": len(statements),
+                "sql_total_seconds": round(sum(s[1] for s in statements), 6),
+                "sql": [{"statement": s, "seconds": round(t, 6), "executemany": many}
+                        for s, t, many in statements[:self.max_sql]],
+            }
+        finally:
+            _tracemalloc.release()
+            self._slots.release()
+
+        with self._lock:
+            report_id = str(next(self._ids))
+            report["id"] = report_id
+            self._reports[report_id] = report
+            while len(self._reports) > self.store_size:
+                self._reports.popitem(last=False)
+        metrics.incr("profiling.requests")
+        metrics.observe("profiling.request_seconds", duration)
+        return report_id
+
+    def _top_functions(self, profile) -> list:
+        stats = pstats.Stats(profile).stats
+        rows = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:self.top_n]
+        return [{
+            "function": f"{filename}:{line}({name})",
+            "calls": calls,
+            "total_seconds": round(tt, 6),
+            "cumulative_seconds": round(ct, 6),
+        } for (filename, line, name), (cc, calls, tt, ct, callers) in rows]
+
+    def _top_allocations(self, before, after) -> list:
+        # Catatan: tracemalloc mencatat alokasi seluruh proses, bukan hanya thread request
+        stats = after.compare_to(before, "lineno")
+        stats = [s for s in stats if s.size_diff > 0][:self.top_n]
+        return [{
+            "site": f"{s.traceback[0].filename}:{s.traceback[0].lineno}",
+            "size_kb": round(s.size_diff / 1024, 1),
+            "count": s.count_diff,
+        } for s in stats]
+
+    def get(self, report_id: str):
+        with self._lock:
+            return self._reports.get(report_id)
+
+    def list(self) -> list:
+        with self._lock:
+            reports = list(self._reports.values())
+        return [{k: r[k] for k in ("id", "method", "path", "status", "started_at", "duration_seconds", "sql_count")}
+                for r in reversed(reports)]
+
+    # --- Hook Flask ---
+
+    def _requested(self) -> bool:
+        flag = request.args.get("profile") or request.headers.get("X-Profile")
+        return bool(flag) and flag.lower() in ("1", "true", "yes")
+
+    def before_request(self):
+        if not self.enabled or not self._requested():
+            return None
+        payload = get_token_payload()
+        if payload is None or payload.get("role") != "admin":
+            return jsonify({"message": "Profiling hanya untuk admin"}), 403
+        if not self.try_start():
+            metrics.incr("profiling.skipped")
+            g.profile_skipped = True
+            return None
+        g.profile_state = self.begin()
+        return None
+
+    def after_request(self, response):
+        state = g.pop("profile_state", None)
+        if state is not None:
+            response.headers["X-Profile-Id"] = self.end(state, response.status_code)
+        elif g.pop("profile_skipped", False):
+            response.headers["X-Profile"] = "skipped"
+        return response
+
+    def teardown_request(self, exception=None):
+        # Request gagal sebelum after_request: lepaskan jatah profiling
+        state = g.pop("profile_state", None)
+        if state is not None:
+            self.end(state, 500)
+
+    def init_app(self, app):
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        app.teardown_request(self.teardown_request)
+
+profiler = RequestProfiler()
@@ -2,7 +2,7 @@ import jwt
 import bcrypt
 from datetime import datetime, timedelta, timezone
 from functools import wraps
-from flask import request, jsonify
+from flask import g, request, jsonify
 
 # Ganti dengan secret key yang sangat rahasia di production!
 SECRET_KEY = "rahasia_illahi_masjid_berkah"
@@ -44,7 +44,9 @@ def token_required(f):
             # Decode Token
             data = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
             # (Opsional) Kita bisa cek apakah user masih aktif di DB, tapi ini cukup untuk stateless
-            current_user = data['sub']
+            # Disimpan untuk request ini (audit log: siapa yang menulis)
+            g.current_user = data['sub']
+            g.token_payload = data
         except jwt.ExpiredSignatureError:
             return jsonify({'message': 'Token sudah kadaluarsa! Silakan login ulang.'}), 401
         except jwt.InvalidTokenError:
@@ -52,4 +54,29 @@ def token_required(f):
             
         return f(*args, **kwargs)
     
-    return decorated
\ No newline at end of file
+    return decorated
+
+def get_token_payload():
+    """Payload JWT dari header Authorization request ini, atau None jika tidak ada / tidak valid"""
+    auth_header = request.headers.get('Authorization', '')
+    if not auth_header.startswith('Bearer '):
+        return None
+    try:
+        return jwt.decode(auth_header.split(" ")[1], SECRET_KEY, algorithms=[ALGORITHM])
+    except jwt.InvalidTokenError:
+        return None
+
+def admin_required(f):
+    """Seperti token_required, tapi hanya untuk user dengan role admin"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        payload = get_token_payload()
+        if payload is None:
+            return jsonify({'message': 'Token tidak ditemukan atau tidak valid! Harap login.'}), 401
+        if payload.get('role') != 'admin':
+            return jsonify({'message': 'Hanya admin yang boleh mengakses'}), 403
+        g.current_user = payload.get('sub')
+        g.token_payload = payload
+        return f(*args, **kwargs)
+
+    return decorated
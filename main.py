@@ -1,25 +1,27 @@
 from sqlalchemy import func
 from core.database import SessionLocal
-from models.finance import Account, AccountType, Transaction, TransactionEntry, EntryType
+from models.finance import Account, Transaction, TransactionEntry, EntryType
+from api.services import assign_running_balances, update_period_totals, next_change_seq
+from api.coa import import_accounts
+
+DEFAULT_COA = [
+    # Harta
+    {"code": "1001", "name": "Kas Takmir", "account_type": "ASSET"},
+    {"code": "1002", "name": "Kas Pembangunan", "account_type": "ASSET"},
+    # Pemasukan
+    {"code": "4001", "name": "Infaq Kotak Jumat", "account_type": "REVENUE"},
+    {"code": "4002", "name": "Infaq Pembangunan", "account_type": "REVENUE"},
+    # Pengeluaran
+    {"code": "5001", "name": "Biaya Listrik", "account_type": "EXPENSE"},
+    {"code": "5002", "name": "Honor Muadzin", "account_type": "EXPENSE"},
+]
 
 def init_coa(db):
     """Membuat Chart of Accounts (COA) dasar jika belum ada"""
     if db.query(Account).count() > 0:
         return
 
-    coa_list = [
-        # Harta
-        Account(code="1001", name="Kas Takmir", account_type=AccountType.ASSET),
-        Account(code="1002", name="Kas Pembangunan", account_type=AccountType.ASSET),
-        # Pemasukan
-        Account(code="4001", name="Infaq Kotak Jumat", account_type=AccountType.REVENUE),
-        Account(code="4002", name="Infaq Pembangunan", account_type=AccountType.REVENUE),
-        # Pengeluaran
-        Account(code="5001", name="Biaya Listrik", account_type=AccountType.EXPENSE),
-        Account(code="5002", name="Honor Muadzin", account_type=AccountType.EXPENSE),
-    ]
-    db.add_all(coa_list)
-    db.commit()
+    import_accounts(db, DEFAULT_COA)
     print("Chart of Accounts berhasil dibuat.")
 
 def catat_pemasukan_infaq(db, jumlah: float, keterangan: str):
@@ -51,6 +53,12 @@ def catat_pemasukan_infaq(db, jumlah: float, keterangan: str):
     transaksi.entries = [entry_debit, entry_credit]
     
     db.add(transaksi)
+    db.flush()
+    # Isi saldo berjalan buku besar, ringkasan bulanan & versi data (sama seperti services.create_transaction)
+    assign_running_balances(db, transaksi)
+    update_period_totals(db, transaksi)
+    # Nomor urut perubahan sekaligus versi data 'ledger'
+    transaksi.change_seq = next_change_seq(db)
     db.commit()
     print(f"Transaksi Masuk: {keterangan} sebesar Rp {jumlah:,.2f}")
 
@@ -0,0 +1,46 @@
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import String, Integer, DateTime, Text, DDL, event
+from sqlalchemy.orm import Mapped, mapped_column
+from core.database import Base
+
+class AuditLog(Base):
+    """
+    Jejak audit penulisan (siapa memposting apa). Append-only: hanya INSERT,
+    UPDATE/DELETE ditolak trigger database. Ditulis di belakang (write-behind)
+    oleh core.audit.AuditWriter, bukan di jalur request.
+    """
+    __tablename__ = "audit_log"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    occurred_at: Mapped[datetime] = mapped_column(DateTime, index=True)   # waktu request (bukan waktu tulis)
+    username: Mapped[Optional[str]] = mapped_column(String(50), nullable=True, index=True)  # claim `sub` token
+    method: Mapped[str] = mapped_column(String(10))
+    route: Mapped[str] = mapped_column(String(255))
+    status: Mapped[int] = mapped_column(Integer)
+    payload_hash: Mapped[str] = mapped_column(String(64))                 # SHA-256 body request
+    resource: Mapped[str] = mapped_column(String(30))                     # transaction, account, ...
+    resource_ids: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # id hasil, dipisah koma
+
+    __table_args__ = {"sqlite_autoincrement": True}
+
+# --- APPEND-ONLY ---
+# Dibuat oleh migration; listener di bawah membuatnya juga saat create_all (dev/test).
+_sqlite_append_only_ddl = [
+    "CREATE TRIGGER IF NOT EXISTS audit_log_no_update BEFORE UPDATE ON audit_log "
+    "BEGIN SELECT RAISE(ABORT, 'audit_log hanya boleh ditambah'); END",
+    "CREATE TRIGGER IF NOT EXISTS audit_log_no_delete BEFORE DELETE ON audit_log "
+    "BEGIN SELECT RAISE(ABORT, 'audit_log hanya boleh ditambah'); END",
+]
+
+_postgres_append_only_ddl = [
+    "CREATE OR REPLACE FUNCTION audit_log_append_only() RETURNS trigger AS $$ "
+    "BEGIN RAISE EXCEPTION 'audit_log hanya boleh ditambah'; END; $$ LANGUAGE plpgsql",
+    "CREATE TRIGGER audit_log_append_only BEFORE UPDATE OR DELETE ON audit_log "
+    "FOR EACH ROW EXECUTE FUNCTION audit_log_append_only()",
+]
+
+for _stmt in _sqlite_append_only_ddl:
+    event.listen(AuditLog.__table__, "after_create", DDL(_stmt).execute_if(dialect="sqlite"))
+for _stmt in _postgres_append_only_ddl:
+    event.listen(AuditLog.__table__, "after_create", DDL(_stmt).execute_if(dialect="postgresql"))
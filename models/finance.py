@@ -1,7 +1,7 @@
 import enum
-from datetime import datetime
+from datetime import date, datetime
 from typing import List, Optional
-from sqlalchemy import String, Integer, ForeignKey, DateTime, DECIMAL, Text, Enum
+from sqlalchemy import String, Integer, BigInteger, ForeignKey, Date, DateTime, DECIMAL, Text, Enum, DDL, Index, UniqueConstraint, event
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from core.database import Base
 
@@ -26,6 +26,8 @@ class Account(Base):
     name: Mapped[str] = mapped_column(String(100)) # Contoh: Kas Masjid, Infaq Jumat
     account_type: Mapped[AccountType] = mapped_column(Enum(AccountType))
     description: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    # Nomor urut perubahan terakhir (feed /sync, lihat services.next_change_seq)
+    change_seq: Mapped[Optional[int]] = mapped_column(Integer, nullable=True, index=True)
 
     # Relasi ke jurnal
     entries: Mapped[List["TransactionEntry"]] = relationship(back_populates="account")
@@ -34,11 +36,13 @@ class Transaction(Base):
     __tablename__ = "transactions"
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
-    transaction_date: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
+    transaction_date: Mapped[datetime] = mapped_column(DateTime, default=datetime.now, index=True)
     description: Mapped[str] = mapped_column(String(255)) # Keterangan transaksi
     reference_no: Mapped[Optional[str]] = mapped_column(String(50), nullable=True) # No Bukti/Kwitansi
     
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
+    # Nomor urut perubahan (feed /sync); jurnal tidak diubah setelah diposting
+    change_seq: Mapped[Optional[int]] = mapped_column(Integer, nullable=True, index=True)
 
     # Relasi: Satu transaksi punya banyak baris jurnal (Debit & Kredit)
     entries: Mapped[List["TransactionEntry"]] = relationship(
@@ -46,15 +50,177 @@ class Transaction(Base):
         cascade="all, delete-orphan"
     )
 
+    # SQLite: id tidak boleh dipakai ulang setelah baris terbesar dipindah ke arsip
+    __table_args__ = {"sqlite_autoincrement": True}
+
+# --- INDEX PENCARIAN (FULL-TEXT) ---
+# Dibuat oleh migration; listener di bawah membuatnya juga saat create_all (dev/test).
+# SQLite: tabel virtual FTS5 (external content) yang disinkronkan lewat trigger.
+# PostgreSQL: index GIN tsvector (prefix) + pg_trgm (fuzzy).
+# SQLite fuzzy: tabel FTS5 kedua dengan tokenizer trigram.
+TRANSACTION_SEARCH_TSVECTOR = "to_tsvector('simple', coalesce(description, '') || ' ' || coalesce(reference_no, ''))"
+
+_sqlite_search_ddl = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5("
+    "description, reference_no, content='transactions', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS transactions_fts_ai AFTER INSERT ON transactions BEGIN "
+    "INSERT INTO transactions_fts(rowid, description, reference_no) VALUES (new.id, new.description, new.reference_no); END",
+    "CREATE TRIGGER IF NOT EXISTS transactions_fts_ad AFTER DELETE ON transactions BEGIN "
+    "INSERT INTO transactions_fts(transactions_fts, rowid, description, reference_no) "
+    "VALUES ('delete', old.id, old.description, old.reference_no); END",
+    "CREATE TRIGGER IF NOT EXISTS transactions_fts_au AFTER UPDATE ON transactions BEGIN "
+    "INSERT INTO transactions_fts(transactions_fts, rowid, description, reference_no) "
+    "VALUES ('delete', old.id, old.description, old.reference_no); "
+    "INSERT INTO transactions_fts(rowid, description, reference_no) VALUES (new.id, new.description, new.reference_no); END",
+    # Trigram (SQLite >= 3.34) untuk pencarian fuzzy, seperti pg_trgm
+    "CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts_trigram USING fts5("
+    "description, reference_no, content='transactions', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS transactions_fts_trigram_ai AFTER INSERT ON transactions BEGIN "
+    "INSERT INTO transactions_fts_trigram(rowid, description, reference_no) VALUES (new.id, new.description, new.reference_no); END",
+    "CREATE TRIGGER IF NOT EXISTS transactions_fts_trigram_ad AFTER DELETE ON transactions BEGIN "
+    "INSERT INTO transactions_fts_trigram(transactions_fts_trigram, rowid, description, reference_no) "
+    "VALUES ('delete', old.id, old.description, old.reference_no); END",
+    "CREATE TRIGGER IF NOT EXISTS transactions_fts_trigram_au AFTER UPDATE ON transactions BEGIN "
+    "INSERT INTO transactions_fts_trigram(transactions_fts_trigram, rowid, description, reference_no) "
+    "VALUES ('delete', old.id, old.description, old.reference_no); "
+    "INSERT INTO transactions_fts_trigram(rowid, description, reference_no) VALUES (new.id, new.description, new.reference_no); END",
+]
+
+_postgres_search_ddl = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS ix_transactions_search ON transactions USING gin ({TRANSACTION_SEARCH_TSVECTOR})",
+    "CREATE INDEX IF NOT EXISTS ix_transactions_description_trgm ON transactions USING gin (description gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_transactions_reference_no_trgm ON transactions USING gin (reference_no gin_trgm_ops)",
+]
+
+for _stmt in _sqlite_search_ddl:
+    event.listen(Transaction.__table__, "after_create", DDL(_stmt).execute_if(dialect="sqlite"))
+for _stmt in _postgres_search_ddl:
+    event.listen(Transaction.__table__, "after_create", DDL(_stmt).execute_if(dialect="postgresql"))
+for _table in ("transactions_fts", "transactions_fts_trigram"):
+    event.listen(Transaction.__table__, "before_drop", DDL(f"DROP TABLE IF EXISTS {_table}").execute_if(dialect="sqlite"))
+
 class TransactionEntry(Base):
     __tablename__ = "transaction_entries"
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
-    transaction_id: Mapped[int] = mapped_column(ForeignKey("transactions.id"))
-    account_id: Mapped[int] = mapped_column(ForeignKey("accounts.id"))
+    transaction_id: Mapped[int] = mapped_column(ForeignKey("transactions.id"), index=True)
+    account_id: Mapped[int] = mapped_column(ForeignKey("accounts.id"), index=True)
     
     entry_type: Mapped[EntryType] = mapped_column(Enum(EntryType)) # Debit / Kredit
     amount: Mapped[float] = mapped_column(DECIMAL(15, 2)) # Nominal uang
+
+    # Posisi entry di buku besar akunnya (slot per bulan) & saldo kumulatif (Debit - Kredit)
+    # sejak awal bulan s/d entry ini. Diisi saat posting (services.assign_running_balances)
+    account_seq: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
+    running_balance: Mapped[Optional[float]] = mapped_column(DECIMAL(18, 2), nullable=True)
+
+    # Rekonsiliasi bank: baris mutasi rekening yang dicocokkan dengan entry ini
+    statement_line_id: Mapped[Optional[int]] = mapped_column(
+        ForeignKey("bank_statement_lines.id", name="fk_transaction_entries_statement_line_id"), nullable=True, index=True
+    )
+    reconciled_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
     
     transaction: Mapped["Transaction"] = relationship(back_populates="entries")
-    account: Mapped["Account"] = relationship(back_populates="entries")
\ No newline at end of file
+    account: Mapped["Account"] = relationship(back_populates="entries")
+
+    __table_args__ = (
+        Index("ix_transaction_entries_account_seq", "account_id", "account_seq"),
+        {"sqlite_autoincrement": True},
+    )
+
+class AccountPeriodTotal(Base):
+    """
+    Ringkasan mutasi per akun per bulan (tabel fakta laporan periode).
+    Diperbarui saat posting (services.update_period_totals) dan bisa disusun
+    ulang dari nol (services.rebuild_period_totals). Mencakup jurnal aktif
+    maupun yang sudah diarsipkan, termasuk jurnal penutup.
+    """
+    __tablename__ = "account_period_totals"
+
+    account_id: Mapped[int] = mapped_column(ForeignKey("accounts.id"), primary_key=True)
+    month: Mapped[int] = mapped_column(Integer, primary_key=True)  # tahun * 12 + (bulan - 1)
+    debit_total: Mapped[float] = mapped_column(DECIMAL(18, 2))
+    credit_total: Mapped[float] = mapped_column(DECIMAL(18, 2))
+    entry_count: Mapped[int] = mapped_column(Integer)
+
+class BankStatementLine(Base):
+    """Satu baris mutasi rekening koran (hasil import CSV/OFX) untuk akun Kas/Bank"""
+    __tablename__ = "bank_statement_lines"
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    account_id: Mapped[int] = mapped_column(ForeignKey("accounts.id"))
+    line_date: Mapped[date] = mapped_column(Date)
+    amount: Mapped[float] = mapped_column(DECIMAL(15, 2))  # Positif = uang masuk, negatif = keluar
+    description: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    reference_no: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)
+    # FITID (OFX) atau hash isi baris (CSV): import ulang file yang sama tidak menduplikasi
+    external_id: Mapped[str] = mapped_column(String(64))
+    imported_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
+    matched_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("account_id", "external_id", name="uq_bank_statement_lines_external_id"),
+        Index("ix_bank_statement_lines_account_matched", "account_id", "matched_at", "line_date"),
+    )
+
+# --- TUTUP BUKU & ARSIP ---
+
+class FiscalYear(Base):
+    """Tahun buku yang sudah ditutup (dan opsional diarsipkan)"""
+    __tablename__ = "fiscal_years"
+
+    year: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    closed_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
+    # Jurnal penutup (Pendapatan/Beban -> Ekuitas); kosong jika tidak ada mutasi laba rugi
+    closing_transaction_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    retained_earnings_account_id: Mapped[int] = mapped_column(ForeignKey("accounts.id"))
+    archived_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+class AccountCarryForward(Base):
+    """
+    Saldo pindahan per akun di akhir tahun buku yang ditutup (kumulatif sejak awal).
+    Laporan cukup mulai dari sini lalu menjumlah jurnal setelah tahun tsb.
+    """
+    __tablename__ = "account_carry_forwards"
+
+    fiscal_year: Mapped[int] = mapped_column(ForeignKey("fiscal_years.year"), primary_key=True)
+    account_id: Mapped[int] = mapped_column(ForeignKey("accounts.id"), primary_key=True)
+    debit_total: Mapped[float] = mapped_column(DECIMAL(18, 2))
+    credit_total: Mapped[float] = mapped_column(DECIMAL(18, 2))
+    # Posisi terakhir di buku besar akun & saldo penuh (Debit - Kredit) s/d akhir tahun
+    account_seq: Mapped[int] = mapped_column(BigInteger)
+    running_balance: Mapped[float] = mapped_column(DECIMAL(18, 2))
+
+class ArchivedTransaction(Base):
+    """Salinan baris `transactions` dari tahun buku yang diarsipkan"""
+    __tablename__ = "archived_transactions"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    fiscal_year: Mapped[int] = mapped_column(Integer, index=True)
+    transaction_date: Mapped[datetime] = mapped_column(DateTime)
+    description: Mapped[str] = mapped_column(String(255))
+    reference_no: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime)
+    # Nomor urut saat diarsipkan: tanda hapus di feed /sync (deleted_transactions)
+    change_seq: Mapped[Optional[int]] = mapped_column(Integer, nullable=True, index=True)
+
+class ArchivedTransactionEntry(Base):
+    """Salinan baris `transaction_entries` dari tahun buku yang diarsipkan"""
+    __tablename__ = "archived_transaction_entries"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    fiscal_year: Mapped[int] = mapped_column(Integer, index=True)
+    transaction_id: Mapped[int] = mapped_column(Integer, index=True)
+    account_id: Mapped[int] = mapped_column(Integer)
+    entry_type: Mapped[EntryType] = mapped_column(Enum(EntryType))
+    amount: Mapped[float] = mapped_column(DECIMAL(15, 2))
+    account_seq: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
+    running_balance: Mapped[Optional[float]] = mapped_column(DECIMAL(18, 2), nullable=True)
+    statement_line_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    reconciled_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_archived_transaction_entries_account_seq", "account_id", "account_seq"),
+    )
@@ -0,0 +1,27 @@
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import String, DateTime, Float, Text, Index
+from sqlalchemy.orm import Mapped, mapped_column
+from core.database import Base
+
+class ReportJob(Base):
+    """
+    Status & hasil job laporan (core.jobs.JobStore). Disimpan di database agar
+    GET /reports/jobs/<id> dan penggabungan job identik berlaku lintas worker gunicorn.
+    """
+    __tablename__ = "report_jobs"
+
+    id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    name: Mapped[str] = mapped_column(String(50))
+    params: Mapped[str] = mapped_column(Text)                # JSON
+    params_key: Mapped[str] = mapped_column(String(40))      # SHA-1 nama + parameter (coalescing)
+    status: Mapped[str] = mapped_column(String(20))          # pending/running/done/failed
+    submitted_at: Mapped[datetime] = mapped_column(DateTime)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True, index=True)
+    run_seconds: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    result: Mapped[Optional[str]] = mapped_column(Text, nullable=True)   # JSON
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+    __table_args__ = (
+        Index("ix_report_jobs_params_key_status", "params_key", "status"),
+    )
@@ -0,0 +1,29 @@
+from datetime import datetime
+from sqlalchemy import String, Integer, DateTime, event, insert
+from sqlalchemy.orm import Mapped, mapped_column
+from core.database import Base
+
+class DataVersion(Base):
+    """
+    Penghitung versi data per cakupan ('accounts', 'ledger').
+    Dinaikkan setiap ada penulisan (dalam transaksi DB yang sama),
+    dipakai untuk ETag / Last-Modified pada endpoint GET.
+    Baris 'changes' adalah nomor urut perubahan global untuk feed /sync, sekaligus
+    versi cakupan 'ledger' (services.VERSION_ROWS); baris 'ledger' tidak lagi dinaikkan.
+    """
+    __tablename__ = "data_versions"
+
+    scope: Mapped[str] = mapped_column(String(30), primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
+
+# Baris awal (seperti di migration) agar penulisan pertama yang paralel
+# cukup UPDATE, tidak berebut INSERT
+@event.listens_for(DataVersion.__table__, "after_create")
+def _seed_versions(target, connection, **kw):
+    now = datetime.now()
+    connection.execute(insert(target), [
+        {"scope": "accounts", "version": 0, "updated_at": now},
+        {"scope": "ledger", "version": 0, "updated_at": now},
+        {"scope": "changes", "version": 0, "updated_at": now},
+    ])
@@ -0,0 +1,111 @@
+"""
+Benchmark backend database: posting jurnal & laporan.
+
+Contoh:
+    python scripts/bench_backends.py --url sqlite:////tmp/bench.db
+    python scripts/bench_backends.py --url sqlite:////tmp/bench.db --url postgresql://postgres@localhost/masfin_bench
+    python scripts/bench_backends.py --url sqlite:////tmp/bench.db --sqlite-default   # tanpa tuning PRAGMA
+    python scripts/bench_backends.py --url sqlite:////tmp/bench.db --threads 16 --group-commit
+
+PERHATIAN: tabel di database tujuan di-drop & dibuat ulang.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from core.database import Base, GroupCommitQueue, WriteQueue, configure_sqlite
+from api import services
+from api.schemas import AccountCreate, AccountTypeEnum, TransactionCreate, TransactionEntryCreate, EntryTypeEnum
+import models.user  # noqa: F401 (daftarkan tabel users)
+
+def build_engine(url: str, tuned: bool):
+    if url.startswith("sqlite"):
+        engine = create_engine(url, connect_args={"check_same_thread": False})
+        return configure_sqlite(engine) if tuned else engine
+    return create_engine(url, pool_size=20)
+
+def timed(fn, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {"avg_ms": round(statistics.mean(samples), 2), "p95_ms": round(sorted(samples)[int(len(samples) * 0.95) - 1], 2)}
+
+def run(url: str, journals: int, threads: int, tuned: bool, group_commit: bool = False) -> dict:
+    engine = build_engine(url, tuned)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    # SQLite: posting selalu lewat satu thread penulis (SQLite mengabaikan FOR UPDATE),
+    # sehingga --sqlite-default hanya membandingkan efek PRAGMA
+    queue = WriteQueue(enabled=url.startswith("sqlite"))
+    writer = GroupCommitQueue(Session, enabled=True, runner=queue, before_commit=lambda db: services.bump_version(db, "ledger"))
+
+    db = Session()
+    kas = services.create_account(db, AccountCreate(code="1001", name="Kas Takmir", account_type=AccountTypeEnum.ASSET))
+    infaq = services.create_account(db, AccountCreate(code="4001", name="Infaq Kotak Jumat", account_type=AccountTypeEnum.REVENUE))
+    listrik = services.create_account(db, AccountCreate(code="5001", name="Biaya Listrik", account_type=AccountTypeEnum.EXPENSE))
+    kas_id, infaq_id, listrik_id = kas.id, infaq.id, listrik.id
+    db.close()
+
+    def post(i):
+        debit, credit = (kas_id, infaq_id) if i % 4 else (listrik_id, kas_id)
+        payload = TransactionCreate(description=f"Bench {i}", reference_no=f"B-{i}", entries=[
+            TransactionEntryCreate(account_id=debit, entry_type=EntryTypeEnum.DEBIT, amount=1000 + i),
+            TransactionEntryCreate(account_id=credit, entry_type=EntryTypeEnum.CREDIT, amount=1000 + i)
+        ])
+        if group_commit:
+            writer.submit(services._post_in_batch, payload)
+            return
+        session = Session()
+        try:
+            queue.run(services.create_transaction, session, payload)
+        finally:
+            session.close()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(post, range(journals)))
+    post_seconds = time.perf_counter() - start
+
+    db = Session()
+    result = {
+        "url": engine.url.render_as_string(hide_password=True),
+        "tuned": tuned,
+        "group_commit": group_commit,
+        "journals": journals,
+        "threads": threads,
+        "post_per_second": round(journals / post_seconds, 1),
+        "balance_sheet": timed(lambda: services.generate_balance_sheet(db), 20),
+        "dashboard": timed(lambda: services.generate_dashboard(db), 20),
+        "ledger_page": timed(lambda: services.get_general_ledger(db, kas_id, limit=50), 20),
+        "ledger_full": timed(lambda: services.get_general_ledger(db, kas_id), 5),
+    }
+    db.close()
+    engine.dispose()
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", action="append", required=True, help="URL database (boleh lebih dari satu)")
+    parser.add_argument("--journals", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--sqlite-default", action="store_true", help="Jalankan SQLite tanpa PRAGMA tuning")
+    parser.add_argument("--group-commit", action="store_true", help="Posting lewat GroupCommitQueue (satu commit per batch)")
+    args = parser.parse_args()
+
+    results = [run(url, args.journals, args.threads, tuned=not args.sqlite_default, group_commit=args.group_commit)
+               for url in args.url]
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
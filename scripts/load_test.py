@@ -0,0 +1,368 @@
+"""
+Load test HTTP: beberapa client bersamaan menjalankan campuran beban ala masjid
+(login, posting jurnal, buku besar, neraca) terhadap app.py.
+
+Contoh:
+    # Jalankan app di proses ini dengan database SQLite lokal yang di-seed
+    python scripts/load_test.py --serve --db sqlite:////tmp/load.db --seed-journals 5000 --clients 8 --duration 30
+
+    # Server yang sudah berjalan (gunicorn dsb), simpan & bandingkan laporan
+    python scripts/load_test.py --base-url http://127.0.0.1:5000 --output hasil.json --compare baseline.json
+
+Laporan (JSON) berisi p50/p95/p99, throughput dan error rate per route, plus
+konfigurasi run, sehingga bisa dibandingkan antar run (--compare). Respons
+429/503 dari admission control dihitung terpisah sebagai `rejected`.
+
+PERHATIAN: --seed-journals men-drop & membuat ulang tabel di database --db.
+"""
+import argparse
+import http.client
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_MIX = "login=1,post_transaction=4,ledger=3,balance_sheet=2"
+
+SEED_COA = [
+    {"code": "1001", "name": "Kas Takmir", "account_type": "ASSET"},
+    {"code": "1002", "name": "Bank Syariah", "account_type": "ASSET"},
+    {"code": "4001", "name": "Infaq Kotak Jumat", "account_type": "REVENUE"},
+    {"code": "4002", "name": "Infaq Pembangunan", "account_type": "REVENUE"},
+    {"code": "5001", "name": "Biaya Listrik", "account_type": "EXPENSE"},
+    {"code": "5002", "name": "Honor Muadzin", "account_type": "EXPENSE"},
+]
+
+# --- SEED & SERVER LOKAL ---
+
+def seed_database(journals: int, username: str, password: str):
+    """Buat ulang tabel, COA, user admin dan `journals` jurnal historis (tahun berjalan)"""
+    from sqlalchemy import select
+    from core.database import Base, SessionLocal, get_engine
+    from api import coa, services
+    from api.schemas import TransactionCreate, TransactionEntryCreate, EntryTypeEnum
+    from app import create_default_admin
+    from models.finance import Account
+
+    Base.metadata.drop_all(bind=get_engine())
+    Base.metadata.create_all(bind=get_engine())
+    create_default_admin(username, password)
+
+    rng = random.Random(0)
+    db = SessionLocal()
+    try:
+        coa.import_accounts(db, SEED_COA)
+        ids = dict(db.execute(select(Account.code, Account.id)).all())
+        now = datetime.now()
+        year_start = datetime(now.year, 1, 1)
+        for i in range(journals):
+            debit, credit = _pick_accounts(rng, ids)
+            amount = rng.randint(10, 500) * 1000
+            services.create_transaction(db, TransactionCreate(
+                description=f"Seed {i}",
+                reference_no=f"S-{i}",
+                transaction_date=year_start + (now - year_start) * (i / journals),
+                entries=[
+                    TransactionEntryCreate(account_id=debit, entry_type=EntryTypeEnum.DEBIT, amount=amount),
+                    TransactionEntryCreate(account_id=credit, entry_type=EntryTypeEnum.CREDIT, amount=amount),
+                ]))
+    finally:
+        db.close()
+
+def start_server(host: str = "127.0.0.1", port: int = 0):
+    """Jalankan app Flask (threaded) di thread latar; return (server, base_url)"""
+    from werkzeug.serving import WSGIRequestHandler, make_server
+    from app import app
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass  # access log tiap request ikut membebani & mengotori output
+
+    server = make_server(host, port, app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, name="load-test-server", daemon=True).start()
+    return server, f"http://{host}:{server.port}"
+
+# --- WORKLOAD ---
+
+def _pick_accounts(rng, ids: dict):
+    """Pasangan (debit, kredit): mayoritas penerimaan infaq, sisanya pembayaran beban"""
+    if rng.random() < 0.7:
+        return ids[rng.choice(["1001", "1002"])], ids[rng.choice(["4001", "4002"])]
+    return ids[rng.choice(["5001", "5002"])], ids["1001"]
+
+def parse_mix(value: str) -> dict:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in OPERATIONS:
+            raise SystemExit(f"Operasi tidak dikenal: {name} (pilihan: {', '.join(OPERATIONS)})")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+class Client:
+    """Satu virtual user: koneksi HTTP sendiri, token sendiri"""
+
+    def __init__(self, base_url: str, username: str, password: str, rng: random.Random, timeout: float):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.username, self.password = username, password
+        self.rng = rng
+        self.timeout = timeout
+        self.conn = None
+        self.token = None
+        self.accounts = {}
+
+    def request(self, method: str, path: str, body=None):
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        data = json.dumps(body) if body is not None else None
+        for attempt in range(2):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self.conn.request(method, path, body=data, headers=headers)
+                resp = self.conn.getresponse()
+                payload = resp.read()
+                if resp.getheader("Connection", "").lower() == "close" or resp.version == 10:
+                    self.close()
+                return resp.status, payload
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # Koneksi keep-alive ditutup server: ulangi sekali dengan koneksi baru
+                self.close()
+                if attempt:
+                    raise
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def login(self):
+        status, payload = self.request("POST", "/auth/login", {"username": self.username, "password": self.password})
+        if status == 200:
+            self.token = json.loads(payload)["access_token"]
+        return status
+
+    def ensure_ready(self):
+        if not self.token:
+            self.login()
+        if not self.accounts:
+            status, payload = self.request("GET", "/accounts")
+            if status == 200:
+                self.accounts = {a["code"]: a["id"] for a in json.loads(payload)}
+
+def op_login(client: Client):
+    return client.login()
+
+def op_post_transaction(client: Client):
+    client.ensure_ready()
+    debit, credit = _pick_accounts(client.rng, client.accounts)
+    amount = client.rng.randint(10, 500) * 1000
+    status, _ = client.request("POST", "/transactions", {
+        "description": "Infaq / beban (load test)",
+        "reference_no": f"LT-{client.rng.randint(1, 10**9)}",
+        "entries": [
+            {"account_id": debit, "entry_type": "DEBIT", "amount": amount},
+            {"account_id": credit, "entry_type": "CREDIT", "amount": amount},
+        ],
+    })
+    return status
+
+def op_ledger(client: Client):
+    client.ensure_ready()
+    account_id = client.accounts[client.rng.choice(["1001", "1002", "5001"])]
+    if client.rng.random() < 0.8:
+        path = f"/reports/ledger/{account_id}?limit=50"
+    else:
+        path = f"/reports/ledger/{account_id}?start_date={datetime.now().year}-01-01"
+    return client.request("GET", path)[0]
+
+def op_balance_sheet(client: Client):
+    client.ensure_ready()
+    return client.request("GET", "/reports/balance-sheet")[0]
+
+OPERATIONS = {
+    "login": op_login,
+    "post_transaction": op_post_transaction,
+    "ledger": op_ledger,
+    "balance_sheet": op_balance_sheet,
+}
+
+# --- PENGUKURAN ---
+
+def percentile(sorted_samples: list, p: float) -> float:
+    """Nearest-rank percentile (ms)"""
+    if not sorted_samples:
+        return 0.0
+    index = max(math.ceil(p / 100 * len(sorted_samples)) - 1, 0)
+    return sorted_samples[min(index, len(sorted_samples) - 1)]
+
+def summarize(samples: list, elapsed: float) -> dict:
+    """samples: [(latency_ms, status)]; status None = exception (timeout / koneksi)"""
+    latencies = sorted(ms for ms, _ in samples)
+    ok = sum(1 for _, status in samples if status is not None and status < 400)
+    rejected = sum(1 for _, status in samples if status in (429, 503))
+    errors = len(samples) - ok - rejected
+    statuses = {}
+    for _, status in samples:
+        key = str(status) if status is not None else "exception"
+        statuses[key] = statuses.get(key, 0) + 1
+    return {
+        "requests": len(samples),
+        "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        "ok": ok,
+        "rejected": rejected,
+        "errors": errors,
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(latencies[-1], 2) if latencies else 0.0,
+        "statuses": statuses,
+    }
+
+def run_load(base_url: str, mix: dict, clients: int, duration: float, requests: int, warmup: float,
+             username: str, password: str, seed: int, timeout: float) -> dict:
+    names, weights = list(mix), list(mix.values())
+    samples = {name: [] for name in names}
+    lock = threading.Lock()
+    counter = iter(range(requests)) if requests else None
+    start_at = time.perf_counter() + warmup
+    stop_at = start_at + duration if not requests else None
+
+    def worker(index: int):
+        rng = random.Random(seed * 1000 + index)
+        client = Client(base_url, username, password, rng, timeout)
+        try:
+            client.ensure_ready()
+            while True:
+                now = time.perf_counter()
+                if stop_at and now >= stop_at:
+                    break
+                measured = now >= start_at
+                if counter is not None and measured:
+                    with lock:
+                        if next(counter, None) is None:
+                            break
+                name = rng.choices(names, weights)[0]
+                begin = time.perf_counter()
+                try:
+                    status = OPERATIONS[name](client)
+                except Exception:
+                    status = None
+                    client.close()
+                if measured:
+                    with lock:
+                        samples[name].append(((time.perf_counter() - begin) * 1000, status))
+        finally:
+            client.close()
+
+    threads = [threading.Thread(target=worker, args=(i,), name=f"load-client-{i}") for i in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start_at
+
+    all_samples = [s for route in samples.values() for s in route]
+    return {
+        "routes": {name: summarize(route, elapsed) for name, route in samples.items()},
+        "total": summarize(all_samples, elapsed),
+        "elapsed_seconds": round(elapsed, 2),
+    }
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(current: dict, baseline: dict) -> list:
+    """Baris perbandingan per route: p50/p95/p99 & throughput (selisih %)"""
+    lines = [f"{'route':<18}{'metric':<16}{'baseline':>12}{'sekarang':>12}{'selisih':>10}"]
+    for route, stats in {**current["routes"], "total": current["total"]}.items():
+        base = baseline["routes"].get(route) if route != "total" else baseline.get("total")
+        if not base:
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps", "error_rate"):
+            old, new = base.get(metric, 0), stats[metric]
+            delta = f"{(new - old) / old * 100:+.1f}%" if old else "-"
+            lines.append(f"{route:<18}{metric:<16}{old:>12}{new:>12}{delta:>10}")
+    return lines
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--base-url", help="URL server yang sudah berjalan, misal http://127.0.0.1:5000")
+    target.add_argument("--serve", action="store_true", help="Jalankan app.py di proses ini (werkzeug threaded)")
+    parser.add_argument("--db", help="DATABASE_URL untuk --serve, misal sqlite:////tmp/load.db")
+    parser.add_argument("--seed-journals", type=int, default=0, help="Seed ulang database dengan N jurnal (drop tabel!)")
+    parser.add_argument("--clients", type=int, default=8, help="Jumlah client bersamaan")
+    parser.add_argument("--duration", type=float, default=30, help="Lama pengukuran (detik)")
+    parser.add_argument("--requests", type=int, default=0, help="Berhenti setelah N request (menggantikan --duration)")
+    parser.add_argument("--warmup", type=float, default=2, help="Pemanasan sebelum pengukuran (detik)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Bobot operasi (default {DEFAULT_MIX})")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--random-seed", type=int, default=42, help="Seed acak agar urutan beban sama antar run")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--output", help="Simpan laporan JSON ke file ini")
+    parser.add_argument("--compare", help="Laporan JSON run sebelumnya sebagai pembanding")
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    server = None
+    if args.serve:
+        if args.db:
+            os.environ["DATABASE_URL"] = args.db  # harus sebelum core.database diimport
+        if args.seed_journals:
+            seed_database(args.seed_journals, args.username, args.password)
+        server, base_url = start_server()
+    else:
+        base_url = args.base_url.rstrip("/")
+
+    try:
+        result = run_load(base_url, mix, args.clients, args.duration, args.requests, args.warmup,
+                          args.username, args.password, args.random_seed, args.timeout)
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    report = {
+        "run": {
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "target": "serve" if args.serve else base_url,
+            "database": os.getenv("DATABASE_URL", "postgresql (default)") if args.serve else None,
+            "seed_journals": args.seed_journals,
+            "clients": args.clients,
+            "duration": args.duration if not args.requests else None,
+            "requests": args.requests or None,
+            "mix": mix,
+            "random_seed": args.random_seed,
+        },
+        **result,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            print("\n".join(compare(report, json.load(f))), file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
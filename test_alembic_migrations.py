@@ -0,0 +1,28 @@
+import os
+import subprocess
+import sys
+from sqlalchemy import create_engine
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from core.database import Base
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+def alembic(db_url, *args):
+    env = dict(os.environ, DATABASE_URL=db_url)
+    subprocess.run([sys.executable, "-m", "alembic", *args], cwd=ROOT, env=env, check=True, capture_output=True)
+
+def test_migrations_run_on_sqlite(tmp_path):
+    db_url = f"sqlite:///{tmp_path / 'masfin.db'}"
+    alembic(db_url, "upgrade", "head")
+
+    # Skema hasil migration harus sama dengan model (kecuali tabel FTS5)
+    engine = create_engine(db_url)
+    with engine.connect() as conn:
+        context = MigrationContext.configure(conn, opts={
+            "include_name": lambda name, type_, parents: not (type_ == "table" and name.startswith("transactions_fts"))
+        })
+        assert compare_metadata(context, Base.metadata) == []
+    engine.dispose()
+
+    alembic(db_url, "downgrade", "base")
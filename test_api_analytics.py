@@ -0,0 +1,50 @@
+from datetime import datetime
+from api import analytics
+from api.schemas import AccountTypeEnum
+from core.metrics import metrics
+
+def _setup(ledger_factory):
+    kas = ledger_factory.account("101", "Kas", AccountTypeEnum.ASSET)
+    infaq = ledger_factory.account("401", "Infaq", AccountTypeEnum.REVENUE)
+    listrik = ledger_factory.account("501", "Listrik", AccountTypeEnum.EXPENSE)
+    post = ledger_factory.post
+
+    post(kas, infaq, 100, datetime(2024, 1, 5))
+    post(kas, infaq, 300, datetime(2025, 1, 7))
+    post(kas, infaq, 60, datetime(2025, 2, 7))
+    post(listrik, kas, 40, datetime(2025, 2, 20))
+    return post, kas, infaq
+
+def test_generate_pivot_monthly(db_session, ledger_factory):
+    _setup(ledger_factory)
+    pivot = analytics.generate_pivot(db_session, start="2025-01", end="2025-03", window=2)
+
+    assert pivot['periods'] == ["2025-01", "2025-02", "2025-03"]
+    infaq, listrik = pivot['rows']
+    # Pendapatan (normal kredit) bernilai positif
+    assert infaq['values'] == [300, 60, 0]
+    assert infaq['total'] == 360
+    assert infaq['yoy_delta'] == [200, 60, 0]
+    # Rata-rata 2 periode: Des 2024 (0) ikut dihitung untuk Jan 2025
+    assert infaq['moving_average'] == [150, 180, 30]
+    assert listrik['values'] == [0, 40, 0]
+    assert pivot['totals']['SURPLUS'] == [300, 20, 0]
+
+    yearly = analytics.generate_pivot(db_session, start="2024-01", end="2025-12", granularity="year", account_types=[analytics.AccountType.REVENUE])
+    assert yearly['periods'] == ["2024", "2025"]
+    assert yearly['rows'][0]['values'] == [100, 360]
+    assert yearly['rows'][0]['yoy_delta'] == [100, 260]
+
+def test_pivot_extract_cached_by_version(db_session, ledger_factory):
+    post, kas, infaq = _setup(ledger_factory)
+    analytics.generate_pivot(db_session, start="2025-01", end="2025-03")
+    hits = metrics.snapshot()['counters'].get('analytics.extract.cache_hit', 0)
+
+    analytics.generate_pivot(db_session, start="2025-01", end="2025-03", granularity="quarter")
+    assert metrics.snapshot()['counters']['analytics.extract.cache_hit'] == hits + 1
+
+    # Jurnal baru menaikkan versi ledger -> ekstrak ditarik ulang
+    post(kas, infaq, 5, datetime(2025, 3, 1))
+    pivot = analytics.generate_pivot(db_session, start="2025-01", end="2025-03")
+    assert metrics.snapshot()['counters']['analytics.extract.cache_hit'] == hits + 1
+    assert pivot['rows'][0]['values'] == [300, 60, 5]
@@ -0,0 +1,117 @@
+from datetime import datetime
+import pytest
+from api import analytics, closing, services
+from api.schemas import AccountTypeEnum
+from models.finance import Transaction
+
+def _setup(ledger_factory):
+    acc = {
+        "kas": ledger_factory.account("101", "Kas", AccountTypeEnum.ASSET),
+        "surplus": ledger_factory.account("301", "Surplus Ditahan", AccountTypeEnum.EQUITY),
+        "infaq": ledger_factory.account("401", "Infaq", AccountTypeEnum.REVENUE),
+        "listrik": ledger_factory.account("501", "Listrik", AccountTypeEnum.EXPENSE),
+    }
+
+    def post(debit, credit, amount, tanggal):
+        return ledger_factory.post(acc[debit], acc[credit], amount, tanggal)
+
+    post("kas", "infaq", 1000, datetime(2024, 3, 1))
+    post("listrik", "kas", 300, datetime(2024, 8, 1))
+    post("kas", "infaq", 500, datetime(2025, 2, 1))
+    return acc, post
+
+def _equities(report):
+    return {item["account_name"]: item["amount"] for item in report["equities"]}
+
+def test_close_fiscal_year(db_session, ledger_factory):
+    acc, post = _setup(ledger_factory)
+    result = closing.close_fiscal_year(db_session, 2024, acc["surplus"])
+    assert result["closing_transaction_id"] is not None
+
+    report = services.generate_balance_sheet(db_session, "2025-06-30")
+    assert report["is_balance"] is True
+    assert _equities(report) == {"Surplus Ditahan": 700, "Surplus/Defisit Berjalan (Laba Rugi)": 500}
+
+    # Periode yang sudah ditutup tidak bisa diposting lagi
+    with pytest.raises(ValueError, match="sudah ditutup"):
+        post("kas", "infaq", 10, datetime(2024, 12, 1))
+    with pytest.raises(ValueError, match="sudah ditutup"):
+        closing.close_fiscal_year(db_session, 2024, acc["surplus"])
+
+    # Jurnal penutup tidak dihitung sebagai pendapatan/beban di pivot
+    pivot = analytics.generate_pivot(db_session, start="2024-12", end="2024-12")
+    assert pivot["totals"]["REVENUE"] == [0]
+    # ... maupun di laporan laba rugi (ringkasan bulanan memuat jurnal penutup)
+    report = services.generate_income_statement(db_session, "2024-01-01", "2024-12-31")
+    assert (report["total_revenue"], report["total_expense"], report["surplus"]) == (1000, 300, 700)
+
+def test_archive_and_restore_fiscal_year(db_session, ledger_factory):
+    acc, post = _setup(ledger_factory)
+    closing.close_fiscal_year(db_session, 2024, acc["surplus"])
+    before = services.generate_balance_sheet(db_session)
+
+    result = closing.archive_fiscal_year(db_session, 2024)
+    assert result == {"year": 2024, "transactions": 3, "entries": 7}
+    assert db_session.query(Transaction).count() == 1
+
+    # Laporan tetap sama (mulai dari saldo pindahan)
+    assert services.generate_balance_sheet(db_session)["total_assets"] == before["total_assets"] == 1200
+    assert services.generate_dashboard(db_session)["total_cash"] == 1200
+    # Posisi di tengah tahun yang diarsipkan dihitung dari tabel arsip
+    assert services.generate_balance_sheet(db_session, "2024-06-30")["total_assets"] == 1000
+
+    ledger = services.get_general_ledger(db_session, acc["kas"])
+    assert ledger["opening_balance"] == 700
+    assert [e["balance"] for e in ledger["entries"]] == [1200]
+    with pytest.raises(ValueError, match="diarsipkan"):
+        services.get_general_ledger(db_session, acc["kas"], "2024-01-01")
+
+    # Akun tanpa entry aktif melanjutkan nomor urut & saldo dari saldo pindahan
+    post("listrik", "kas", 50, datetime(2025, 3, 1))
+    ledger = services.get_general_ledger(db_session, acc["kas"])
+    assert [e["balance"] for e in ledger["entries"]] == [1200, 1150]
+    assert services.get_general_ledger(db_session, acc["listrik"])["closing_balance"] == 50
+
+    # Laba rugi tahun yang diarsipkan: bulan penuh dari ringkasan, bulan terpotong dari tabel arsip
+    assert services.generate_income_statement(db_session, "2024-03-01", "2024-08-15")["surplus"] == 700
+    assert services.generate_income_statement(db_session, "2024-02-15", "2024-12-31")["surplus"] == 700
+
+    result = closing.restore_fiscal_year(db_session, 2024)
+    assert result == {"year": 2024, "transactions": 3, "entries": 7}
+    ledger = services.get_general_ledger(db_session, acc["kas"])
+    assert [e["balance"] for e in ledger["entries"]] == [1000, 700, 1200, 1150]
+
+def test_sync_sees_archive_and_restore(db_session, ledger_factory):
+    acc, post = _setup(ledger_factory)
+    closing.close_fiscal_year(db_session, 2024, acc["surplus"])
+    synced = services.get_changes(db_session, 0)
+    archived_ids = sorted(t.id for t in synced["transactions"] if t.transaction_date.year == 2024)
+
+    closing.archive_fiscal_year(db_session, 2024)
+    delta = services.get_changes(db_session, synced["next_since"])
+    assert sorted(delta["deleted_transactions"]) == archived_ids
+    assert delta["transactions"] == []
+    # Client baru tidak perlu tanda hapus
+    assert services.get_changes(db_session, 0)["deleted_transactions"] == []
+
+    # Jurnal yang dipulihkan mendapat nomor baru, di atas `since` client
+    closing.restore_fiscal_year(db_session, 2024)
+    restored = services.get_changes(db_session, delta["next_since"])
+    assert sorted(t.id for t in restored["transactions"]) == archived_ids
+    assert restored["deleted_transactions"] == []
+
+def test_multi_ledger_matches_single_ledger_after_archive(db_session, ledger_factory):
+    acc, post = _setup(ledger_factory)
+    closing.close_fiscal_year(db_session, 2024, acc["surplus"])
+    closing.archive_fiscal_year(db_session, 2024)
+    post("listrik", "kas", 200, datetime(2025, 3, 1))
+
+    info, rows = services.get_multi_ledger(db_session, [acc["kas"], acc["listrik"]])
+    rows = list(rows)
+    for account in info["accounts"]:
+        single = services.get_general_ledger(db_session, account["account_id"])
+        assert account["opening_balance"] == single["opening_balance"]
+        assert [e for acc_id, e in rows if acc_id == account["account_id"]] == single["entries"]
+
+    with pytest.raises(ValueError, match="diarsipkan"):
+        services.get_multi_ledger(db_session, [acc["kas"]], start_date="2024-06-01")
@@ -0,0 +1,55 @@
+import json
+import pytest
+from api import coa, services
+from api.schemas import TransactionCreate, TransactionEntryCreate, EntryTypeEnum
+from models.finance import Account, AccountType
+
+CSV = """kode,nama,tipe,keterangan
+1001,Kas Takmir,ASET,
+4001,Infaq Kotak Jumat,pendapatan,Setiap Jumat
+5001,Biaya Listrik,EXPENSE,
+"""
+
+def test_import_is_idempotent_and_counts_changes(db_session):
+    assert coa.import_file(db_session, CSV) == {"created": 3, "updated": 0, "unchanged": 0, "dry_run": False}
+    assert coa.import_file(db_session, CSV) == {"created": 0, "updated": 0, "unchanged": 3, "dry_run": False}
+
+    rows = [
+        {"code": "1001", "name": "Kas Masjid", "account_type": "ASSET"},
+        {"code": "4001", "name": "Infaq Kotak Jumat", "account_type": "REVENUE", "description": "Setiap Jumat"},
+        {"code": "1002", "name": "Bank", "account_type": "ASSET"},
+    ]
+    # Dry run hanya menghitung
+    assert coa.import_accounts(db_session, rows, dry_run=True)["created"] == 1
+    assert db_session.query(Account).count() == 3
+
+    assert coa.import_file(db_session, json.dumps({"accounts": rows}), "json") == \
+        {"created": 1, "updated": 1, "unchanged": 1, "dry_run": False}
+    kas = db_session.query(Account).filter_by(code="1001").one()
+    assert kas.name == "Kas Masjid" and kas.account_type == AccountType.ASSET
+    assert services.get_versions(db_session, "accounts")["accounts"][0] == 2
+
+def test_validation_reports_all_errors_and_saves_nothing(db_session):
+    content = "kode,nama,tipe\n,Tanpa Kode,ASET\n1001,,ASET\n1002,Bank,BUKAN\n1003,Kas,ASSET\n1003,Kas 2,ASSET\n"
+    with pytest.raises(ValueError) as exc:
+        coa.import_file(db_session, content)
+    message = str(exc.value)
+    for expected in ("Baris 1: kode akun kosong", "Baris 2: nama akun kosong",
+                     "Baris 3: tipe akun tidak dikenali", "Baris 5: kode 1003 duplikat dengan baris 4"):
+        assert expected in message
+    assert db_session.query(Account).count() == 0
+
+    with pytest.raises(ValueError):
+        coa.import_file(db_session, "nama,tipe\nKas,ASET\n")
+
+def test_type_change_rejected_for_accounts_with_entries(db_session):
+    coa.import_file(db_session, CSV)
+    kas, infaq = (db_session.query(Account).filter_by(code=c).one().id for c in ("1001", "4001"))
+    services.create_transaction(db_session, TransactionCreate(description="Infaq", entries=[
+        TransactionEntryCreate(account_id=kas, entry_type=EntryTypeEnum.DEBIT, amount=1000),
+        TransactionEntryCreate(account_id=infaq, entry_type=EntryTypeEnum.CREDIT, amount=1000),
+    ]))
+    with pytest.raises(ValueError, match="1001"):
+        coa.import_accounts(db_session, [{"code": "1001", "name": "Kas", "account_type": "EXPENSE"}])
+    # Ganti nama tetap boleh
+    assert coa.import_accounts(db_session, [{"code": "1001", "name": "Kas", "account_type": "ASSET"}])["updated"] == 1
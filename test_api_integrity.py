@@ -0,0 +1,61 @@
+from datetime import datetime
+from unittest.mock import patch
+from sqlalchemy import text
+from api import integrity
+from api.schemas import AccountTypeEnum
+
+def _setup(ledger_factory, jumlah=5):
+    kas = ledger_factory.account("101", "Kas", AccountTypeEnum.ASSET)
+    infaq = ledger_factory.account("401", "Infaq", AccountTypeEnum.REVENUE)
+    return [ledger_factory.post(kas, infaq, 100, datetime(2025, 1, i + 1), description=f"Infaq {i}").id
+            for i in range(jumlah)]
+
+def _corrupt(db_session, ids):
+    # Kerusakan langsung di database (melewati validasi service)
+    db_session.execute(text("UPDATE transaction_entries SET amount = 90 WHERE transaction_id = :id AND entry_type = 'CREDIT'"),
+                       {"id": ids[0]})
+    db_session.execute(text("UPDATE transaction_entries SET account_id = 999 WHERE transaction_id = :id AND entry_type = 'DEBIT'"),
+                       {"id": ids[2]})
+    db_session.execute(text("DELETE FROM transaction_entries WHERE transaction_id = :id"), {"id": ids[3]})
+    db_session.execute(text("DELETE FROM transactions WHERE id = :id"), {"id": ids[4]})
+    db_session.commit()
+
+def test_verify_clean_ledger(db_session, ledger_factory):
+    _setup(ledger_factory)
+    result = integrity.verify_ledger(db_session, workers=1, chunk_size=2)
+    assert result["ok"] is True
+    assert (result["chunks"], result["transactions_checked"], result["entries_checked"]) == (3, 5, 10)
+    assert result["issues"] == []
+
+def test_verify_reports_every_issue(db_session, ledger_factory):
+    ids = _setup(ledger_factory)
+    _corrupt(db_session, ids)
+
+    progress = []
+    result = integrity.verify_ledger(db_session, workers=1, chunk_size=2,
+                                     progress=lambda done, total, _: progress.append((done, total)))
+    assert result["ok"] is False
+    assert progress == [(1, 3), (2, 3), (3, 3)]
+    assert result["summary"] == {"imbalanced": 1, "orphan_account": 1, "empty_transaction": 1, "orphan_transaction": 1}
+
+    issues = {(i["transaction_id"], i["type"]): i for i in result["issues"]}
+    assert issues[(ids[0], "imbalanced")]["difference"] == 10
+    assert issues[(ids[2], "orphan_account")]["account_id"] == 999
+    assert (ids[3], "empty_transaction") in issues
+    assert issues[(ids[4], "orphan_transaction")]["entries"] == 2
+
+def test_verify_ledger_cli(db_session, ledger_factory):
+    from app import app
+    ids = _setup(ledger_factory)
+    runner = app.test_cli_runner()
+
+    with patch('app.SessionLocal', return_value=db_session):
+        result = runner.invoke(args=["verify-ledger", "--workers", "1", "--chunk-size", "2"])
+    assert result.exit_code == 0
+    assert "0 temuan" in result.output
+
+    _corrupt(db_session, ids)
+    with patch('app.SessionLocal', return_value=db_session):
+        result = runner.invoke(args=["verify-ledger", "--workers", "1", "--no-archive"])
+    assert result.exit_code == 1
+    assert f"imbalanced: active transaksi #{ids[0]}" in result.output
@@ -0,0 +1,95 @@
+from datetime import datetime
+import pytest
+from api import reconciliation
+from api.schemas import AccountTypeEnum
+
+OFX = """OFXHEADER:100
+DATA:OFXSGML
+
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20250105120000<TRNAMT>150000.00<FITID>TX-1<NAME>SETORAN INFAQ
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20250107<TRNAMT>-40000.00<FITID>TX-2<MEMO>PLN</MEMO><CHECKNUM>PLN-01
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+def _setup(ledger_factory):
+    bank = ledger_factory.account("102", "Bank", AccountTypeEnum.ASSET)
+    infaq = ledger_factory.account("401", "Infaq", AccountTypeEnum.REVENUE)
+    listrik = ledger_factory.account("501", "Listrik", AccountTypeEnum.EXPENSE)
+
+    def post(debit, credit, amount, tanggal, ref=None):
+        return ledger_factory.post(debit, credit, amount, tanggal, ref=ref).id
+    return bank, infaq, listrik, post
+
+def test_parse_statement_files():
+    lines = reconciliation.parse_csv(
+        "Tanggal,Keterangan,Ref,Kredit,Debit\n"
+        "05/01/2025,Setoran,,\"1.500.000,00\",\n"
+        "07/01/2025,PLN,PLN-01,,40000\n"
+    )
+    assert [(str(l["line_date"]), l["amount"]) for l in lines] == [("2025-01-05", 1500000), ("2025-01-07", -40000)]
+    assert lines[1]["reference_no"] == "PLN-01"
+
+    lines = reconciliation.parse_ofx(OFX)
+    assert [(l["external_id"], l["amount"], l["reference_no"]) for l in lines] == [("TX-1", 150000, None), ("TX-2", -40000, "PLN-01")]
+    assert lines[0]["description"] == "SETORAN INFAQ"
+    assert reconciliation.detect_format("mutasi.csv", OFX) == "ofx"
+
+def test_import_and_match_statement(db_session, ledger_factory):
+    bank, infaq, listrik, post = _setup(ledger_factory)
+    setoran = post(bank, infaq, 150000, datetime(2025, 1, 4))
+    post(bank, infaq, 150000, datetime(2025, 1, 20))             # di luar jendela tanggal
+    # Dua pembayaran nominal sama: referensi menang atas tanggal yang lebih dekat
+    post(listrik, bank, 40000, datetime(2025, 1, 7), ref="X-9")
+    pln = post(listrik, bank, 40000, datetime(2025, 1, 9), ref="PLN/01")
+
+    result = reconciliation.import_statement(db_session, bank, OFX, "ofx")
+    assert result == {"imported": 2, "duplicates": 0, "matched": 2, "unmatched_lines": 0}
+
+    unmatched = reconciliation.get_unmatched(db_session, bank)
+    assert unmatched["statement_lines"] == []
+    assert sorted(e["amount"] for e in unmatched["entries"]) == [-40000, 150000]
+    assert setoran not in [e["transaction_id"] for e in unmatched["entries"]]
+    assert pln not in [e["transaction_id"] for e in unmatched["entries"]]
+
+    # Import ulang file yang sama tidak menduplikasi baris
+    result = reconciliation.import_statement(db_session, bank, OFX, "ofx")
+    assert result == {"imported": 0, "duplicates": 2, "matched": 0, "unmatched_lines": 0}
+
+def test_unmatched_line_matched_later(db_session, ledger_factory):
+    bank, infaq, _, post = _setup(ledger_factory)
+    csv_content = "date,description,amount\n2025-02-01,Transfer masuk,75000\n"
+    assert reconciliation.import_statement(db_session, bank, csv_content)["unmatched_lines"] == 1
+    assert len(reconciliation.get_unmatched(db_session, bank)["statement_lines"]) == 1
+
+    # Jurnal yang terlambat dicatat lalu dicocokkan ulang
+    post(bank, infaq, 75000, datetime(2025, 2, 3))
+    assert reconciliation.match_statement(db_session, bank) == {"matched": 1, "unmatched_lines": 0}
+    unmatched = reconciliation.get_unmatched(db_session, bank)
+    assert unmatched["statement_lines"] == [] and unmatched["entries"] == []
+
+def test_reconciliation_rejects_non_asset_account(db_session, ledger_factory):
+    _, infaq, _, _ = _setup(ledger_factory)
+    with pytest.raises(ValueError, match="ASSET"):
+        reconciliation.match_statement(db_session, infaq)
+    with pytest.raises(reconciliation.AccountNotFound):
+        reconciliation.get_unmatched(db_session, 999)
+
+def test_amount_index_takes_nearest_unused():
+    index = reconciliation._AmountIndex()
+    for entry_id, ordinal in enumerate([10, 12, 12, 15, 20, 21]):
+        index.add(100, ordinal, entry_id)
+    index.sort()
+
+    assert index.take_nearest(100, 13, 3, set()) in (1, 2)      # 12 lebih dekat dari 15
+    assert index.take_nearest(100, 13, 3, {1, 2}) == 3          # 12 lainnya sudah dipakai index lain
+    assert index.take_nearest(100, 13, 3, set()) == 0
+    assert index.take_nearest(100, 13, 3, set()) is None        # sisa 20, 21 di luar jendela
+    assert index.take_nearest(100, 14, 2, set()) is None
+    assert [index.take_nearest(100, 21, 0, set()), index.take_nearest(100, 21, 1, set())] == [5, 4]
+
+    tie = reconciliation._AmountIndex()
+    tie.add(100, 10, 1)
+    tie.add(100, 16, 2)
+    tie.sort()
+    assert tie.take_nearest(100, 13, 3, set()) == 1             # seri: tanggal lebih awal menang
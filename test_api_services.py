@@ -19,6 +19,19 @@ def test_create_account(db_session):
     assert db_acc is not None
     assert db_acc.name == "Kas Test"
 
+def test_write_result_serialized_without_reopening_transaction(db_session):
+    from api.schemas import AccountResponse, TransactionResponse
+    kas = services.create_account(db_session, AccountCreate(code="101", name="Kas", account_type=AccountTypeEnum.ASSET))
+    infaq = services.create_account(db_session, AccountCreate(code="401", name="Infaq", account_type=AccountTypeEnum.REVENUE))
+    new_tx = services.create_transaction(db_session, TransactionCreate(description="Infaq", entries=[
+        TransactionEntryCreate(account_id=kas.id, entry_type=EntryTypeEnum.DEBIT, amount=100),
+        TransactionEntryCreate(account_id=infaq.id, entry_type=EntryTypeEnum.CREDIT, amount=100)
+    ]))
+    AccountResponse.model_validate(kas)
+    assert len(TransactionResponse.model_validate(new_tx).entries) == 2
+    # Tidak ada SELECT setelah commit: thread penulis SQLite tidak membuka BEGIN IMMEDIATE lagi
+    assert not db_session.in_transaction()
+
 def test_create_transaction_and_balance(db_session):
     # 1. Setup Akun
     acc_kas = services.create_account(db_session, AccountCreate(code="101", name="Kas", account_type=AccountTypeEnum.ASSET))
@@ -78,4 +91,257 @@ def test_get_general_ledger(db_session):
     assert len(ledger['entries']) == 2
     # Cek running balance entri pertama (Debit 1000 -> Saldo 1000)
     assert ledger['entries'][0]['debit'] == 1000
-    assert ledger['entries'][0]['balance'] == 1000
\ No newline at end of file
+    assert ledger['entries'][0]['balance'] == 1000
+
+def test_generate_balance_sheet_as_of(db_session):
+    from datetime import datetime
+    acc_kas = services.create_account(db_session, AccountCreate(code="101", name="Kas", account_type=AccountTypeEnum.ASSET))
+    acc_modal = services.create_account(db_session, AccountCreate(code="301", name="Modal", account_type=AccountTypeEnum.EQUITY))
+    acc_rev = services.create_account(db_session, AccountCreate(code="401", name="Infaq", account_type=AccountTypeEnum.REVENUE))
+
+    tx1 = services.create_transaction(db_session, TransactionCreate(description="Modal Awal", entries=[
+        TransactionEntryCreate(account_id=acc_kas.id, entry_type=EntryTypeEnum.DEBIT, amount=100),
+        TransactionEntryCreate(account_id=acc_modal.id, entry_type=EntryTypeEnum.CREDIT, amount=100)
+    ]))
+    tx2 = services.create_transaction(db_session, TransactionCreate(description="Infaq", entries=[
+        TransactionEntryCreate(account_id=acc_kas.id, entry_type=EntryTypeEnum.DEBIT, amount=40),
+        TransactionEntryCreate(account_id=acc_rev.id, entry_type=EntryTypeEnum.CREDIT, amount=40)
+    ]))
+    tx1.transaction_date = datetime(2024, 12, 31, 10, 0)
+    tx2.transaction_date = datetime(2025, 1, 5, 9, 0)
+    db_session.commit()
+
+    # Posisi akhir tahun 2024: Infaq Januari belum masuk
+    report = services.generate_balance_sheet(db_session, as_of="2024-12-31")
+    assert report['report_date'].startswith("2024-12-31")
+    assert report['total_assets'] == 100.0
+    assert report['total_equities'] == 100.0
+    assert report['is_balance'] is True
+
+    # Posisi saat ini: termasuk surplus berjalan
+    report = services.generate_balance_sheet(db_session)
+    assert report['total_assets'] == 140.0
+    assert report['total_equities'] == 140.0
+
+def test_generate_dashboard(db_session):
+    from datetime import datetime, timedelta
+    acc_kas = services.create_account(db_session, AccountCreate(code="101", name="Kas", account_type=AccountTypeEnum.ASSET))
+    acc_rev = services.create_account(db_session, AccountCreate(code="401", name="Infaq", account_type=AccountTypeEnum.REVENUE))
+    acc_exp = services.create_account(db_session, AccountCreate(code="501", name="Listrik", account_type=AccountTypeEnum.EXPENSE))
+
+    old_tx = services.create_transaction(db_session, TransactionCreate(description="Infaq Lama", entries=[
+        TransactionEntryCreate(account_id=acc_kas.id, entry_type=EntryTypeEnum.DEBIT, amount=1000),
+        TransactionEntryCreate(account_id=acc_rev.id, entry_type=EntryTypeEnum.CREDIT, amount=1000)
+    ]))
+    old_tx.transaction_date = datetime.now().replace(day=1) - timedelta(days=40)
+    db_session.commit()
+
+    services.create_transaction(db_session, TransactionCreate(description="Infaq Jumat", entries=[
+        TransactionEntryCreate(account_id=acc_kas.id, entry_type=EntryTypeEnum.DEBIT, amount=300),
+        TransactionEntryCreate(account_id=acc_rev.id, entry_type=EntryTypeEnum.CREDIT, amount=300)
+    ]))
+    services.create_transaction(db_session, TransactionCreate(description="Bayar Listrik", entries=[
+        TransactionEntryCreate(account_id=acc_exp.id, entry_type=EntryTypeEnum.DEBIT, amount=100),
+        TransactionEntryCreate(account_id=acc_kas.id, entry_type=EntryTypeEnum.CREDIT, amount=100)
+    ]))
+
+    data = services.generate_dashboard(db_session, recent_limit=2)
+
+    assert data['cash_balances'] == [{"account_name": "Kas", "amount": 1200.0}]
+    assert data['month_to_date_revenue'] == 300.0
+    assert data['month_to_date_expense'] == 100.0
+    assert data['total_assets'] == 1200.0
+    assert data['is_balance'] is True
+    assert [t.description for t in data['recent_transactions']] == ["Bayar Listrik", "Infaq Jumat"]
+
+def test_search_transactions(db_session):
+    acc_kas = services.create_account(db_session, AccountCreate(code="101", name="Kas", account_type=AccountTypeEnum.ASSET))
+    acc_exp = services.create_account(db_session, AccountCreate(code="501", name="Listrik", account_type=AccountTypeEnum.EXPENSE))
+
+    def bayar(description, reference_no=None):
+        return services.create_transaction(db_session, TransactionCreate(description=description, reference_no=reference_no, entries=[
+            TransactionEntryCreate(account_id=acc_exp.id, entry_type=EntryTypeEnum.DEBIT, amount=100),
+            TransactionEntryCreate(account_id=acc_kas.id, entry_type=EntryTypeEnum.CREDIT, amount=100)
+        ]))
+
+    tx_okt = bayar("Bayar Listrik Oktober", "PLN-OCT-23")
+    tx_nov = bayar("Bayar Listrik November", "PLN-NOV-23")
+    bayar("Honor Muadzin")
+
+    # Prefix match, hasil terbaru lebih dulu
+    items, has_more = services.search_transactions(db_session, "listr")
+    assert [t.id for t in items] == [tx_nov.id, tx_okt.id]
+    assert has_more is False
+
+    # No bukti
+    items, _ = services.search_transactions(db_session, "PLN-OCT")
+    assert [t.id for t in items] == [tx_okt.id]
+
+    # Pagination
+    items, has_more = services.search_transactions(db_session, "bayar", page=1, per_page=1)
+    assert len(items) == 1 and has_more is True
+
+    # Update keterangan ikut ter-index ulang
+    tx_okt.description = "Bayar Air Oktober"
+    db_session.commit()
+    items, _ = services.search_transactions(db_session, "listrik")
+    assert [t.id for t in items] == [tx_nov.id]
+
+    # Fuzzy: salah ketik tetap ketemu (juga di 3 huruf pertama), diurutkan kemiripan
+    items, _ = services.search_transactions(db_session, "listirk", fuzzy=True)
+    assert items[0].id == tx_nov.id
+    items, has_more = services.search_transactions(db_session, "lsitrik novembr", fuzzy=True)
+    assert [t.id for t in items] == [tx_nov.id] and has_more is False
+    items, has_more = services.search_transactions(db_session, "bayar listrk", fuzzy=True, per_page=1)
+    assert [t.id for t in items] == [tx_nov.id] and has_more is True
+    import pytest
+    with pytest.raises(ValueError, match="minimal 3 huruf"):
+        services.search_transactions(db_session, "ab", fuzzy=True)
+
+def test_running_balance_backdated_and_paging(db_session):
+    from datetime import datetime
+    acc_kas = services.create_account(db_session, AccountCreate(code="101", name="Kas", account_type=AccountTypeEnum.ASSET))
+    acc_rev = services.create_account(db_session, AccountCreate(code="401", name="Infaq", account_type=AccountTypeEnum.REVENUE))
+
+    def infaq(amount, tanggal):
+        return services.create_transaction(db_session, TransactionCreate(
+            description=f"Infaq {tanggal:%d/%m}", transaction_date=tanggal, entries=[
+                TransactionEntryCreate(account_id=acc_kas.id, entry_type=EntryTypeEnum.DEBIT, amount=amount),
+                TransactionEntryCreate(account_id=acc_rev.id, entry_type=EntryTypeEnum.CREDIT, amount=amount)
+            ]))
+
+    infaq(100, datetime(2025, 1, 3))
+    infaq(200, datetime(2025, 1, 10))
+    # Jurnal mundur: disisipkan di antara dua jurnal sebelumnya
+    infaq(50, datetime(2025, 1, 5))
+    infaq(25, datetime(2025, 1, 20))
+
+    ledger = services.get_general_ledger(db_session, acc_kas.id)
+    assert [e['debit'] for e in ledger['entries']] == [100, 50, 200, 25]
+    assert [e['balance'] for e in ledger['entries']] == [100, 150, 350, 375]
+    assert ledger['closing_balance'] == 375
+
+    # Akun normal kredit: saldo positif
+    ledger = services.get_general_ledger(db_session, acc_rev.id)
+    assert [e['balance'] for e in ledger['entries']] == [100, 150, 350, 375]
+
+    # Keyset pagination: halaman ke-2 langsung membaca saldo tersimpan
+    page1 = services.get_general_ledger(db_session, acc_kas.id, limit=2)
+    assert [e['balance'] for e in page1['entries']] == [100, 150]
+    assert page1['next_cursor'] is not None
+    page2 = services.get_general_ledger(db_session, acc_kas.id, after=page1['next_cursor'], limit=2)
+    assert [e['balance'] for e in page2['entries']] == [350, 375]
+    assert page2['next_cursor'] is None
+
+    # Periode: saldo awal = saldo entry terakhir sebelum start_date
+    ledger = services.get_general_ledger(db_session, acc_kas.id, "2025-01-06", "2025-01-15")
+    assert ledger['opening_balance'] == 150
+    assert [e['balance'] for e in ledger['entries']] == [350]
+    assert ledger['closing_balance'] == 350
+
+def test_running_balance_backdated_touches_one_month(db_session):
+    from datetime import datetime
+    from models.finance import TransactionEntry
+    acc_kas = services.create_account(db_session, AccountCreate(code="101", name="Kas", account_type=AccountTypeEnum.ASSET))
+    acc_rev = services.create_account(db_session, AccountCreate(code="401", name="Infaq", account_type=AccountTypeEnum.REVENUE))
+
+    def infaq(amount, tanggal):
+        return services.create_transaction(db_session, TransactionCreate(
+            description=f"Infaq {tanggal:%d/%m}", transaction_date=tanggal, entries=[
+                TransactionEntryCreate(account_id=acc_kas.id, entry_type=EntryTypeEnum.DEBIT, amount=amount),
+                TransactionEntryCreate(account_id=acc_rev.id, entry_type=EntryTypeEnum.CREDIT, amount=amount)
+            ]))
+
+    def positions(tx):
+        return db_session.query(TransactionEntry.account_seq, TransactionEntry.running_balance)\
+            .filter(TransactionEntry.transaction_id == tx.id).order_by(TransactionEntry.id).all()
+
+    infaq(100, datetime(2025, 1, 3))
+    jan_10 = infaq(200, datetime(2025, 1, 10))
+    feb = [infaq(10, datetime(2025, 2, day)) for day in (1, 2)]
+    mar = infaq(5, datetime(2025, 3, 1))
+    later = {tx.id: positions(tx) for tx in feb + [mar]}
+    jan_before = positions(jan_10)
+
+    # Jurnal mundur ke Januari: entry Februari & Maret tidak ditulis ulang
+    infaq(50, datetime(2025, 1, 5))
+    assert {tx.id: positions(tx) for tx in feb + [mar]} == later
+    assert positions(jan_10) != jan_before
+
+    ledger = services.get_general_ledger(db_session, acc_kas.id)
+    assert [e['balance'] for e in ledger['entries']] == [100, 150, 350, 360, 370, 375]
+    assert ledger['closing_balance'] == 375
+
+    # Cursor melewati batas bulan
+    page1 = services.get_general_ledger(db_session, acc_kas.id, limit=4)
+    page2 = services.get_general_ledger(db_session, acc_kas.id, after=page1['next_cursor'], limit=4)
+    assert [e['balance'] for e in page2['entries']] == [370, 375]
+
+    ledger = services.get_general_ledger(db_session, acc_kas.id, "2025-02-02", "2025-02-28")
+    assert ledger['opening_balance'] == 360
+    assert ledger['closing_balance'] == 370
+
+def test_create_transaction_unknown_account(db_session):
+    import pytest
+    acc = services.create_account(db_session, AccountCreate(code="101", name="Kas", account_type=AccountTypeEnum.ASSET))
+    with pytest.raises(ValueError, match="Akun tidak ditemukan"):
+        services.create_transaction(db_session, TransactionCreate(description="Salah Akun", entries=[
+            TransactionEntryCreate(account_id=acc.id, entry_type=EntryTypeEnum.DEBIT, amount=10),
+            TransactionEntryCreate(account_id=999, entry_type=EntryTypeEnum.CREDIT, amount=10)
+        ]))
+
+def test_period_totals_maintained_and_rebuilt(db_session, ledger_factory):
+    from datetime import datetime
+    from models.finance import AccountPeriodTotal
+    kas = ledger_factory.account("101", "Kas", AccountTypeEnum.ASSET)
+    infaq = ledger_factory.account("401", "Infaq", AccountTypeEnum.REVENUE)
+    listrik = ledger_factory.account("501", "Listrik", AccountTypeEnum.EXPENSE)
+    post = ledger_factory.post
+
+    post(kas, infaq, 1000, datetime(2025, 1, 10))
+    post(kas, infaq, 200, datetime(2025, 1, 31, 18))
+    post(kas, infaq, 500, datetime(2025, 2, 5))
+    post(listrik, kas, 300, datetime(2025, 3, 20))
+    post(kas, infaq, 50, datetime(2025, 1, 15))  # jurnal mundur
+
+    def snapshot():
+        return sorted((r.account_id, r.month, float(r.debit_total), float(r.credit_total), r.entry_count)
+                      for r in db_session.query(AccountPeriodTotal))
+    incremental = snapshot()
+    jan = 2025 * 12
+    assert (kas, jan, 1250.0, 0.0, 3) in incremental and (infaq, jan, 0.0, 1250.0, 3) in incremental
+    assert services.rebuild_period_totals(db_session) == {"rows": 6}
+    assert snapshot() == incremental
+
+    # Bulan penuh dari ringkasan, bulan batas yang terpotong dari jurnal mentah
+    totals = services.get_period_totals(db_session, datetime(2025, 1, 15), services._parse_as_of("2025-03-19"))
+    assert totals[infaq] == (0, 750)
+    assert services.get_period_totals(db_session, datetime(2025, 1, 1), services._parse_as_of("2025-03-31"))[kas] == (1750, 300)
+    assert services.get_period_totals(db_session, datetime(2025, 1, 11), services._parse_as_of("2025-01-20"))[kas] == (50, 0)
+
+    report = services.generate_income_statement(db_session, "2025-01-01", "2025-03-31")
+    assert (report["total_revenue"], report["total_expense"], report["surplus"]) == (1750, 300, 1450)
+
+def test_get_changes_paginates_by_change_seq(db_session):
+    from api import coa
+    kas = services.create_account(db_session, AccountCreate(code="101", name="Kas", account_type=AccountTypeEnum.ASSET))
+    infaq = services.create_account(db_session, AccountCreate(code="401", name="Infaq", account_type=AccountTypeEnum.REVENUE))
+    for i in range(3):
+        services.create_transaction(db_session, TransactionCreate(description=f"Infaq {i}", entries=[
+            TransactionEntryCreate(account_id=kas.id, entry_type=EntryTypeEnum.DEBIT, amount=100),
+            TransactionEntryCreate(account_id=infaq.id, entry_type=EntryTypeEnum.CREDIT, amount=100)]))
+    coa.import_accounts(db_session, [{"code": "101", "name": "Kas Takmir", "account_type": "ASSET"},
+                                     {"code": "501", "name": "Listrik", "account_type": "EXPENSE"}])
+
+    first = services.get_changes(db_session, 0, limit=4)
+    assert [a.code for a in first["accounts"]] == ["401"]  # "101" diubah belakangan: muncul di nomor urut barunya
+    assert [t.description for t in first["transactions"]] == ["Infaq 0", "Infaq 1", "Infaq 2"]
+    assert first["has_more"] is True
+
+    rest = services.get_changes(db_session, first["next_since"], limit=4)
+    assert sorted(a.name for a in rest["accounts"]) == ["Kas Takmir", "Listrik"]
+    assert rest["transactions"] == [] and rest["has_more"] is False
+
+    # Tidak ada perubahan baru; nomor di depan server -> reset
+    assert services.get_changes(db_session, rest["next_since"])["accounts"] == []
+    assert services.get_changes(db_session, rest["next_since"] + 10)["reset"] is True
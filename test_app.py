@@ -1,3 +1,72 @@
+import json
+import os
+import subprocess
+import sys
+
+# Batas waktu boot worker (import + create_app + request pertama), detik
+BOOT_BUDGET_SECONDS = float(os.getenv("BOOT_BUDGET_SECONDS", "2.0"))
+
+BOOT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+resp = app.app.test_client().get('/metrics')
+booted = time.perf_counter()
+print(json.dumps({
+    "import_seconds": imported - start,
+    "boot_seconds": booted - start,
+    "status": resp.status_code,
+    "modules": [m for m in ("flasgger", "psycopg2", "numpy") if m in sys.modules],
+    "engine_created": sys.modules["core.database"]._engine is not None,
+}))
+"""
+
+def test_cold_start_budget():
+    result = subprocess.run(
+        [sys.executable, "-c", BOOT_SCRIPT],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True, check=True
+    )
+    boot = json.loads(result.stdout.strip().splitlines()[-1])
+
+    assert boot["status"] == 200
+    # Swagger, driver DB & engine tidak dimuat saat boot
+    assert boot["modules"] == []
+    assert boot["engine_created"] is False
+    assert boot["boot_seconds"] < BOOT_BUDGET_SECONDS, boot
+
+def test_swagger_docs_built_lazily(client):
+    resp = client.get('/apispec_1.json')
+    assert resp.status_code == 200
+    assert '/reports/balance-sheet' in resp.json['paths']
+
+def test_seed_admin_cli(db_session):
+    from unittest.mock import patch
+    from app import app
+    from models.user import User
+
+    with patch('app.SessionLocal', return_value=db_session):
+        result = app.test_cli_runner().invoke(args=["seed-admin", "--username", "bendahara", "--password", "rahasia"])
+
+    assert result.exit_code == 0
+    assert db_session.query(User).filter_by(username="bendahara").count() == 1
+    # Password tidak boleh tercetak ke log deploy
+    assert "rahasia" not in result.output
+
+def test_read_db_pinned_per_request():
+    from unittest.mock import MagicMock, patch
+    import app as app_module
+
+    replicas = [MagicMock(name="replica_a"), MagicMock(name="replica_b")]
+    with patch.object(app_module.replica_router, "replica_urls", ["a", "b"]), \
+         patch.object(app_module.replica_router, "session_factory", side_effect=replicas) as choose:
+        with app_module.app.test_request_context('/reports/balance-sheet'):
+            # ETag (conditional_get) & body laporan dari replica yang sama
+            assert app_module.get_read_db() is replicas[0].return_value
+            assert app_module.get_read_db() is replicas[0].return_value
+        assert choose.call_count == 1
+
 def test_login_success(client, db_session):
     # Buat user manual di DB
     from models.user import User
@@ -61,4 +130,410 @@ def test_create_transaction_endpoint(client, admin_token):
 def test_get_balance_sheet_endpoint(client):
     resp = client.get('/reports/balance-sheet')
     assert resp.status_code == 200
-    assert "total_assets" in resp.json
\ No newline at end of file
+    assert "total_assets" in resp.json
+
+def test_get_balance_sheet_as_of_invalid_date(client):
+    resp = client.get('/reports/balance-sheet?as_of=31-12-2024')
+    assert resp.status_code == 400
+
+def test_submit_unknown_report_job(client, admin_token):
+    resp = client.post('/reports/jobs', json={"report": "ledger"})
+    assert resp.status_code == 401
+
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    resp = client.post('/reports/jobs', json={"report": "ngawur"}, headers=headers)
+    assert resp.status_code == 400
+
+    resp = client.post('/reports/jobs', json={"report": "ledger", "params": {"tahun": 2025}}, headers=headers)
+    assert resp.status_code == 400
+
+    resp = client.post('/reports/jobs', json={"report": "ledger", "params": ["tahun"]}, headers=headers)
+    assert resp.status_code == 400
+    resp = client.post('/reports/jobs', json=["ledger"], headers=headers)
+    assert resp.status_code == 400
+
+def test_submit_report_job_queue_full(client, admin_token):
+    from unittest.mock import patch
+    from core.jobs import QueueFull
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    with patch('app.report_queue.submit', side_effect=QueueFull("Antrian job penuh (20)")):
+        resp = client.post('/reports/jobs', json={"report": "ledger", "params": {"account_id": 1}}, headers=headers)
+    assert resp.status_code == 503
+    assert resp.headers['Retry-After'] == '5'
+
+def test_get_unknown_report_job(client):
+    resp = client.get('/reports/jobs/tidak-ada')
+    assert resp.status_code == 404
+
+def test_verify_integrity_endpoint_validation(client, admin_token):
+    resp = client.post('/admin/integrity', json={})
+    assert resp.status_code == 401
+
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    resp = client.post('/admin/integrity', json={"workers": 0}, headers=headers)
+    assert resp.status_code == 400
+    resp = client.post('/admin/integrity', json={"chunk_size": "besar"}, headers=headers)
+    assert resp.status_code == 400
+
+def test_get_dashboard_endpoint(client, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    client.post('/accounts', json={"code": "1", "name": "Kas", "account_type": "ASSET"}, headers=headers)
+    client.post('/accounts', json={"code": "2", "name": "Infaq", "account_type": "REVENUE"}, headers=headers)
+    client.post('/transactions', json={
+        "description": "Infaq Jumat",
+        "entries": [
+            {"account_id": 1, "entry_type": "DEBIT", "amount": 50000},
+            {"account_id": 2, "entry_type": "CREDIT", "amount": 50000}
+        ]
+    }, headers=headers)
+
+    resp = client.get('/reports/dashboard?recent=1')
+    assert resp.status_code == 200
+    assert resp.json['total_cash'] == 50000
+    assert resp.json['month_to_date_revenue'] == 50000
+    assert len(resp.json['recent_transactions']) == 1
+    # Nilai negatif tidak menjadi LIMIT -1 (semua jurnal)
+    resp = client.get('/reports/dashboard?recent=-1')
+    assert resp.status_code == 200
+    assert resp.json['recent_transactions'] == []
+
+def test_search_transactions_endpoint(client):
+    resp = client.get('/transactions/search?q=')
+    assert resp.status_code == 400
+
+    resp = client.get('/transactions/search?q=listrik')
+    assert resp.status_code == 200
+    assert resp.json['items'] == []
+    assert resp.json['has_more'] is False
+
+def _age_versions(db_session, seconds=2):
+    # Geser waktu versi data ke detik yang sudah lewat
+    from datetime import datetime, timedelta
+    from models.version import DataVersion
+    db_session.query(DataVersion).update({DataVersion.updated_at: datetime.now() - timedelta(seconds=seconds)})
+    db_session.commit()
+
+def test_conditional_get_etag(client, admin_token, db_session):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    client.post('/accounts', json={"code": "1", "name": "Kas", "account_type": "ASSET"}, headers=headers)
+
+    # Versi dari detik berjalan: tanpa Last-Modified (penulisan lain di detik yang sama tidak terdeteksi)
+    resp = client.get('/accounts')
+    assert 'Last-Modified' not in resp.headers
+
+    _age_versions(db_session)
+    resp = client.get('/accounts')
+    assert resp.status_code == 200
+    etag = resp.headers['ETag']
+    last_modified = resp.headers['Last-Modified']
+
+    # Data belum berubah -> 304 tanpa body
+    resp = client.get('/accounts', headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.data == b""
+
+    resp = client.get('/accounts', headers={"If-Modified-Since": last_modified})
+    assert resp.status_code == 304
+
+    # Setelah ada akun baru, ETag berubah
+    client.post('/accounts', json={"code": "2", "name": "Bank", "account_type": "ASSET"}, headers=headers)
+    resp = client.get('/accounts', headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.headers['ETag'] != etag
+    assert len(resp.json) == 2
+    # ... dan If-Modified-Since lama tidak lagi memberi 304
+    resp = client.get('/accounts', headers={"If-Modified-Since": last_modified})
+    assert resp.status_code == 200
+
+def test_conditional_get_report_skips_query(client):
+    from unittest.mock import patch
+
+    resp = client.get('/reports/balance-sheet')
+    etag = resp.headers['ETag']
+
+    with patch('app.services.generate_balance_sheet') as report:
+        resp = client.get('/reports/balance-sheet', headers={"If-None-Match": etag})
+        assert resp.status_code == 304
+        report.assert_not_called()
+
+    # Parameter berbeda -> ETag berbeda
+    resp = client.get('/reports/balance-sheet?as_of=2024-12-31', headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+
+def test_write_returns_data_version(client, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    resp = client.post('/accounts', json={"code": "1", "name": "Kas", "account_type": "ASSET"}, headers=headers)
+    # Versi ledger = nomor urut perubahan global (akun baru juga mengambil nomor)
+    assert resp.headers['X-Data-Version'] == "accounts=1,ledger=1"
+
+def test_get_pivot_endpoint(client):
+    resp = client.get('/reports/pivot?start=2025-01&end=2025-06&granularity=quarter')
+    assert resp.status_code == 200
+    assert resp.json['periods'] == ["2025-Q1", "2025-Q2"]
+    assert resp.json['rows'] == []
+
+    assert client.get('/reports/pivot?start=2025-13').status_code == 400
+    assert client.get('/reports/pivot?types=ASET').status_code == 400
+
+def test_reconciliation_endpoints(client, admin_token):
+    import io
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    client.post('/accounts', json={"code": "102", "name": "Bank", "account_type": "ASSET"}, headers=headers)
+
+    csv_file = (io.BytesIO(b"date,description,amount\n2025-02-01,Transfer masuk,75000\n"), "mutasi.csv")
+    resp = client.post('/reconciliation/1/statements', data={"file": csv_file}, headers=headers, content_type='multipart/form-data')
+    assert resp.status_code == 200
+    assert resp.json['imported'] == 1 and resp.json['unmatched_lines'] == 1
+
+    resp = client.get('/reconciliation/1/unmatched')
+    assert resp.status_code == 200
+    assert resp.json['statement_lines'][0]['amount'] == 75000
+
+    assert client.get('/reconciliation/99/unmatched').status_code == 404
+    assert client.post('/reconciliation/1/statements', data=b"tanpa header").status_code == 401
+
+def test_transaction_stream(client, admin_token):
+    from core.events import journal_events
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    client.post('/accounts', json={"code": "1", "name": "Kas", "account_type": "ASSET"}, headers=headers)
+    client.post('/accounts', json={"code": "2", "name": "Infaq", "account_type": "REVENUE"}, headers=headers)
+    journal = {"description": "Infaq", "entries": [
+        {"account_id": 1, "entry_type": "DEBIT", "amount": 1000},
+        {"account_id": 2, "entry_type": "CREDIT", "amount": 1000}
+    ]}
+    client.post('/transactions', json=journal, headers=headers)
+
+    # Resume: jurnal setelah Last-Event-ID diambil dari database, lalu jurnal baru dikirim
+    # lewat poll database (id event = change_seq; dua akun memakai nomor 1 & 2)
+    resp = client.get('/transactions/stream', headers={"Last-Event-ID": "0"}, buffered=False)
+    assert resp.mimetype == 'text/event-stream'
+    stream = iter(resp.response)
+    assert next(stream) == b"retry: 3000\n\n"
+    assert next(stream).startswith(b"id: 3\nevent: journal\ndata: {\"id\":1,")
+
+    client.post('/transactions', json=journal, headers=headers)
+    assert next(stream).startswith(b"id: 4\nevent: journal\ndata: {\"id\":2,")
+
+    resp.close()
+    assert journal_events.has_subscribers is False
+
+def test_fiscal_year_endpoints(client, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    assert client.get('/fiscal-years').json == []
+    assert client.post('/fiscal-years/2024/close', json={"retained_earnings_account_id": 1}).status_code == 401
+
+    # Tahun berjalan belum berakhir / akun tidak ada
+    resp = client.post('/fiscal-years/2999/close', json={"retained_earnings_account_id": 1}, headers=headers)
+    assert resp.status_code == 400
+    resp = client.post('/fiscal-years/2024/archive', headers=headers)
+    assert resp.status_code == 400
+    assert "belum ditutup" in resp.json['message']
+
+def test_admission_limits_visible_in_metrics(client):
+    client.get('/reports/dashboard')
+    resp = client.get('/metrics')
+    assert resp.json['admission']['routes']['ledger']['concurrency'] == 3
+    assert resp.json['admission']['routes']['transactions-write']['write'] is True
+    assert resp.json['counters']['admission.dashboard.admitted'] >= 1
+    assert 'admission.pool.in_use' in resp.json['gauges']
+
+def test_import_accounts_endpoint(client, admin_token):
+    import io
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    csv_file = (io.BytesIO(b"kode,nama,tipe\n1001,Kas,ASET\n4001,Infaq,PENDAPATAN\n"), "coa.csv")
+    resp = client.post('/accounts/import', data={"file": csv_file}, headers=headers, content_type='multipart/form-data')
+    assert resp.status_code == 200
+    assert resp.json == {"created": 2, "updated": 0, "unchanged": 0, "dry_run": False}
+    assert [a['code'] for a in client.get('/accounts').json] == ["1001", "4001"]
+
+    resp = client.post('/accounts/import?dry_run=1', json=[{"code": "1001", "name": "Kas Masjid", "account_type": "ASSET"}], headers=headers)
+    assert resp.json == {"created": 0, "updated": 1, "unchanged": 0, "dry_run": True}
+
+    resp = client.post('/accounts/import', json=[{"code": "", "name": "X", "account_type": "ASSET"}], headers=headers)
+    assert resp.status_code == 400 and "Baris 1" in resp.json['message']
+    assert client.post('/accounts/import', json=[]).status_code == 401
+
+def test_multi_account_ledger_stream(client, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    for code, name, acc_type in [("1", "Kas", "ASSET"), ("2", "Infaq", "REVENUE"), ("5", "Listrik", "EXPENSE")]:
+        client.post('/accounts', json={"code": code, "name": name, "account_type": acc_type}, headers=headers)
+
+    def post(debit, credit, amount, date):
+        client.post('/transactions', json={"description": "Jurnal", "transaction_date": date, "entries": [
+            {"account_id": debit, "entry_type": "DEBIT", "amount": amount},
+            {"account_id": credit, "entry_type": "CREDIT", "amount": amount}]}, headers=headers)
+
+    post(1, 2, 500, "2025-01-10T10:00:00")
+    # Diposting belakangan tapi bertanggal lebih awal: saldo berjalan tetap urut tanggal
+    post(3, 1, 100, "2025-02-05T10:00:00")
+    post(1, 2, 300, "2025-02-01T10:00:00")
+
+    resp = client.get('/reports/ledger?account_types=ASSET,EXPENSE&start_date=2025-02-01&end_date=2025-12-31')
+    assert resp.status_code == 200
+    data = resp.json
+    assert [a['account_code'] for a in data['accounts']] == ["1", "5"]
+    kas, listrik = data['accounts']
+    assert kas['opening_balance'] == 500
+    assert [e['balance'] for e in kas['entries']] == [800, 700]
+    assert kas['closing_balance'] == 700
+    assert listrik['opening_balance'] == 0 and listrik['closing_balance'] == 100
+
+    resp = client.get('/reports/ledger?account_ids=2')
+    assert [e['balance'] for e in resp.json['accounts'][0]['entries']] == [500, 800]
+    assert client.get('/reports/ledger').status_code == 400
+    assert client.get('/reports/ledger?account_ids=99').status_code == 400
+
+def test_admin_profiling(client, admin_token):
+    from core.security import create_access_token
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    viewer = {"Authorization": f"Bearer {create_access_token({'sub': 'tamu', 'role': 'viewer'})}"}
+    assert client.get('/reports/balance-sheet?profile=1', headers=viewer).status_code == 403
+    assert client.get('/admin/profiles', headers=viewer).status_code == 403
+
+    resp = client.get('/reports/balance-sheet?profile=1', headers=headers)
+    assert resp.status_code == 200
+    profile = client.get(f"/admin/profiles/{resp.headers['X-Profile-Id']}", headers=headers).json
+    assert profile['path'] == '/reports/balance-sheet?profile=1'
+    assert profile['sql_count'] > 0 and profile['sql'][0]['statement']
+    assert any('generate_balance_sheet' in f['function'] for f in profile['functions'])
+    assert client.get('/admin/profiles', headers=headers).json[0]['id'] == profile['id']
+
+    # Batas sampling: profil berikutnya terlalu cepat -> request jalan biasa
+    resp = client.get('/reports/dashboard', headers={**headers, "X-Profile": "1"})
+    assert resp.status_code == 200 and resp.headers['X-Profile'] == 'skipped'
+
+def test_ledger_pagination(client, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    client.post('/accounts', json={"code": "1", "name": "Kas", "account_type": "ASSET"}, headers=headers)
+    client.post('/accounts', json={"code": "2", "name": "Infaq", "account_type": "REVENUE"}, headers=headers)
+    for i in range(7):
+        client.post('/transactions', json={"description": f"Infaq {i}", "entries": [
+            {"account_id": 1, "entry_type": "DEBIT", "amount": 1000},
+            {"account_id": 2, "entry_type": "CREDIT", "amount": 1000}]}, headers=headers)
+
+    page1 = client.get('/reports/ledger/1?limit=5').json
+    assert len(page1['entries']) == 5 and page1['next_cursor']
+    page2 = client.get(f"/reports/ledger/1?limit=5&after={page1['next_cursor']}").json
+    assert [e['balance'] for e in page2['entries']] == [6000, 7000]
+    assert page2['next_cursor'] is None
+
+    # Cursor rusak
+    assert client.get('/reports/ledger/1?limit=5&after=abc').status_code == 400
+
+def test_compressed_and_cached_report_responses(client, admin_token):
+    import gzip
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    client.post('/accounts', json={"code": "1", "name": "Kas", "account_type": "ASSET"}, headers=headers)
+    client.post('/accounts', json={"code": "2", "name": "Infaq", "account_type": "REVENUE"}, headers=headers)
+    for i in range(30):
+        client.post('/transactions', json={"description": f"Infaq Jumat pekan {i}", "entries": [
+            {"account_id": 1, "entry_type": "DEBIT", "amount": 1000},
+            {"account_id": 2, "entry_type": "CREDIT", "amount": 1000}]}, headers=headers)
+
+    plain = client.get('/reports/ledger/1')
+    assert 'Content-Encoding' not in plain.headers and 'Accept-Encoding' in plain.headers['Vary']
+
+    resp = client.get('/reports/ledger/1', headers={"Accept-Encoding": "gzip"})
+    assert resp.headers['Content-Encoding'] == 'gzip'
+    assert len(resp.data) < len(plain.data)
+    assert gzip.decompress(resp.data) == plain.data
+    assert resp.headers['ETag'].startswith('W/')
+    # Body (dan versi gzip-nya) diambil dari cache laporan
+    hits = client.get('/metrics').json['counters']
+    assert hits.get('report_cache.hit', 0) >= 1
+
+    again = client.get('/reports/ledger/1', headers={"Accept-Encoding": "gzip", "If-None-Match": resp.headers['ETag']})
+    assert again.status_code == 304
+
+    # Respons stream dikompres bertahap
+    stream = client.get('/reports/ledger?account_ids=1,2', headers={"Accept-Encoding": "gzip"})
+    assert stream.headers['Content-Encoding'] == 'gzip'
+    data = json.loads(gzip.decompress(stream.data))
+    assert len(data['accounts'][0]['entries']) == 30
+
+def test_report_not_cached_when_data_changes_mid_request(client, db_session):
+    from unittest.mock import patch
+    from api import services
+    from core.compression import report_cache
+    report_cache.clear()
+    original = services.generate_balance_sheet
+
+    def racing_write(db, *args, **kwargs):
+        # Penulisan lain commit setelah ETag dihitung, sebelum laporan selesai
+        services.bump_version(db_session, "ledger")
+        db_session.commit()
+        return original(db, *args, **kwargs)
+
+    with patch('app.services.generate_balance_sheet', side_effect=racing_write):
+        assert client.get('/reports/balance-sheet').status_code == 200
+    assert not report_cache._entries
+
+    assert client.get('/reports/balance-sheet').status_code == 200
+    assert len(report_cache._entries) == 1
+
+def test_time_dependent_reports_expire_daily(client):
+    from datetime import date, timedelta
+    from unittest.mock import patch
+    from api import services
+    from core.compression import report_cache
+    report_cache.clear()
+
+    first = client.get('/reports/balance-sheet')
+    assert first.json['report_date'].endswith("T23:59:59")
+    # Hari yang sama: 304 / cache
+    assert client.get('/reports/balance-sheet', headers={"If-None-Match": first.headers['ETag']}).status_code == 304
+
+    # Hari berganti tanpa penulisan: ETag baru, laporan dihitung ulang (bukan dari cache)
+    with patch('app.report_day', return_value=date.today() + timedelta(days=1)), \
+         patch('app.services.generate_balance_sheet', wraps=services.generate_balance_sheet) as report:
+        resp = client.get('/reports/balance-sheet', headers={"If-None-Match": first.headers['ETag']})
+    assert resp.status_code == 200
+    assert resp.headers['ETag'] != first.headers['ETag']
+    report.assert_called_once()
+
+def test_income_statement_endpoint(client, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    client.post('/accounts', json={"code": "1", "name": "Kas", "account_type": "ASSET"}, headers=headers)
+    client.post('/accounts', json={"code": "4", "name": "Infaq", "account_type": "REVENUE"}, headers=headers)
+    client.post('/accounts', json={"code": "5", "name": "Listrik", "account_type": "EXPENSE"}, headers=headers)
+    for akun_debit, akun_kredit, jumlah, tanggal in [(1, 2, 1000, "2025-01-10T10:00:00"), (3, 1, 250, "2025-02-03T10:00:00"),
+                                                      (1, 2, 400, "2025-02-20T10:00:00")]:
+        client.post('/transactions', json={"description": "Jurnal", "transaction_date": tanggal, "entries": [
+            {"account_id": akun_debit, "entry_type": "DEBIT", "amount": jumlah},
+            {"account_id": akun_kredit, "entry_type": "CREDIT", "amount": jumlah}]}, headers=headers)
+
+    resp = client.get('/reports/income-statement?start=2025-01-01&end=2025-02-10')
+    assert resp.status_code == 200
+    assert resp.json["revenues"] == [{"account_name": "Infaq", "amount": 1000}]
+    assert resp.json["total_expense"] == 250 and resp.json["surplus"] == 750
+    assert client.get('/reports/income-statement?start=2025-03-01&end=2025-01-01').status_code == 400
+
+def test_sync_feed_returns_only_changes(client, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    client.post('/accounts', json={"code": "1", "name": "Kas", "account_type": "ASSET"}, headers=headers)
+    client.post('/accounts', json={"code": "4", "name": "Infaq", "account_type": "REVENUE"}, headers=headers)
+
+    full = client.get('/sync').json
+    assert [a["code"] for a in full["accounts"]] == ["1", "4"] and full["transactions"] == []
+    assert full["has_more"] is False
+
+    client.post('/transactions', json={"description": "Infaq Jumat", "entries": [
+        {"account_id": 1, "entry_type": "DEBIT", "amount": 500},
+        {"account_id": 2, "entry_type": "CREDIT", "amount": 500}]}, headers=headers)
+    delta = client.get(f"/sync?since={full['next_since']}").json
+    assert delta["accounts"] == []
+    assert [t["description"] for t in delta["transactions"]] == ["Infaq Jumat"]
+    assert "reference_no" not in delta["transactions"][0]  # null tidak dikirim
+    assert delta["next_since"] > full["next_since"]
+
+    assert client.get('/sync?since=-1').status_code == 400
+
+def test_sync_reads_primary_even_with_replicas(client):
+    from unittest.mock import patch
+    import app as app_module
+    # Replica yang tertinggal dari `since` client tidak boleh menghasilkan reset palsu
+    with patch.object(app_module.replica_router, "replica_urls", ["replica"]), \
+         patch.object(app_module.replica_router, "session_factory") as choose:
+        resp = client.get('/sync?since=0')
+    assert resp.status_code == 200
+    choose.assert_not_called()
@@ -0,0 +1,96 @@
+import hashlib
+import io
+import json
+import threading
+from datetime import datetime
+from unittest.mock import patch
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import DatabaseError
+from sqlalchemy.orm import sessionmaker
+from core.audit import AuditWriter, audit_log
+from core.database import Base
+from core.metrics import metrics
+from models.audit import AuditLog
+
+class InlineRunner:
+    def __init__(self, gate=None):
+        self.gate = gate
+
+    def run(self, fn, *args):
+        if self.gate:
+            self.gate.wait()
+        return fn(*args)
+
+@pytest.fixture
+def audit_session_factory(tmp_path):
+    # File SQLite (bukan :memory:) agar thread penulis melihat database yang sama
+    engine = create_engine(f"sqlite:///{tmp_path / 'audit.db'}")
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+def record(i=1):
+    return {"occurred_at": datetime.now(), "username": "admin", "method": "POST", "route": "/transactions",
+            "status": 201, "payload_hash": "0" * 64, "resource": "transaction", "resource_ids": str(i)}
+
+def test_buffered_records_are_written_in_batches(audit_session_factory):
+    writer = AuditWriter(audit_session_factory, enabled=True, flush_interval=0.2, runner=InlineRunner(), name="audit_test")
+    batches = metrics.snapshot()["counters"].get("audit_test.batches", 0)
+    assert all(writer.submit(record(i)) for i in range(50))
+    assert writer.flush(timeout=5)
+
+    db = audit_session_factory()
+    try:
+        assert db.query(AuditLog).count() == 50
+        assert metrics.snapshot()["counters"]["audit_test.batches"] - batches <= 2
+        # Append-only
+        with pytest.raises(DatabaseError, match="hanya boleh ditambah"):
+            db.execute(text("DELETE FROM audit_log"))
+    finally:
+        db.close()
+
+def test_full_queue_drops_or_waits_by_durability(audit_session_factory):
+    gate = threading.Event()
+    writer = AuditWriter(audit_session_factory, enabled=True, durability="best_effort", queue_size=2,
+                         flush_interval=0, runner=InlineRunner(gate), name="audit_test")
+    dropped = metrics.snapshot()["counters"].get("audit_test.dropped", 0)
+    results = [writer.submit(record(i)) for i in range(6)]  # penulis tertahan: antrian cepat penuh
+    assert results[-1] is False
+    assert metrics.snapshot()["counters"]["audit_test.dropped"] > dropped
+    gate.set()
+    assert writer.flush(timeout=5)
+
+    flushing = AuditWriter(audit_session_factory, enabled=True, durability="flush", runner=InlineRunner(), name="audit_test")
+    assert flushing.submit(record(99)) is True
+    db = audit_session_factory()
+    try:
+        # Mode flush: sudah ter-commit saat submit kembali
+        assert db.query(AuditLog).filter(AuditLog.resource_ids == "99").count() == 1
+    finally:
+        db.close()
+
+    with pytest.raises(ValueError):
+        AuditWriter(audit_session_factory, durability="kadang", name="audit_test")
+
+def test_write_routes_submit_audit_records(client, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    with patch.object(audit_log, "enabled", True), patch.object(audit_log, "submit") as submit:
+        client.post('/accounts', json={"code": "1", "name": "Kas", "account_type": "ASSET"}, headers=headers)
+        client.post('/accounts', json={"code": "4", "name": "Infaq", "account_type": "REVENUE"}, headers=headers)
+        body = json.dumps({"description": "Infaq", "entries": [
+            {"account_id": 1, "entry_type": "DEBIT", "amount": 100},
+            {"account_id": 2, "entry_type": "CREDIT", "amount": 100}]}).encode()
+        resp = client.post('/transactions', data=body, content_type="application/json", headers=headers)
+        csv_file = b"code,name,account_type\n5,Listrik,EXPENSE\n"
+        client.post('/accounts/import', data={"file": (io.BytesIO(csv_file), "coa.csv")},
+                    content_type="multipart/form-data", headers=headers)
+
+    records = [call.args[0] for call in submit.call_args_list]
+    assert [r["resource"] for r in records] == ["account", "account", "transaction", "account_import"]
+    tx = records[2]
+    assert (tx["username"], tx["method"], tx["route"], tx["status"]) == ("admin", "POST", "/transactions", 201)
+    assert tx["payload_hash"] == hashlib.sha256(body).hexdigest()
+    assert tx["resource_ids"] == str(resp.json["id"])
+    # Multipart: isi file ikut di-hash, dan import tetap menerima filenya
+    assert records[3]["status"] == 200 and records[3]["payload_hash"] != hashlib.sha256(b"").hexdigest()
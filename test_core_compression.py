@@ -0,0 +1,31 @@
+import gzip
+from core import compression
+from core.compression import ReportCache, compress, compress_stream, negotiate
+
+def test_negotiate_respects_q_values_and_availability():
+    assert negotiate("gzip, deflate") == "gzip"
+    assert negotiate("gzip;q=0, identity") is None
+    assert negotiate("") is None
+    assert negotiate("*") == compression.available_encodings()[0]
+    # Encoding opsional yang modulnya tidak terpasang tidak pernah dipilih
+    assert negotiate("br, zstd, gzip;q=0.5") in compression.available_encodings()
+
+def test_stream_compression_is_incremental_and_roundtrips():
+    chunks = [f'{{"id": {i}, "keterangan": "Infaq Jumat"}},'.encode() for i in range(5000)]
+    parts = list(compress_stream(iter(chunks), "gzip"))
+    assert len(parts) > 2  # data keluar sebelum stream selesai (flush berkala)
+    assert gzip.decompress(b"".join(parts)) == b"".join(chunks)
+    assert gzip.decompress(compress(b"abc" * 1000, "gzip")) == b"abc" * 1000
+
+def test_report_cache_evicts_by_size():
+    cache = ReportCache(max_bytes=400)
+    cache.put("a", "identity", b"x" * 100, "application/json")
+    cache.put("a", "gzip", b"z" * 10)
+    cache.put("b", "identity", b"y" * 100, "application/json")
+    assert cache.get("a", "gzip") == ("application/json", b"z" * 10)
+    cache.put("c", "identity", b"w" * 100, "application/json")
+    cache.put("d", "identity", b"v" * 100, "application/json")
+    # "b" paling lama tidak dipakai -> dibuang lebih dulu
+    assert cache.get("b") is None and cache.get("a") is not None
+    cache.put("e", "identity", b"u" * 200)  # > max_bytes / 4: tidak di-cache
+    assert cache.get("e") is None
@@ -0,0 +1,209 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from core.database import Base, ReplicaRouter
+from models.finance import Account, AccountType
+from models.version import DataVersion
+
+@pytest.fixture
+def primary_and_replica(tmp_path):
+    """Dua database SQLite lokal: primary & replica"""
+    urls = [f"sqlite:///{tmp_path / 'primary.db'}", f"sqlite:///{tmp_path / 'replica.db'}"]
+    engines = [create_engine(url) for url in urls]
+    for e in engines:
+        Base.metadata.create_all(bind=e)
+    sessions = [sessionmaker(bind=e) for e in engines]
+    yield sessions[0], sessions[1], urls[1]
+    for e in engines:
+        e.dispose()
+
+def set_version(session_factory, scope, version):
+    db = session_factory()
+    db.merge(DataVersion(scope=scope, version=version))
+    db.commit()
+    db.close()
+
+def test_replica_used_when_in_sync(primary_and_replica):
+    primary, replica, replica_url = primary_and_replica
+    set_version(primary, "ledger", 5)
+    set_version(replica, "ledger", 5)
+
+    # Tandai data di replica untuk memastikan session yang didapat memang replica
+    db = replica()
+    db.add(Account(code="R1", name="Hanya di Replica", account_type=AccountType.ASSET))
+    db.commit()
+    db.close()
+
+    router = ReplicaRouter(primary, [replica_url], check_interval=0)
+    session = router.session()
+    assert session is not None
+    assert session.query(Account).filter_by(code="R1").count() == 1
+    session.close()
+
+def test_lagging_replica_falls_back_to_primary(primary_and_replica):
+    primary, replica, replica_url = primary_and_replica
+    set_version(primary, "ledger", 8)
+    set_version(replica, "ledger", 5)
+
+    router = ReplicaRouter(primary, [replica_url], max_lag=0, check_interval=0)
+    assert router.lag(0) == 3
+    assert router.session() is None
+
+    # Lag masih dalam toleransi
+    tolerant = ReplicaRouter(primary, [replica_url], max_lag=5, check_interval=0)
+    assert tolerant.session() is not None
+
+def test_read_your_writes_requires_min_version(primary_and_replica):
+    primary, replica, replica_url = primary_and_replica
+    set_version(primary, "ledger", 5)
+    set_version(replica, "ledger", 5)
+
+    router = ReplicaRouter(primary, [replica_url], max_lag=10, check_interval=0)
+    assert router.session({"ledger": 5}) is not None
+    # Client baru saja menulis versi 6 yang belum ada di replica
+    assert router.session({"ledger": 6}) is None
+
+def test_unreachable_replica_is_skipped(primary_and_replica, tmp_path):
+    primary, _, _ = primary_and_replica
+    set_version(primary, "ledger", 1)
+
+    # Database kosong tanpa tabel data_versions -> dianggap tidak sehat
+    router = ReplicaRouter(primary, [f"sqlite:///{tmp_path / 'kosong.db'}"], check_interval=0)
+    assert router.lag(0) is None
+    assert router.session() is None
+
+def test_sqlite_pragmas(tmp_path):
+    from core.database import configure_sqlite
+    engine = configure_sqlite(create_engine(f"sqlite:///{tmp_path / 'tuned.db'}"))
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1  # NORMAL
+        assert conn.exec_driver_sql("PRAGMA foreign_keys").scalar() == 1
+        assert conn.exec_driver_sql("PRAGMA cache_size").scalar() < 0
+    engine.dispose()
+
+def test_write_queue_serializes_concurrent_posts(tmp_path):
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    from core.database import configure_sqlite, WriteQueue, WRITER_THREAD_NAME
+    from api import services
+    from api.schemas import AccountCreate, AccountTypeEnum, TransactionCreate, TransactionEntryCreate, EntryTypeEnum
+
+    engine = configure_sqlite(create_engine(f"sqlite:///{tmp_path / 'writer.db'}", connect_args={"check_same_thread": False}))
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    queue = WriteQueue(enabled=True)
+
+    db = Session()
+    kas = services.create_account(db, AccountCreate(code="101", name="Kas", account_type=AccountTypeEnum.ASSET))
+    infaq = services.create_account(db, AccountCreate(code="401", name="Infaq", account_type=AccountTypeEnum.REVENUE))
+    kas_id, infaq_id = kas.id, infaq.id
+    db.close()
+
+    threads_used = set()
+
+    def post(i):
+        db = Session()
+        try:
+            def create(db, payload):
+                threads_used.add(threading.current_thread().name)
+                return services.create_transaction(db, payload).id
+            return queue.run(create, db, TransactionCreate(description=f"Infaq {i}", entries=[
+                TransactionEntryCreate(account_id=kas_id, entry_type=EntryTypeEnum.DEBIT, amount=10),
+                TransactionEntryCreate(account_id=infaq_id, entry_type=EntryTypeEnum.CREDIT, amount=10)
+            ]))
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        ids = list(pool.map(post, range(40)))
+
+    assert len(set(ids)) == 40
+    assert len(threads_used) == 1 and threads_used.pop().startswith(WRITER_THREAD_NAME)
+
+    db = Session()
+    ledger = services.get_general_ledger(db, kas_id)
+    assert ledger['closing_balance'] == 400
+    assert [e['balance'] for e in ledger['entries']] == [10.0 * (i + 1) for i in range(40)]
+    db.close()
+    engine.dispose()
+
+def test_group_commit_batches_posts_and_isolates_failures(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+    from unittest.mock import patch
+    from sqlalchemy import event
+    from core.database import configure_sqlite, GroupCommitQueue, WriteQueue
+    from api import services
+    from api.schemas import AccountCreate, AccountTypeEnum, TransactionCreate, TransactionEntryCreate, EntryTypeEnum
+    from models.finance import Transaction
+
+    engine = configure_sqlite(create_engine(f"sqlite:///{tmp_path / 'group.db'}", connect_args={"check_same_thread": False}))
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    commits = []
+    event.listen(engine, "commit", lambda conn: commits.append(1))
+
+    db = Session()
+    kas = services.create_account(db, AccountCreate(code="101", name="Kas", account_type=AccountTypeEnum.ASSET)).id
+    infaq = services.create_account(db, AccountCreate(code="401", name="Infaq", account_type=AccountTypeEnum.REVENUE)).id
+    db.close()
+
+    writer = GroupCommitQueue(Session, enabled=True, max_batch=50, max_wait=0.05, runner=WriteQueue(enabled=True),
+                              before_commit=lambda db: services.bump_version(db, "ledger"))
+
+    def post(i):
+        # Setiap jurnal ke-5 memakai akun yang tidak ada -> gagal sendiri
+        credit = 999 if i % 5 == 0 else infaq
+        try:
+            return writer.submit(services._post_in_batch, TransactionCreate(description=f"Infaq {i}", entries=[
+                TransactionEntryCreate(account_id=kas, entry_type=EntryTypeEnum.DEBIT, amount=10),
+                TransactionEntryCreate(account_id=credit, entry_type=EntryTypeEnum.CREDIT, amount=10)
+            ])).id
+        except ValueError as e:
+            return str(e)
+
+    commits.clear()
+    with patch.object(services, "next_change_seq", wraps=services.next_change_seq) as seq_calls, \
+            ThreadPoolExecutor(max_workers=40) as pool:
+        results = list(pool.map(post, range(40)))
+    # Kunci penghitung global diambil sekali per commit, bukan per jurnal
+    assert seq_calls.call_count == len(commits)
+
+    ids = [r for r in results if isinstance(r, int)]
+    assert len(set(ids)) == 32
+    assert all("999" in r for r in results if isinstance(r, str))
+    assert len(commits) < 32  # digabung, bukan satu commit per jurnal
+
+    db = Session()
+    assert db.query(Transaction).count() == 32
+    ledger = services.get_general_ledger(db, kas)
+    assert [e['balance'] for e in ledger['entries']] == [10.0 * (i + 1) for i in range(32)]
+    # Nomor urut perubahan diambil sekali per batch: 2 akun + 32 jurnal, tanpa celah
+    assert sorted(seq for seq, in db.query(Transaction.change_seq)) == list(range(3, 35))
+    assert services.get_versions(db, "ledger")["ledger"][0] == 34
+    db.close()
+    engine.dispose()
+
+def test_forked_child_gets_own_pool_and_writer(tmp_path, monkeypatch):
+    import os
+    from core import database
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'fork.db'}")
+    monkeypatch.setattr(database, "_engine", engine)
+    with engine.connect():
+        pass  # pool parent berisi satu koneksi
+    database.write_queue.run(lambda: None)  # thread penulis parent (jika aktif)
+    parent_pool = id(engine.pool)
+
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:  # proses anak
+        ok = id(engine.pool) != parent_pool and engine.pool.checkedin() == 0 and database.write_queue._executor is None
+        os.write(write_fd, b"1" if ok else b"0")
+        os._exit(0)
+    os.close(write_fd)
+    result = os.read(read_fd, 1)
+    os.waitpid(pid, 0)
+    assert result == b"1"
+    assert id(engine.pool) == parent_pool  # parent tidak terpengaruh
+    engine.dispose()
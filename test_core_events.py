@@ -0,0 +1,61 @@
+import threading
+from core.events import EventBroker
+
+def test_publish_without_subscribers_is_dropped():
+    broker = EventBroker(max_events=10)
+    broker.publish("journal", 1, "{}")
+    position = broker.subscribe()
+    assert broker.wait(position, timeout=0.01) == ([], position, False)
+
+def test_wait_wakes_on_publish():
+    broker = EventBroker(max_events=10)
+    position = broker.subscribe()
+    threading.Timer(0.05, broker.publish, args=("journal", 7, '{"id": 7}')).start()
+
+    events, position, lost = broker.wait(position, timeout=5)
+    assert [(e.id, e.data) for e in events] == [(7, '{"id": 7}')]
+    assert lost is False
+
+    # Posisi sudah maju: event yang sama tidak dikirim dua kali
+    assert broker.wait(position, timeout=0.01)[0] == []
+
+def test_slow_subscriber_gets_lost_flag():
+    broker = EventBroker(max_events=3)
+    position = broker.subscribe()
+    for i in range(1, 6):
+        broker.publish("journal", i, "{}")
+
+    events, _, lost = broker.wait(position, timeout=0)
+    assert [e.id for e in events] == [3, 4, 5]
+    assert lost is True
+
+def test_subscriber_limit():
+    broker = EventBroker(max_events=10, max_subscribers=1)
+    assert broker.subscribe() == 0
+    assert broker.subscribe() is None
+    broker.unsubscribe()
+    assert broker.subscribe() == 0
+
+def test_poll_source_feeds_every_broker():
+    # Dua broker = dua worker gunicorn yang membaca database yang sama
+    rows = []
+    fetch = lambda after: [r for r in rows if r[0] > after]
+    workers = [EventBroker(max_events=10), EventBroker(max_events=10)]
+    for broker in workers:
+        broker.poll_from(fetch, interval=0.01)
+        broker.subscribe()
+
+    # Nomor urut boleh berlubang (change_seq dipakai juga oleh akun)
+    rows.append((3, 1, "journal", "{}"))
+    rows.append((5, 2, "journal", "{}"))
+    for broker in workers:
+        events, position, lost = broker.wait(2, timeout=5)
+        assert [e.seq for e in events] == [3, 5]
+        assert (position, lost) == (5, False)
+        assert broker.wait(position, timeout=0.05)[0] == []
+
+    # Subscriber terakhir keluar: posisi diambil ulang dari subscriber berikutnya
+    broker = workers[0]
+    broker.unsubscribe()
+    broker.subscribe()
+    assert broker.wait(3, timeout=5)[0][0].seq == 5
@@ -0,0 +1,131 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+import pytest
+from core.jobs import Job, JobQueue, QueueFull
+
+def test_job_runs_on_process_pool():
+    queue = JobQueue(max_workers=1)
+    job, coalesced = queue.submit("echo", dict, {"a": 1})
+
+    assert coalesced is False
+    job.future.result(timeout=30)
+    data = queue.get(job.id).to_dict()
+    assert data["status"] == "done"
+    assert data["result"] == {"a": 1}
+    assert data["run_seconds"] is not None
+
+def test_cancelled_job_status():
+    future = Future()
+    future.cancel()
+    job = Job("j1", "echo", {}, future)
+    assert job.status == "cancelled"
+    assert "result" not in job.to_dict() and "error" not in job.to_dict()
+
+def test_identical_jobs_are_coalesced():
+    release = threading.Event()
+
+    def slow_report(year):
+        release.wait(5)
+        return {"year": year}
+
+    queue = JobQueue(executor=ThreadPoolExecutor(max_workers=2))
+    job1, _ = queue.submit("slow", slow_report, {"year": 2025})
+    job2, coalesced = queue.submit("slow", slow_report, {"year": 2025})
+    job3, coalesced_other = queue.submit("slow", slow_report, {"year": 2024})
+
+    assert coalesced is True
+    assert job2.id == job1.id
+    assert coalesced_other is False
+    assert queue.depth() == 2
+
+    release.set()
+    job1.future.result(timeout=5)
+    job3.future.result(timeout=5)
+    assert queue.depth() == 0
+
+    # Setelah selesai, request yang sama membuat job baru
+    job4, coalesced = queue.submit("slow", slow_report, {"year": 2025})
+    assert coalesced is False
+    assert job4.id != job1.id
+
+def test_submit_rejected_when_queue_full():
+    release = threading.Event()
+
+    def slow_report(year):
+        release.wait(5)
+        return {"year": year}
+
+    queue = JobQueue(executor=ThreadPoolExecutor(max_workers=1), max_pending=2)
+    job1, _ = queue.submit("slow", slow_report, {"year": 2025})
+    queue.submit("slow", slow_report, {"year": 2024})
+    with pytest.raises(QueueFull):
+        queue.submit("slow", slow_report, {"year": 2023})
+    # Request identik tetap digabung walau antrian penuh
+    same, coalesced = queue.submit("slow", slow_report, {"year": 2025})
+    assert coalesced is True and same.id == job1.id
+
+    release.set()
+    job1.future.result(timeout=5)
+    queue.executor.shutdown(wait=True)
+    assert queue.depth() == 0
+
+def test_failed_job_reports_error():
+    def broken():
+        raise ValueError("Akun tidak ditemukan")
+
+    queue = JobQueue(executor=ThreadPoolExecutor(max_workers=1))
+    job, _ = queue.submit("broken", broken, {})
+    job.future.exception(timeout=5)
+
+    data = job.to_dict()
+    assert data["status"] == "failed"
+    assert "Akun tidak ditemukan" in data["error"]
+
+def test_stored_jobs_are_shared_between_workers(tmp_path):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from core.database import Base
+    from core.jobs import JobStore
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    store = JobStore(session_factory=Session)
+    release = threading.Event()
+
+    def slow_report(year):
+        release.wait(5)
+        return {"year": year}
+
+    # Dua queue = dua worker gunicorn dengan process pool masing-masing
+    worker_a = JobQueue(executor=ThreadPoolExecutor(max_workers=1), store=store, max_pending=2)
+    worker_b = JobQueue(executor=ThreadPoolExecutor(max_workers=1), store=store, max_pending=2)
+    db_a, db_b = Session(), Session()
+
+    job, coalesced = worker_a.submit("slow", slow_report, {"year": 2025}, db_a)
+    assert coalesced is False and job.status == "pending"
+    same, coalesced = worker_b.submit("slow", slow_report, {"year": 2025}, db_b)
+    assert coalesced is True and same.id == job.id
+    # Batas antrian dihitung dari job aktif semua worker
+    worker_b.submit("slow", slow_report, {"year": 2024}, db_b)
+    with pytest.raises(QueueFull):
+        worker_a.submit("slow", slow_report, {"year": 2023}, db_a)
+
+    release.set()
+    worker_a._jobs[job.id].future.result(timeout=5)
+    data = worker_b.get(job.id, db_b).to_dict()
+    assert data["status"] == "done"
+    assert data["result"] == {"year": 2025}
+    assert data["run_seconds"] is not None
+    assert worker_b.get("tidak-ada", db_b) is None
+
+    def broken():
+        raise ValueError("Akun tidak ditemukan")
+
+    failed, _ = worker_b.submit("broken", broken, {}, db_b)
+    worker_b._jobs[failed.id].future.exception(timeout=5)
+    assert worker_a.get(failed.id, db_a).to_dict()["error"] == "Akun tidak ditemukan"
+
+    db_a.close()
+    db_b.close()
+    engine.dispose()
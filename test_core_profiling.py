@@ -0,0 +1,63 @@
+import tracemalloc
+from flask import Flask, jsonify
+from core.profiling import RequestProfiler
+from core.security import create_access_token
+
+def _app(profiler):
+    app = Flask(__name__)
+    profiler.init_app(app)
+
+    @app.route('/work')
+    def work():
+        data = [str(i) * 10 for i in range(20000)]
+        return jsonify({"size": len(data)})
+
+    @app.route('/boom')
+    def boom():
+        raise RuntimeError("gagal")
+
+    return app
+
+def _admin():
+    return {"Authorization": f"Bearer {create_access_token({'sub': 'admin', 'role': 'admin'})}"}
+
+def test_profile_report_contents_and_limits():
+    profiler = RequestProfiler(min_interval=0, top_n=5, store_size=2)
+    client = _app(profiler).test_client()
+
+    ids = [client.get('/work?profile=1', headers=_admin()).headers['X-Profile-Id'] for _ in range(3)]
+    report = profiler.get(ids[-1])
+    assert len(report['functions']) == 5
+    assert any('work' in f['function'] for f in report['functions'])
+    assert report['allocations'] and report['allocations'][0]['size_kb'] > 0
+    # Penyimpanan dibatasi: laporan terlama dibuang
+    assert profiler.get(ids[0]) is None and [r['id'] for r in profiler.list()] == ids[:0:-1]
+
+def test_failed_request_releases_slot():
+    profiler = RequestProfiler(min_interval=0)
+    app = _app(profiler)
+    app.config['PROPAGATE_EXCEPTIONS'] = False
+    client = app.test_client()
+    assert client.get('/boom?profile=1', headers=_admin()).status_code == 500
+    assert 'X-Profile-Id' in client.get('/work?profile=1', headers=_admin()).headers
+
+def test_profiling_requires_admin_and_can_be_disabled():
+    client = _app(RequestProfiler(min_interval=0)).test_client()
+    assert client.get('/work?profile=1').status_code == 403
+    client = _app(RequestProfiler(enabled=False)).test_client()
+    resp = client.get('/work?profile=1', headers=_admin())
+    assert resp.status_code == 200 and 'X-Profile-Id' not in resp.headers
+
+def test_overlapping_profiles_share_tracemalloc():
+    profiler = RequestProfiler(max_concurrent=2, min_interval=0)
+    app = _app(profiler)
+    assert not tracemalloc.is_tracing()
+    with app.test_request_context('/work'):
+        assert profiler.try_start() and profiler.try_start()
+        first, second = profiler.begin(), profiler.begin()
+        profiler.end(first, 200)
+        # Profil kedua masih berjalan: tracemalloc tidak boleh dimatikan
+        assert tracemalloc.is_tracing()
+        report_id = profiler.end(second, 200)
+    assert not tracemalloc.is_tracing()
+    assert profiler.get(report_id)['allocations'] is not None